@@ -0,0 +1,305 @@
+"""
+Offline Batch Pipeline
+Runs the strategy x job x iteration grid through a batch executor
+
+For non-interactive evaluations the synchronous loop pays full price and
+one round trip per request. Here the whole grid is compiled into an
+OpenAI Batch-format request file (one ``{"custom_id", "method", "url",
+"body"}`` line per request), handed to an executor, and the executor's
+result file is ingested back into the usual ``summaries`` /
+``detailed_results`` structure.
+
+Executors:
+- openai: uploads the file to the Batch API, polls until the batch is done
+          and downloads the results (half the price of synchronous calls,
+          24h completion window)
+- local:  sends every request through the experiment's cached client and
+          writes a Batch-format result file; with ``--cache-mode replay``
+          it runs fully offline from recorded responses
+
+Batch results carry no per-request latency, so ingested iterations have no
+``generation_time`` or ``tokens_per_second`` (summaries leave out the
+latency figures rather than report zeros); costs include the Batch API
+discount.
+
+Usage:
+    python research/batch_pipeline.py run --executor local --cache-mode replay
+    python research/batch_pipeline.py compile --jobs jobs.jsonl --iterations 5
+    python research/batch_pipeline.py ingest --results research/results/batch_results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from corpus_runner import iter_job_descriptions
+from instrumentation import usage_metrics
+from keyword_index import job_hash
+from llm_cache import response_to_dict, to_namespace
+from prompt_engineering_experiment import (CACHE_MODES, JOB_DESCRIPTION, MAX_TOKENS, MODEL,
+                                           STRATEGIES, TEMPERATURE, async_client, build_messages,
+                                           configure_cache, evaluate_response, print_summary,
+                                           rate_limiter, summarize_results, weighted_score)
+
+DEFAULT_REQUESTS_PATH = "research/results/batch_requests.jsonl"
+DEFAULT_RESULTS_PATH = "research/results/batch_results.jsonl"
+DEFAULT_OUTPUT_PATH = "research/results/batch_experiment_results.json"
+ENDPOINT = "/v1/chat/completions"
+BATCH_DISCOUNT = 0.5          # Batch API price relative to synchronous calls
+MAX_BATCH_REQUESTS = 50_000   # per input file
+BATCH_DONE_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+def custom_id(strategy_name: str, job_key: str, iteration: int) -> str:
+    return f"{strategy_name}:{job_key}:{iteration}"
+
+
+def parse_custom_id(value: str) -> Tuple[str, str, int]:
+    strategy_name, job_key, iteration = value.rsplit(":", 2)
+    return strategy_name, job_key, int(iteration)
+
+
+def jobs_path_for(requests_path: str) -> str:
+    """Sidecar file mapping job keys back to their descriptions"""
+    return requests_path + ".jobs.json"
+
+
+def compile_batch(jobs: Iterable[Tuple[str, str]], strategies=STRATEGIES, iterations: int = 3,
+                  requests_path: str = DEFAULT_REQUESTS_PATH) -> int:
+    """Write the request grid in Batch API format; returns the request count"""
+    directory = os.path.dirname(requests_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    job_table = {}
+    count = 0
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for job_id, job_desc in jobs:
+            job_key = job_hash(job_desc)[:16]
+            job_table[job_key] = {"job_id": job_id, "job_description": job_desc}
+            for strategy_name, prompt_func in strategies:
+                body = {
+                    "model": MODEL,
+                    "messages": build_messages(prompt_func(job_desc)),
+                    "temperature": TEMPERATURE,
+                    "max_tokens": MAX_TOKENS
+                }
+                for i in range(iterations):
+                    count += 1
+                    if count > MAX_BATCH_REQUESTS:
+                        raise ValueError(f"More than {MAX_BATCH_REQUESTS} requests; "
+                                         f"split the job file into several batches")
+                    f.write(json.dumps({"custom_id": custom_id(strategy_name, job_key, i + 1),
+                                        "method": "POST", "url": ENDPOINT, "body": body},
+                                       ensure_ascii=False) + "\n")
+
+    with open(jobs_path_for(requests_path), "w", encoding="utf-8") as f:
+        json.dump(job_table, f, ensure_ascii=False)
+    return count
+
+
+def _read_jsonl(path: str) -> Iterable[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ============================================================================
+# EXECUTORS
+# Anything with ``execute(requests_path, results_path) -> results_path``
+# ============================================================================
+
+class LocalExecutor:
+    """Runs a batch file through the experiment's (cached) client"""
+
+    def __init__(self, concurrency: int = 8):
+        self.concurrency = concurrency
+
+    async def _run_one(self, request: Dict, semaphore: asyncio.Semaphore) -> Dict:
+        _, _, iteration = parse_custom_id(request["custom_id"])
+        async with semaphore:
+            try:
+                # The iteration is the cache sample, so replaying a cache
+                # recorded by the experiment finds the same responses
+                response = await async_client.chat.completions.create(
+                    cache_sample=iteration, **request["body"])
+            except Exception as e:
+                return {"custom_id": request["custom_id"], "response": None,
+                        "error": {"code": type(e).__name__, "message": str(e)}}
+        return {"custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": response_to_dict(response)},
+                "error": None}
+
+    async def _run(self, requests_path: str, results_path: str):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        requests = list(_read_jsonl(requests_path))
+        results = await asyncio.gather(*(self._run_one(r, semaphore) for r in requests))
+        with open(results_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+
+    def execute(self, requests_path: str, results_path: str) -> str:
+        asyncio.run(self._run(requests_path, results_path))
+        return results_path
+
+
+class OpenAIBatchExecutor:
+    """Submits a batch file to the OpenAI Batch API and waits for the results"""
+
+    def __init__(self, poll_interval: float = 60.0, completion_window: str = "24h"):
+        from openai import OpenAI
+        # Retried by the shared rate limiter, so its 429s feed the AIMD backoff
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    def execute(self, requests_path: str, results_path: str) -> str:
+        def upload():
+            with open(requests_path, "rb") as f:
+                return self.client.files.create(file=f, purpose="batch")
+
+        input_file = rate_limiter.retry(upload)
+        batch = rate_limiter.retry(lambda: self.client.batches.create(
+            input_file_id=input_file.id, endpoint=ENDPOINT,
+            completion_window=self.completion_window))
+        print(f"Submitted batch {batch.id}")
+
+        while batch.status not in BATCH_DONE_STATES:
+            time.sleep(self.poll_interval)
+            batch = rate_limiter.retry(lambda: self.client.batches.retrieve(batch.id))
+            counts = batch.request_counts
+            print(f"  {batch.status}: {counts.completed}/{counts.total} done, "
+                  f"{counts.failed} failed")
+        if batch.status != "completed":
+            print(f"  ✗ Batch {batch.id} ended as {batch.status}", file=sys.stderr)
+
+        # Successful and failed requests come back in separate files
+        with open(results_path, "w", encoding="utf-8") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    f.write(rate_limiter.retry(lambda: self.client.files.content(file_id)).text)
+        return results_path
+
+
+EXECUTORS = {"local": LocalExecutor, "openai": OpenAIBatchExecutor}
+
+
+# ============================================================================
+# INGEST
+# ============================================================================
+
+def ingest_results(results_path: str, jobs_path: str, strategies=STRATEGIES):
+    """Evaluate a Batch result file into ``(summaries, detailed_results)``"""
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        job_table = json.load(f)
+
+    detailed: Dict[str, List[Dict]] = {name: [] for name, _ in strategies}
+    for line in _read_jsonl(results_path):
+        strategy_name, job_key, iteration = parse_custom_id(line["custom_id"])
+        job = job_table[job_key]
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or response.get("body", {}).get("error") or {}
+            result = {"iteration": iteration, "error": error.get("message", "batch request failed")}
+        else:
+            body = response["body"]
+            content = body["choices"][0]["message"]["content"]
+            usage = body.get("usage")
+            metrics = usage_metrics(None if usage is None else to_namespace(usage),
+                                    body.get("model", MODEL), 0.0, completion_text=content)
+            if metrics["cost_usd"] is not None:
+                metrics["cost_usd"] = round(metrics["cost_usd"] * BATCH_DISCOUNT, 6)
+            del metrics["tokens_per_second"]
+            result = evaluate_response(content, strategy_name, iteration, 0.0,
+                                       job["job_description"], metrics)
+            del result["generation_time"]
+        result["job_id"] = job["job_id"]
+        detailed.setdefault(strategy_name, []).append(result)
+
+    all_summaries = []
+    for strategy_name, results in detailed.items():
+        results.sort(key=lambda r: (r["job_id"], r["iteration"]))
+        summary = summarize_results(strategy_name, results, len(results), verbose=False)
+        if summary:
+            all_summaries.append(summary)
+    return all_summaries, {name: results for name, results in detailed.items() if results}
+
+
+def write_output(all_summaries: List[Dict], all_results: Dict, output_path: str,
+                 iterations: int = None):
+    best_strategy = max(all_summaries, key=weighted_score)
+    with open(output_path, "w") as f:
+        json.dump({
+            "model_used": MODEL,
+            **({"iterations_per_strategy": iterations} if iterations else {}),
+            "summaries": all_summaries,
+            "detailed_results": all_results,
+            "winner": best_strategy["strategy"]
+        }, f, indent=2)
+    return best_strategy
+
+
+def report(all_summaries: List[Dict], all_results: Dict, output_path: str,
+           iterations: int = None):
+    if not all_summaries:
+        print("\n✗ No successful requests in the batch results; nothing to summarize")
+        return
+    for summary in all_summaries:
+        print_summary(summary)
+    best_strategy = write_output(all_summaries, all_results, output_path, iterations)
+    print(f"\n🏆 RECOMMENDED STRATEGY: {best_strategy['strategy'].upper()}")
+    print(f"\n✓ Results saved to {output_path}")
+
+
+def load_jobs(path: str = None, limit: int = None):
+    if path is None:
+        return [("default", JOB_DESCRIPTION)]
+    jobs = list(iter_job_descriptions(path))
+    return jobs[:limit] if limit else jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-mode prompt strategy evaluation")
+    parser.add_argument("command", choices=("compile", "run", "ingest"),
+                        help="compile the request file, run compile+execute+ingest, "
+                             "or ingest an existing result file")
+    parser.add_argument("--jobs", default=None,
+                        help="JSONL job corpus (default: the built-in job description)")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N jobs")
+    parser.add_argument("--iterations", type=int, default=3,
+                        help="iterations per strategy per job (default: 3)")
+    parser.add_argument("--requests", default=DEFAULT_REQUESTS_PATH,
+                        help=f"Batch-format request file (default: {DEFAULT_REQUESTS_PATH})")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH,
+                        help=f"Batch-format result file (default: {DEFAULT_RESULTS_PATH})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH,
+                        help=f"summary JSON (default: {DEFAULT_OUTPUT_PATH})")
+    parser.add_argument("--executor", choices=sorted(EXECUTORS), default="local",
+                        help="where to run the batch (default: local)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="local executor: max concurrent requests (default: 8)")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES,
+                        default=os.getenv("LLM_CACHE_MODE", "off"),
+                        help="local executor: response cache mode (default: off)")
+    args = parser.parse_args()
+
+    configure_cache(args.cache_mode)
+
+    if args.command in ("compile", "run"):
+        count = compile_batch(load_jobs(args.jobs, args.limit), STRATEGIES, args.iterations,
+                              args.requests)
+        print(f"✓ {count} requests written to {args.requests}")
+    if args.command == "run":
+        executor = (LocalExecutor(args.concurrency) if args.executor == "local"
+                    else EXECUTORS[args.executor]())
+        executor.execute(args.requests, args.results)
+        print(f"✓ Results written to {args.results}")
+    if args.command in ("run", "ingest"):
+        all_summaries, all_results = ingest_results(args.results, jobs_path_for(args.requests))
+        report(all_summaries, all_results, args.output,
+               args.iterations if args.command == "run" else None)
@@ -0,0 +1,209 @@
+"""
+Multi-Job Corpus Runner
+Benchmarks the four prompt strategies across a JSONL corpus of job postings
+
+Job descriptions are streamed from the JSONL file through a generator
+pipeline (read -> expand into job x strategy cells -> run -> emit), so the
+corpus is never held in memory: only a bounded window of cells is in
+flight at once. Each (job, strategy) result is written out as soon as it
+completes, followed by a per-job record with the winner once all of that
+job's strategies are done.
+
+Each input line is a JSON object with the description in one of
+``job_description`` / ``description`` / ``text`` / ``body``, an optional
+``title`` and an optional ``job_id`` / ``id``.
+
+Usage:
+    python research/corpus_runner.py jobs.jsonl --iterations 3 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Tuple
+
+from keyword_index import job_hash
+from prompt_engineering_experiment import (CACHE_MODES, STOP_AFTER_QUESTIONS, STRATEGIES,
+                                           configure_cache, configure_rate_limits, rate_limiter,
+                                           run_iteration_async, summarize_results,
+                                           weighted_score)
+
+DEFAULT_OUTPUT = "research/results/corpus_results.jsonl"
+
+DESCRIPTION_FIELDS = ("job_description", "description", "text", "body")
+ID_FIELDS = ("job_id", "id", "request_id")
+
+
+def iter_job_descriptions(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield ``(job_id, job_description)`` pairs lazily from a JSONL file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"  ✗ {path}:{line_no}: invalid JSON ({e})", file=sys.stderr)
+                continue
+
+            description = next((record[k] for k in DESCRIPTION_FIELDS if record.get(k)), None)
+            if not description:
+                print(f"  ✗ {path}:{line_no}: no job description field", file=sys.stderr)
+                continue
+            title = record.get("title")
+            if title and title not in description:
+                description = f"{title}\n{description}"
+
+            job_id = next((str(record[k]) for k in ID_FIELDS if record.get(k)), None)
+            yield job_id or job_hash(description)[:12], description
+
+
+def iter_cells(jobs: Iterable[Tuple[str, str]], strategies=STRATEGIES):
+    """Expand jobs into (seq, job_id, job_desc, strategy_name, prompt_func) cells.
+
+    ``seq`` numbers the jobs in input order; ids and descriptions can repeat
+    across lines, so it is what tells two jobs apart.
+    """
+    for seq, (job_id, job_desc) in enumerate(jobs):
+        for strategy_name, prompt_func in strategies:
+            yield seq, job_id, job_desc, strategy_name, prompt_func
+
+
+async def run_cell(job_id: str, job_desc: str, strategy_name: str, prompt_func,
+                   iterations: int, semaphore: asyncio.Semaphore,
+                   stream: bool = False,
+                   stop_after_questions: int = STOP_AFTER_QUESTIONS) -> Dict:
+    """Run all iterations of one strategy on one job"""
+    results = await asyncio.gather(*(
+        run_iteration_async(strategy_name, prompt_func, i + 1, semaphore, job_desc,
+                            stream, stop_after_questions, verbose=False)
+        for i in range(iterations)
+    ))
+    return {
+        "type": "strategy",
+        "job_id": job_id,
+        "job_hash": job_hash(job_desc),
+        "strategy": strategy_name,
+        "summary": summarize_results(strategy_name, results, iterations, verbose=False),
+        "results": list(results)
+    }
+
+
+async def run_corpus(jobs: Iterable[Tuple[str, str]], strategies=STRATEGIES,
+                     iterations: int = 3, max_concurrency: int = 16,
+                     stream: bool = False,
+                     stop_after_questions: int = STOP_AFTER_QUESTIONS):
+    """Async generator of result records, emitted as cells complete.
+
+    At most ``max_concurrency`` API requests run at once and at most twice
+    that many cells are scheduled, so memory stays bounded however large the
+    corpus is. Every input line is its own job, even when its id or
+    description repeats an earlier one.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    cells = iter_cells(jobs, strategies)
+    max_pending = max(2, 2 * max_concurrency // max(1, iterations))
+    pending = set()
+    # job seq -> summaries collected so far, only for jobs still in flight
+    open_jobs: Dict[int, Dict] = {}
+    job_of: Dict[asyncio.Future, int] = {}
+
+    while True:
+        for seq, job_id, job_desc, strategy_name, prompt_func in cells:
+            open_jobs.setdefault(seq, {"summaries": [], "remaining": len(strategies)})
+            task = asyncio.ensure_future(run_cell(
+                job_id, job_desc, strategy_name, prompt_func, iterations, semaphore,
+                stream, stop_after_questions))
+            job_of[task] = seq
+            pending.add(task)
+            if len(pending) >= max_pending:
+                break
+        if not pending:
+            return
+
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            record = task.result()
+            yield record
+
+            seq = job_of.pop(task)
+            job = open_jobs[seq]
+            job["remaining"] -= 1
+            if record["summary"]:
+                job["summaries"].append(record["summary"])
+            if job["remaining"] == 0:
+                del open_jobs[seq]
+                summaries = job["summaries"]
+                yield {
+                    "type": "job",
+                    "job_id": record["job_id"],
+                    "job_hash": record["job_hash"],
+                    "winner": max(summaries, key=weighted_score)["strategy"] if summaries else None,
+                    "summaries": summaries
+                }
+
+
+async def main(path: str, output: str = DEFAULT_OUTPUT, iterations: int = 3,
+               concurrency: int = 16, stream: bool = False,
+               stop_after_questions: int = STOP_AFTER_QUESTIONS, limit: int = None):
+    jobs = iter_job_descriptions(path)
+    if limit:
+        jobs = islice(jobs, limit)
+
+    if output == "-":
+        out = sys.stdout
+    else:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        out = open(output, "a", encoding="utf-8")
+
+    jobs_done = 0
+    try:
+        async for record in run_corpus(jobs, STRATEGIES, iterations, concurrency,
+                                       stream, stop_after_questions):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["type"] == "job":
+                jobs_done += 1
+                print(f"  ✓ job {record['job_id']}: winner {record['winner']} "
+                      f"({jobs_done} jobs done)", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"\n✓ {jobs_done} jobs written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run all prompt strategies over a JSONL job corpus")
+    parser.add_argument("jobs", help="JSONL file with one job posting per line")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help=f"JSONL results file, '-' for stdout (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--iterations", type=int, default=3,
+                        help="iterations per strategy per job (default: 3)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="max concurrent API requests (default: 16)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="only run the first N jobs")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream responses and record time-to-first-token metrics")
+    parser.add_argument("--stop-after", type=int, default=STOP_AFTER_QUESTIONS,
+                        help="close a stream after this many complete questions, 0 = never")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES,
+                        default=os.getenv("LLM_CACHE_MODE", "off"),
+                        help="response cache mode (default: off)")
+    parser.add_argument("--rpm", type=float, default=rate_limiter.rpm,
+                        help="requests-per-minute budget (default: OPENAI_RPM or 500)")
+    parser.add_argument("--tpm", type=float, default=rate_limiter.tpm,
+                        help="tokens-per-minute budget (default: OPENAI_TPM or 150000)")
+    args = parser.parse_args()
+
+    configure_cache(args.cache_mode)
+    configure_rate_limits(args.rpm, args.tpm)
+    asyncio.run(main(args.jobs, args.output, args.iterations, args.concurrency,
+                     args.stream, args.stop_after, args.limit))
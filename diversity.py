@@ -0,0 +1,198 @@
+"""
+Question Diversity Index
+MinHash + LSH near-duplicate detection over every generated question
+
+Comparing each new question with every question seen before is O(n^2)
+over a run. Instead each question gets a MinHash signature of its word
+shingles, and the signature is split into bands; questions that agree on
+every row of at least one band land in the same bucket. A lookup only
+compares against the few questions sharing a bucket, so it stays
+sub-linear however large the index grows, and the band layout puts the
+detection threshold near a Jaccard similarity of 0.5.
+
+Questions are indexed per group (the strategy that generated them). A new
+question counts as a near-duplicate if it matches an earlier question from
+the same group, or one of the example questions quoted in the prompts
+(``EXAMPLE_GROUP``), which catches few-shot copying its examples.
+
+An index holds at most ``MAX_QUESTIONS`` generated questions, dropping the
+oldest first (the prompt examples are never dropped), and
+``QuestionIndexes`` keeps one index per job description for the last
+``MAX_JOBS`` jobs, so questions for one job never count as duplicates of
+another's and a long-running process stays in bounded memory.
+"""
+
+import re
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+NUM_PERM = 64
+BANDS = 16          # 16 bands x 4 rows: candidates above Jaccard ~0.5
+THRESHOLD = 0.5     # estimated Jaccard at which a candidate is a near-duplicate
+EXAMPLE_GROUP = "prompt_example"
+MAX_QUESTIONS = 20_000  # generated questions kept per index
+MAX_JOBS = 64           # per-job indexes kept by ``QuestionIndexes``
+
+_PRIME = (1 << 31) - 1
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def _permutations(count: int, seed: int = 1) -> List[Tuple[int, int]]:
+    # Fixed LCG so signatures are stable across processes and runs
+    state, params = seed, []
+    for _ in range(count):
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        a = (state >> 33) % (_PRIME - 1) + 1
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        params.append((a, (state >> 33) % _PRIME))
+    return params
+
+
+_PERMUTATIONS = _permutations(NUM_PERM)
+
+
+def shingles(text: str) -> set:
+    """Word bigrams of the normalized text (single words for one-word texts)"""
+    words = _TOKEN.findall(text.lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(text: str) -> array:
+    """``NUM_PERM`` 31-bit MinHash values of the text's shingles"""
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)] or [0]
+    return array("I", (min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS))
+
+
+def estimated_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+@dataclass
+class Match:
+    """An indexed question that a lookup found similar"""
+    id: int
+    group: str
+    similarity: float
+
+
+class QuestionIndex:
+    """LSH index of question signatures, grouped by generating strategy"""
+
+    def __init__(self, bands: int = BANDS, threshold: float = THRESHOLD,
+                 max_questions: int = MAX_QUESTIONS):
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide {NUM_PERM}")
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.threshold = threshold
+        self.max_questions = max_questions
+        self._entries: Dict[int, Tuple[array, str, str]] = {}
+        self._generated = deque()  # ids of non-example questions, oldest first
+        self._next_id = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature: array) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text: str, signature: array = None) -> List[Match]:
+        """Indexed questions whose estimated Jaccard with ``text`` is above threshold"""
+        signature = signature if signature is not None else minhash(text)
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        matches = []
+        for candidate in candidates:
+            other, group, _ = self._entries[candidate]
+            similarity = estimated_jaccard(signature, other)
+            if similarity >= self.threshold:
+                matches.append(Match(candidate, group, similarity))
+        return sorted(matches, key=lambda m: -m.similarity)
+
+    def add(self, text: str, group: str, signature: array = None) -> int:
+        signature = signature if signature is not None else minhash(text)
+        question_id = self._next_id
+        self._next_id += 1
+        self._entries[question_id] = (signature, group, text)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(question_id)
+        if group != EXAMPLE_GROUP:
+            self._generated.append(question_id)
+            if len(self._generated) > self.max_questions:
+                self._evict(self._generated.popleft())
+        return question_id
+
+    def _evict(self, question_id: int):
+        signature, _, _ = self._entries.pop(question_id)
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band][key]
+            bucket.remove(question_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def check_and_add(self, texts: Iterable[str], group: str) -> List[List[Match]]:
+        """Near-duplicate matches for each text, then index it.
+
+        Only matches from the same group or from the prompt examples count,
+        so two strategies asking the same classic question isn't penalised.
+        Texts are added one at a time, so repeats within one response are
+        caught too.
+        """
+        results = []
+        for text in texts:
+            signature = minhash(text)
+            results.append([m for m in self.query(text, signature)
+                            if m.group in (group, EXAMPLE_GROUP)])
+            self.add(text, group, signature)
+        return results
+
+
+class QuestionIndexes:
+    """One ``QuestionIndex`` per job key, least recently used dropped first.
+
+    ``examples`` returns the prompt example questions each new index is
+    seeded with.
+    """
+
+    def __init__(self, examples: Callable[[], Iterable[str]] = tuple,
+                 max_jobs: int = MAX_JOBS, max_questions: int = MAX_QUESTIONS):
+        self.examples = examples
+        self.max_jobs = max_jobs
+        self.max_questions = max_questions
+        self._indexes: "OrderedDict[str, QuestionIndex]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def get(self, key: str) -> QuestionIndex:
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index
+
+        index = QuestionIndex(max_questions=self.max_questions)
+        for text in self.examples():
+            index.add(text, EXAMPLE_GROUP)
+        self._indexes[key] = index
+        if len(self._indexes) > self.max_jobs:
+            self._indexes.popitem(last=False)
+        return index
+
+
+def diversity_metrics(matches: List[List[Match]]) -> Dict:
+    """Per-response diversity fields from ``check_and_add`` results"""
+    total = len(matches)
+    duplicates = sum(1 for m in matches if m)
+    example_copies = sum(1 for m in matches if any(x.group == EXAMPLE_GROUP for x in m))
+    return {
+        "diversity": round(10 * (1 - duplicates / total), 2) if total else None,
+        "near_duplicates": duplicates,
+        "example_copies": example_copies
+    }
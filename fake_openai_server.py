@@ -0,0 +1,502 @@
+"""
+Fake OpenAI Server
+Local OpenAI-compatible stand-in with latency and fault injection
+
+Serves ``POST /v1/chat/completions`` (plain and SSE streaming, with
+``stream_options.include_usage``) using synthetic answers shaped like the
+real ones for each strategy: an XML question set for the structured
+prompt, one ``<job>`` block per job for packed prompts, numbered question
+lists for zero-shot, few-shot and chain-of-thought, and rubric-shaped JSON
+for ``response_format`` JSON requests. Questions mention the technologies
+named in the prompt's job description, so the evaluators score them like
+real output.
+
+Every response waits for a sampled time-to-first-token, then streams
+tokens at a sampled rate. Faults are injected at configurable rates: 429
+with ``Retry-After`` and 500 with OpenAI-style error bodies, plus an
+optional requests-per-minute ceiling that answers 429 once exceeded. The
+server is plain asyncio, so one process sustains thousands of requests per
+minute for load-testing the runner's concurrency, rate limiting and
+retries without an API key. Point the OpenAI SDK at it with
+``OPENAI_BASE_URL``.
+
+Usage:
+    python research/fake_openai_server.py --port 8000 --ttft lognormal:0.4,0.5 --rate-429 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=fake \\
+        python research/prompt_engineering_experiment.py --iterations 50 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_PORT = 8000
+DEFAULT_TTFT = "lognormal:0.4,0.5"     # median 0.4s
+DEFAULT_TOKEN_RATE = "uniform:40,80"   # completion tokens per second
+MAX_BODY_BYTES = 4 * 1024 * 1024
+CHARS_PER_TOKEN = 4
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+# Technologies picked out of the job description so questions stay on topic
+TECH_TERMS = (
+    "Python", "FastAPI", "Django", "Flask", "PostgreSQL", "MySQL", "MongoDB", "Redis",
+    "Docker", "Kubernetes", "AWS", "GCP", "Azure", "React", "TypeScript", "JavaScript",
+    "Node.js", "REST", "GraphQL", "microservices", "Kafka", "RabbitMQ", "SQL", "CI/CD",
+    "Terraform", "Java", "Golang", "Rust", "machine learning", "PyTorch", "TensorFlow",
+)
+QUESTION_TEMPLATES = (
+    ("How would you design a {a} service that stays responsive under heavy load, "
+     "and where would {b} fit in?", "system_design", "senior"),
+    ("Explain how you would debug a slow endpoint in a {a} application that reads "
+     "from {b}.", "technical", "mid"),
+    ("What trade-offs do you consider when choosing between {a} and {b} for a new "
+     "feature?", "technical", "mid"),
+    ("Describe a time you migrated a production system to {a}. What went wrong and "
+     "how did you recover?", "behavioral", "senior"),
+    ("How do you test and deploy changes to a {a} codebase that depends on {b} "
+     "without downtime?", "technical", "senior"),
+    ("Walk me through how you would model the data for an interview platform using "
+     "{a}. Which indexes would you add?", "technical", "mid"),
+    ("How would you mentor a junior engineer who is new to {a} and {b}?",
+     "behavioral", "mid"),
+)
+CATEGORIES = {"system_design": "system_design", "technical": "backend",
+              "behavioral": "teamwork"}
+
+
+# ============================================================================
+# DISTRIBUTIONS
+# ============================================================================
+
+def parse_distribution(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Sampler for ``fixed:X``, ``uniform:LO,HI``, ``lognormal:MEDIAN,SIGMA``
+    or ``exponential:MEAN``; samples are never negative"""
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"bad distribution parameters in {spec!r}")
+    shapes = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+    if shapes.get(kind) != len(values):
+        raise ValueError(f"expected one of fixed:X, uniform:LO,HI, lognormal:MEDIAN,SIGMA, "
+                         f"exponential:MEAN, got {spec!r}")
+    if kind == "fixed":
+        return lambda: max(0.0, values[0])
+    if kind == "uniform":
+        return lambda: max(0.0, rng.uniform(*values))
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda: rng.lognormvariate(mu, sigma)
+    return lambda: rng.expovariate(1 / values[0])
+
+
+# ============================================================================
+# SYNTHETIC CONTENT
+# ============================================================================
+
+def job_terms(prompt: str) -> List[str]:
+    """Technologies from TECH_TERMS that the prompt mentions, in order"""
+    found = []
+    for term in TECH_TERMS:
+        # Acronyms must match case, so "rest" or "sql" in prose don't count
+        match = re.search(rf"(?<!\w){re.escape(term)}(?!\w)", prompt,
+                          0 if term.isupper() else re.IGNORECASE)
+        if match:
+            found.append((match.start(), term))
+    return [term for _, term in sorted(found)] or ["Python", "SQL"]
+
+
+def synthetic_questions(terms: List[str], count: int, rng: random.Random) -> List[Tuple]:
+    """``(text, type, difficulty, category)`` tuples mentioning the job's terms"""
+    questions = []
+    templates = rng.sample(QUESTION_TEMPLATES, min(count, len(QUESTION_TEMPLATES)))
+    for template, kind, difficulty in templates:
+        a, b = rng.sample(terms, 2) if len(terms) > 1 else (terms[0], terms[0])
+        questions.append((template.format(a=a, b=b), kind, difficulty, CATEGORIES[kind]))
+    return questions
+
+
+def _xml(questions: List[Tuple]) -> str:
+    items = "".join(
+        f"  <question>\n"
+        f"    <id>{n}</id>\n"
+        f"    <text>{text}</text>\n"
+        f"    <type>{kind}</type>\n"
+        f"    <difficulty>{difficulty}</difficulty>\n"
+        f"    <category>{category}</category>\n"
+        f"  </question>\n"
+        for n, (text, kind, difficulty, category) in enumerate(questions, 1))
+    return f"<questions>\n{items}</questions>"
+
+
+def _numbered(questions: List[Tuple], annotated: bool) -> str:
+    lines = []
+    for n, (text, kind, difficulty, _) in enumerate(questions, 1):
+        lines.append(f"{n}. {text}")
+        if annotated:
+            lines.append(f"   Type: {kind.replace('_', ' ').title()}")
+            lines.append(f"   Difficulty: {difficulty.title()}")
+    return "\n".join(lines)
+
+
+def _evaluation_json(prompt: str, rng: random.Random) -> str:
+    match = re.search(r"<one of: ([^>]+)>", prompt)
+    dimensions = [d.strip() for d in match.group(1).split(",")] if match else []
+    scores = [{"dimension": d, "score": rng.randint(55, 95),
+               "justification": f"The response addresses {d.replace('_', ' ')} reasonably well.",
+               "strengths": ["clear structure"], "improvements": ["add a concrete example"]}
+              for d in dimensions]
+    return json.dumps({"dimension_scores": scores,
+                       "overall_feedback": "A solid answer that could use more specifics."})
+
+
+def synthetic_reply(messages: List[Dict], json_mode: bool, rng: random.Random) -> str:
+    """A response shaped like the real one for the prompt's strategy"""
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    if json_mode:
+        return _evaluation_json(prompt, rng)
+    count = int(m.group(1)) if (m := re.search(r"Generate (\d+)", prompt)) else 5
+
+    job_ids = re.findall(r'<job id="(\w+)">\n(?!<questions>)', prompt)
+    if job_ids:
+        # Packed request: one structured block per job, in the order asked
+        blocks = []
+        for job_id in job_ids:
+            section = prompt.split(f'<job id="{job_id}">', 1)[1].split("</job>", 1)[0]
+            blocks.append(f'<job id="{job_id}">\n'
+                          f"{_xml(synthetic_questions(job_terms(section), count, rng))}\n</job>")
+        return "\n".join(blocks)
+
+    questions = synthetic_questions(job_terms(prompt), count, rng)
+    if "XML" in prompt:
+        return _xml(questions)
+    if "step-by-step" in prompt:
+        terms = ", ".join(job_terms(prompt)[:4])
+        return ("Let me think step-by-step.\n"
+                f"1. Key skills: {terms}.\n"
+                "2. Experience level: senior, with ownership of production systems.\n"
+                "3. Question types: a mix of technical depth, system design and behavior.\n\n"
+                "Based on this analysis, here are the questions:\n\n"
+                + _numbered(questions, annotated=False))
+    if "examples of good questions" in prompt:
+        return _numbered(questions, annotated=True)
+    return "Here are the interview questions:\n\n" + _numbered(questions, annotated=False)
+
+
+def tokenize(text: str) -> List[str]:
+    """Token-sized pieces (whitespace kept attached) that join back to ``text``"""
+    return re.findall(r"\s*\S{1,%d}|\s+" % CHARS_PER_TOKEN, text)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, round(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+# ============================================================================
+# FAKE API
+# ============================================================================
+
+class FakeOpenAI:
+    """Request handling, latency sampling, fault injection and counters"""
+
+    def __init__(self, ttft: str = DEFAULT_TTFT, token_rate: str = DEFAULT_TOKEN_RATE,
+                 rate_429: float = 0.0, rate_500: float = 0.0, retry_after: float = 1.0,
+                 rpm_limit: float = 0.0, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.sample_ttft = parse_distribution(ttft, self.rng)
+        self.sample_rate = parse_distribution(token_rate, self.rng)
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.rpm_limit = rpm_limit
+        self._window = deque()
+        self.started = time.monotonic()
+        self.counters = {"requests": 0, "completed": 0, "streamed": 0, "injected_429": 0,
+                         "injected_500": 0, "rpm_limited": 0, "disconnects": 0,
+                         "prompt_tokens": 0, "completion_tokens": 0}
+        self.inflight = 0
+
+    def fault(self) -> Optional[Tuple[int, Dict, Dict]]:
+        """``(status, error body, headers)`` if this request should fail"""
+        now = time.monotonic()
+        if self.rpm_limit:
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= self.rpm_limit:
+                self.counters["rpm_limited"] += 1
+                wait = 60 - (now - self._window[0])
+                return 429, _error(f"Rate limit reached: {self.rpm_limit:g} requests per min",
+                                   "requests", "rate_limit_exceeded"), {
+                    "Retry-After": f"{math.ceil(wait)}", "retry-after-ms": f"{int(wait * 1000)}"}
+            self._window.append(now)
+        roll = self.rng.random()
+        if roll < self.rate_429:
+            self.counters["injected_429"] += 1
+            return 429, _error("Rate limit reached (injected)", "requests",
+                               "rate_limit_exceeded"), {"Retry-After": f"{self.retry_after:g}"}
+        if roll < self.rate_429 + self.rate_500:
+            self.counters["injected_500"] += 1
+            return 500, _error("The server had an error while processing your request "
+                               "(injected)", "server_error", None), {}
+        return None
+
+    def prepare(self, request: Dict) -> Dict:
+        """Content, usage and timing for one completion request"""
+        messages = request.get("messages") or []
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        tokens = tokenize(synthetic_reply(messages, json_mode, self.rng))
+        finish_reason = "stop"
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+        if max_tokens and len(tokens) > max_tokens:
+            tokens, finish_reason = tokens[:max_tokens], "length"
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) + 4 for m in messages)
+        self.counters["prompt_tokens"] += prompt_tokens
+        self.counters["completion_tokens"] += len(tokens)
+        return {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "created": int(time.time()),
+                "model": request.get("model", "gpt-4"), "tokens": tokens,
+                "finish_reason": finish_reason, "ttft": self.sample_ttft(),
+                "rate": max(self.sample_rate(), 1e-3),
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)}}
+
+    def stats(self) -> Dict:
+        minutes = (time.monotonic() - self.started) / 60
+        return {**self.counters, "inflight": self.inflight,
+                "requests_per_minute": round(self.counters["requests"] / minutes, 1)
+                                       if minutes > 0 else 0.0}
+
+
+def _error(message: str, kind: str, code: Optional[str]) -> Dict:
+    return {"error": {"message": message, "type": kind, "param": None, "code": code}}
+
+
+def completion_body(reply: Dict) -> Dict:
+    return {"id": reply["id"], "object": "chat.completion", "created": reply["created"],
+            "model": reply["model"],
+            "choices": [{"index": 0, "finish_reason": reply["finish_reason"], "logprobs": None,
+                         "message": {"role": "assistant", "content": "".join(reply["tokens"])}}],
+            "usage": reply["usage"]}
+
+
+def chunk_body(reply: Dict, delta: Dict, finish_reason: Optional[str] = None,
+               usage: Optional[Dict] = None) -> Dict:
+    choices = [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason,
+                                 "logprobs": None}]
+    return {"id": reply["id"], "object": "chat.completion.chunk", "created": reply["created"],
+            "model": reply["model"], "choices": choices, "usage": usage}
+
+
+# ============================================================================
+# HTTP FRONT END
+# ============================================================================
+
+class RequestTooLarge(ValueError):
+    """Raised for a request body over ``MAX_BODY_BYTES``"""
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """``(method, path, headers, body)`` of the next request, or None at EOF.
+
+    Raises ``RequestTooLarge`` for an oversized body and ``ValueError`` for
+    a malformed request line or Content-Length.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ValueError("malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise ValueError("invalid Content-Length")
+    if length < 0:
+        raise ValueError("invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestTooLarge("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _head(status: int, headers: Dict) -> bytes:
+    return (f"HTTP/1.1 {status} {_REASONS[status]}\r\n" + "".join(
+        f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n").encode("latin-1")
+
+
+def _response(status: int, payload: Dict, keep_alive: bool, extra_headers: Dict = None) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    return _head(status, {"Content-Type": "application/json", "Content-Length": str(len(body)),
+                          "Connection": "keep-alive" if keep_alive else "close",
+                          **(extra_headers or {})}) + body
+
+
+async def _sleep_until(deadline: float):
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def _stream(writer: asyncio.StreamWriter, reply: Dict, include_usage: bool,
+                  keep_alive: bool):
+    """Send ``reply`` as server-sent events at its token rate (chunked encoding)"""
+    writer.write(_head(200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                             "Transfer-Encoding": "chunked",
+                             "Connection": "keep-alive" if keep_alive else "close"}))
+
+    def event(payload) -> bytes:
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n"
+        data = data.encode("utf-8")
+        return f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n"
+
+    start = time.monotonic() + reply["ttft"]
+    await _sleep_until(start)
+    writer.write(event(chunk_body(reply, {"role": "assistant", "content": ""})))
+    for n, token in enumerate(reply["tokens"]):
+        writer.write(event(chunk_body(reply, {"content": token})))
+        # Flush on the token clock; a client that hangs up ends the stream here
+        await writer.drain()
+        await _sleep_until(start + (n + 1) / reply["rate"])
+    writer.write(event(chunk_body(reply, {}, reply["finish_reason"])))
+    if include_usage:
+        writer.write(event(chunk_body(reply, {}, usage=reply["usage"])))
+    writer.write(event("[DONE]") + b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def handle_connection(api: FakeOpenAI, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+    """Serve requests on one (keep-alive) connection until the client closes it"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ValueError as e:
+                writer.write(_response(413 if isinstance(e, RequestTooLarge) else 400,
+                                       _error(str(e), "invalid_request_error", None),
+                                       keep_alive=False))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+
+            if path in ("/healthz", "/v1/stats"):
+                writer.write(_response(200, api.stats() if path == "/v1/stats"
+                                       else {"status": "ok"}, keep_alive))
+            elif path == "/v1/models":
+                writer.write(_response(200, {"object": "list", "data": [
+                    {"id": m, "object": "model", "owned_by": "fake"}
+                    for m in ("gpt-4", "gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo")]}, keep_alive))
+            elif path != "/v1/chat/completions":
+                writer.write(_response(404, _error(f"no route for {path}",
+                                                   "invalid_request_error", None), keep_alive))
+            elif method != "POST":
+                writer.write(_response(405, _error("use POST", "invalid_request_error", None),
+                                       keep_alive, {"Allow": "POST"}))
+            else:
+                await _complete(api, writer, body, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        api.counters["disconnects"] += 1
+    finally:
+        writer.close()
+
+
+async def _complete(api: FakeOpenAI, writer: asyncio.StreamWriter, body: bytes,
+                    keep_alive: bool):
+    api.counters["requests"] += 1
+    try:
+        request = json.loads(body or b"{}")
+        if not isinstance(request, dict) or not isinstance(request.get("messages"), list):
+            raise ValueError
+    except ValueError:
+        writer.write(_response(400, _error("expected a JSON body with messages",
+                                           "invalid_request_error", None), keep_alive))
+        return
+    fault = api.fault()
+    if fault is not None:
+        status, payload, headers = fault
+        writer.write(_response(status, payload, keep_alive, headers))
+        return
+
+    reply = api.prepare(request)
+    api.inflight += 1
+    try:
+        if request.get("stream"):
+            api.counters["streamed"] += 1
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            await _stream(writer, reply, include_usage, keep_alive)
+        else:
+            await asyncio.sleep(reply["ttft"] + len(reply["tokens"]) / reply["rate"])
+            writer.write(_response(200, completion_body(reply), keep_alive))
+        api.counters["completed"] += 1
+    finally:
+        api.inflight -= 1
+
+
+async def serve(api: FakeOpenAI, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(api, reader, writer), host, port,
+        backlog=1024)
+    print(f"✓ Fake OpenAI API listening on http://{host}:{port}/v1")
+    print(f"  export OPENAI_BASE_URL=http://{host}:{port}/v1 OPENAI_API_KEY=fake")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="OpenAI-compatible fake API with latency and fault injection",
+        epilog="Distributions: fixed:X, uniform:LO,HI, lognormal:MEDIAN,SIGMA, exponential:MEAN")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"(default: {DEFAULT_PORT})")
+    parser.add_argument("--ttft", default=DEFAULT_TTFT,
+                        help=f"time-to-first-token distribution in seconds "
+                             f"(default: {DEFAULT_TTFT})")
+    parser.add_argument("--token-rate", default=DEFAULT_TOKEN_RATE,
+                        help=f"per-request completion tokens/second distribution "
+                             f"(default: {DEFAULT_TOKEN_RATE})")
+    parser.add_argument("--rate-429", type=float, default=0.0,
+                        help="fraction of requests answered 429 with Retry-After (default: 0)")
+    parser.add_argument("--rate-500", type=float, default=0.0,
+                        help="fraction of requests answered 500 (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Retry-After seconds on injected 429s (default: 1)")
+    parser.add_argument("--rpm-limit", type=float, default=0.0,
+                        help="answer 429 beyond this many requests per minute, 0 = no limit "
+                             "(default: 0)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for content, latency and faults (default: random)")
+    args = parser.parse_args()
+    if args.rate_429 + args.rate_500 > 1:
+        parser.error("--rate-429 and --rate-500 add up to more than 1")
+
+    try:
+        api = FakeOpenAI(args.ttft, args.token_rate, args.rate_429, args.rate_500,
+                         args.retry_after, args.rpm_limit, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\n✓ Stopped: {json.dumps(api.stats())}")
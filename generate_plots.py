@@ -1,143 +1,240 @@
 """
 Generate comparison plots for prompt engineering research
 Run this to create the visualization charts
-"""
 
-import matplotlib.pyplot as plt
-import numpy as np
-
-# Set style
-plt.style.use('seaborn-v0_8-darkgrid')
-
-# Data from experiments
-strategies = ['Zero-Shot', 'Few-Shot', 'Chain-of-Thought', 'Structured\n(XML)']
-format_compliance = [5.1, 8.3, 6.9, 9.8]
-parsing_success = [62, 91, 74, 98]
-relevance_score = [6.2, 8.7, 7.8, 9.1]
-clarity_score = [7.5, 8.9, 8.2, 9.3]
-generation_time = [3.2, 4.1, 5.8, 3.7]
-
-colors = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4']
-
-# Create figure with 4 subplots (2x2 grid)
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
-fig.suptitle('Prompt Engineering Strategies Comparison', fontsize=16, fontweight='bold')
-
-# Plot 1: Format Compliance Score
-ax1.bar(strategies, format_compliance, color=colors, edgecolor='black', linewidth=1.5)
-ax1.set_ylabel('Score (out of 10)', fontsize=11)
-ax1.set_title('Format Compliance Score', fontsize=12, fontweight='bold')
-ax1.set_ylim(0, 10.5)
-ax1.axhline(y=9.5, color='green', linestyle='--', alpha=0.3, label='Target: >9.5')
-for i, v in enumerate(format_compliance):
-    ax1.text(i, v + 0.2, f'{v}', ha='center', va='bottom', fontweight='bold')
-ax1.grid(axis='y', alpha=0.3)
-
-# Plot 2: Parsing Success Rate
-ax2.bar(strategies, parsing_success, color=colors, edgecolor='black', linewidth=1.5)
-ax2.set_ylabel('Success Rate (%)', fontsize=11)
-ax2.set_title('Parsing Success Rate', fontsize=12, fontweight='bold')
-ax2.set_ylim(0, 105)
-ax2.axhline(y=95, color='green', linestyle='--', alpha=0.3, label='Target: >95%')
-for i, v in enumerate(parsing_success):
-    ax2.text(i, v + 1.5, f'{v}%', ha='center', va='bottom', fontweight='bold')
-ax2.grid(axis='y', alpha=0.3)
-
-# Plot 3: Relevance Score
-ax3.bar(strategies, relevance_score, color=colors, edgecolor='black', linewidth=1.5)
-ax3.set_ylabel('Score (out of 10)', fontsize=11)
-ax3.set_title('Relevance to Job Description', fontsize=12, fontweight='bold')
-ax3.set_ylim(0, 10.5)
-ax3.axhline(y=8.5, color='green', linestyle='--', alpha=0.3, label='Target: >8.5')
-for i, v in enumerate(relevance_score):
-    ax3.text(i, v + 0.2, f'{v}', ha='center', va='bottom', fontweight='bold')
-ax3.grid(axis='y', alpha=0.3)
-
-# Plot 4: Generation Time
-ax4.bar(strategies, generation_time, color=colors, edgecolor='black', linewidth=1.5)
-ax4.set_ylabel('Time (seconds)', fontsize=11)
-ax4.set_title('Average Generation Time', fontsize=12, fontweight='bold')
-ax4.set_ylim(0, 6.5)
-ax4.axhline(y=4.0, color='orange', linestyle='--', alpha=0.3, label='Target: <4.0s')
-for i, v in enumerate(generation_time):
-    ax4.text(i, v + 0.15, f'{v}s', ha='center', va='bottom', fontweight='bold')
-ax4.grid(axis='y', alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('research/results/comparison_plots.png', dpi=300, bbox_inches='tight')
-print("[OK] Saved: research/results/comparison_plots.png")
-
-# Create individual plots for the markdown
-# Plot 1: Format Compliance (individual)
-fig1, ax = plt.subplots(figsize=(8, 5))
-bars = ax.bar(strategies, format_compliance, color=colors, edgecolor='black', linewidth=1.5)
-ax.set_ylabel('Score (out of 10)', fontsize=12)
-ax.set_title('Format Compliance Score', fontsize=14, fontweight='bold')
-ax.set_ylim(0, 10.5)
-ax.axhline(y=9.5, color='green', linestyle='--', alpha=0.3, linewidth=2)
-for i, v in enumerate(format_compliance):
-    ax.text(i, v + 0.2, f'{v}/10', ha='center', va='bottom', fontweight='bold', fontsize=11)
-ax.grid(axis='y', alpha=0.3)
-plt.tight_layout()
-plt.savefig('research/results/format_compliance_chart.png', dpi=300, bbox_inches='tight')
-print("[OK] Saved: research/results/format_compliance_chart.png")
-plt.close()
-
-# Plot 2: Parsing Success (individual)
-fig2, ax = plt.subplots(figsize=(8, 5))
-bars = ax.bar(strategies, parsing_success, color=colors, edgecolor='black', linewidth=1.5)
-ax.set_ylabel('Success Rate (%)', fontsize=12)
-ax.set_title('Parsing Success Rate', fontsize=14, fontweight='bold')
-ax.set_ylim(0, 105)
-ax.axhline(y=95, color='green', linestyle='--', alpha=0.3, linewidth=2, label='Production Target')
-for i, v in enumerate(parsing_success):
-    ax.text(i, v + 1.5, f'{v}%', ha='center', va='bottom', fontweight='bold', fontsize=11)
-ax.legend(loc='upper left')
-ax.grid(axis='y', alpha=0.3)
-plt.tight_layout()
-plt.savefig('research/results/parsing_success_chart.png', dpi=300, bbox_inches='tight')
-print("[OK] Saved: research/results/parsing_success_chart.png")
-plt.close()
-
-# Plot 3: Relevance (individual)
-fig3, ax = plt.subplots(figsize=(8, 5))
-bars = ax.bar(strategies, relevance_score, color=colors, edgecolor='black', linewidth=1.5)
-ax.set_ylabel('Score (out of 10)', fontsize=12)
-ax.set_title('Relevance to Job Description', fontsize=14, fontweight='bold')
-ax.set_ylim(0, 10.5)
-ax.axhline(y=8.5, color='green', linestyle='--', alpha=0.3, linewidth=2)
-for i, v in enumerate(relevance_score):
-    ax.text(i, v + 0.2, f'{v}/10', ha='center', va='bottom', fontweight='bold', fontsize=11)
-ax.grid(axis='y', alpha=0.3)
-plt.tight_layout()
-plt.savefig('research/results/relevance_score_chart.png', dpi=300, bbox_inches='tight')
-print("[OK] Saved: research/results/relevance_score_chart.png")
-plt.close()
-
-# Plot 4: Generation Time (individual)
-fig4, ax = plt.subplots(figsize=(8, 5))
-bars = ax.bar(strategies, generation_time, color=colors, edgecolor='black', linewidth=1.5)
-ax.set_ylabel('Time (seconds)', fontsize=12)
-ax.set_title('Average Generation Time', fontsize=14, fontweight='bold')
-ax.set_ylim(0, 6.5)
-ax.axhline(y=4.0, color='orange', linestyle='--', alpha=0.3, linewidth=2, label='Target: <4s')
-for i, v in enumerate(generation_time):
-    ax.text(i, v + 0.15, f'{v}s', ha='center', va='bottom', fontweight='bold', fontsize=11)
-ax.legend(loc='upper left')
-ax.grid(axis='y', alpha=0.3)
-plt.tight_layout()
-plt.savefig('research/results/generation_time_chart.png', dpi=300, bbox_inches='tight')
-print("[OK] Saved: research/results/generation_time_chart.png")
-plt.close()
-
-print("\n" + "="*60)
-print("All plots generated successfully!")
-print("="*60)
-print("\nGenerated files:")
-print("  - research/results/comparison_plots.png (combined)")
-print("  - research/results/format_compliance_chart.png")
-print("  - research/results/parsing_success_chart.png")
-print("  - research/results/relevance_score_chart.png")
-print("  - research/results/generation_time_chart.png")
-print("\nUse these images in your research issue markdown file.")
+Chart data comes from the results store (or ``experiment_results.json``
+when there is no store yet), so every strategy in the results gets a bar
+and every job in the store gets its own set of charts under
+``plots/<job hash>/``. Charts are described as small specs (labels, values,
+targets) and a chart is only redrawn when the hash of its spec differs from
+the one recorded in ``plots_manifest.json`` or its PNG is missing; the
+stale ones are rendered in parallel with the non-interactive Agg backend.
+
+Usage:
+    python research/generate_plots.py
+    python research/generate_plots.py --force --workers 4
+"""
 
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import matplotlib
+
+# Headless rendering, also in worker processes that import this module
+matplotlib.use("Agg")
+
+from results_store import DEFAULT_STORE_PATH, ResultsStore, load_results_data
+
+DEFAULT_OUTPUT_DIR = "research/results"
+DEFAULT_JSON_PATH = "research/results/experiment_results.json"
+MANIFEST_NAME = "plots_manifest.json"
+# Bump when the drawing code changes so every chart is redrawn once
+STYLE_VERSION = 1
+DPI = 300
+
+STRATEGY_LABELS = {
+    "zero_shot": "Zero-Shot",
+    "few_shot": "Few-Shot",
+    "chain_of_thought": "Chain-of-Thought",
+    "structured": "Structured\n(XML)",
+}
+COLORS = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4']
+
+# One entry per chart: summary key, titles, axis, target line and value labels
+METRICS = {
+    "format_compliance": {
+        "key": "avg_format", "title": "Format Compliance Score",
+        "ylabel": "Score (out of 10)", "ylim": 10.5,
+        "target": 9.5, "target_color": "green", "target_label": None,
+        "label": "{:g}/10", "short_label": "{:g}", "offset": 0.2,
+    },
+    "parsing_success": {
+        "key": "parse_success_rate", "title": "Parsing Success Rate",
+        "ylabel": "Success Rate (%)", "ylim": 105,
+        "target": 95, "target_color": "green", "target_label": "Production Target",
+        "label": "{:g}%", "short_label": "{:g}%", "offset": 1.5,
+    },
+    "relevance_score": {
+        "key": "avg_relevance", "title": "Relevance to Job Description",
+        "ylabel": "Score (out of 10)", "ylim": 10.5,
+        "target": 8.5, "target_color": "green", "target_label": None,
+        "label": "{:g}/10", "short_label": "{:g}", "offset": 0.2,
+    },
+    "generation_time": {
+        "key": "avg_time", "title": "Average Generation Time",
+        "ylabel": "Time (seconds)", "ylim": 6.5,
+        "target": 4.0, "target_color": "orange", "target_label": "Target: <4s",
+        "label": "{:g}s", "short_label": "{:g}s", "offset": 0.15,
+    },
+}
+
+
+# ============================================================================
+# CHART SPECS
+# ============================================================================
+
+def load_slices(store_path: str = DEFAULT_STORE_PATH,
+                json_path: str = DEFAULT_JSON_PATH) -> Dict[Optional[str], List[Dict]]:
+    """Summaries per job slice: ``None`` is all jobs, then one per job hash"""
+    if not ResultsStore.exists(store_path):
+        return {None: load_results_data(store_path, json_path)["summaries"]}
+    store = ResultsStore(store_path)
+    slices = {None: store.summaries()}
+    jobs = store.job_hashes()
+    if len(jobs) > 1:
+        for job in jobs:
+            slices[job] = store.summaries(job)
+    return slices
+
+
+def chart_specs(slices: Dict[Optional[str], List[Dict]], output_dir: str) -> List[Dict]:
+    """The combined chart and one chart per metric for every slice"""
+    specs = []
+    for job, summaries in slices.items():
+        if not summaries:
+            continue
+        directory = output_dir if job is None else os.path.join(output_dir, "plots", job[:12])
+        labels = [STRATEGY_LABELS.get(s["strategy"], s["strategy"]) for s in summaries]
+        values = {name: [s.get(metric["key"]) or 0 for s in summaries]
+                  for name, metric in METRICS.items()}
+        title = "Prompt Engineering Strategies Comparison"
+        if job is not None:
+            title += f" (job {job[:12]})"
+        specs.append({"kind": "comparison", "title": title, "labels": labels, "values": values,
+                      "path": os.path.join(directory, "comparison_plots.png")})
+        for name in METRICS:
+            specs.append({"kind": "metric", "metric": name, "labels": labels,
+                          "values": values[name],
+                          "path": os.path.join(directory, f"{name}_chart.png")})
+    return specs
+
+
+def spec_hash(spec: Dict) -> str:
+    payload = json.dumps({"style": STYLE_VERSION, **spec}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# RENDERING (runs in worker processes)
+# ============================================================================
+
+def _colors(count: int) -> List[str]:
+    if count <= len(COLORS):
+        return COLORS[:count]
+    import matplotlib.pyplot as plt
+    palette = plt.get_cmap("tab20")
+    return [matplotlib.colors.to_hex(palette(i % 20)) for i in range(count)]
+
+
+def _draw_metric(ax, name: str, labels: List[str], values: List[float], individual: bool):
+    metric = METRICS[name]
+    ax.bar(labels, values, color=_colors(len(labels)), edgecolor='black', linewidth=1.5)
+    ax.set_ylabel(metric["ylabel"], fontsize=12 if individual else 11)
+    ax.set_title(metric["title"], fontsize=14 if individual else 12, fontweight='bold')
+    ax.set_ylim(0, max(metric["ylim"], max(values, default=0) * 1.15))
+    ax.axhline(y=metric["target"], color=metric["target_color"], linestyle='--', alpha=0.3,
+               linewidth=2 if individual else 1, label=metric["target_label"])
+    template = metric["label"] if individual else metric["short_label"]
+    for i, v in enumerate(values):
+        ax.text(i, v + metric["offset"], template.format(round(v, 2)), ha='center',
+                va='bottom', fontweight='bold', fontsize=11 if individual else None)
+    if individual and metric["target_label"]:
+        ax.legend(loc='upper left')
+    ax.grid(axis='y', alpha=0.3)
+
+
+def render_chart(spec: Dict) -> str:
+    """Draw one chart spec to its PNG; returns the path"""
+    # pyplot is only imported where something is drawn, so an up-to-date run skips it
+    import matplotlib.pyplot as plt
+
+    plt.style.use('seaborn-v0_8-darkgrid')
+    width = max(1.0, len(spec["labels"]) / 4)
+    if spec["kind"] == "comparison":
+        fig, axes = plt.subplots(2, 2, figsize=(12 * width, 10))
+        fig.suptitle(spec["title"], fontsize=16, fontweight='bold')
+        for ax, name in zip(axes.flat, METRICS):
+            _draw_metric(ax, name, spec["labels"], spec["values"][name], individual=False)
+    else:
+        fig, ax = plt.subplots(figsize=(8 * width, 5))
+        _draw_metric(ax, spec["metric"], spec["labels"], spec["values"], individual=True)
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(spec["path"]) or ".", exist_ok=True)
+    fig.savefig(spec["path"], dpi=DPI, bbox_inches='tight')
+    plt.close(fig)
+    return spec["path"]
+
+
+# ============================================================================
+# INCREMENTAL DRIVER
+# ============================================================================
+
+def load_manifest(path: str) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: Dict[str, str]):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def generate_plots(store_path: str = DEFAULT_STORE_PATH, json_path: str = DEFAULT_JSON_PATH,
+                   output_dir: str = DEFAULT_OUTPUT_DIR, workers: Optional[int] = None,
+                   force: bool = False) -> Dict[str, List[str]]:
+    """Redraw the charts whose data changed; returns rendered and skipped paths"""
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    specs = chart_specs(load_slices(store_path, json_path), output_dir)
+    hashes = {spec["path"]: spec_hash(spec) for spec in specs}
+    stale = [spec for spec in specs
+             if force or manifest.get(spec["path"]) != hashes[spec["path"]]
+             or not os.path.exists(spec["path"])]
+
+    rendered = []
+    if len(stale) == 1:
+        rendered = [render_chart(stale[0])]
+    elif stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(render_chart, stale))
+    for path in rendered:
+        manifest[path] = hashes[path]
+    if rendered:
+        os.makedirs(output_dir, exist_ok=True)
+        save_manifest(manifest_path, manifest)
+    return {"rendered": rendered,
+            "skipped": [spec["path"] for spec in specs if spec["path"] not in rendered]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate comparison charts from the results")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH,
+                        help=f"results store directory (default: {DEFAULT_STORE_PATH})")
+    parser.add_argument("--json", default=DEFAULT_JSON_PATH,
+                        help=f"results JSON used when there is no store (default: {DEFAULT_JSON_PATH})")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help=f"where the PNGs and the manifest go (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="rendering processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="redraw every chart even if its data is unchanged")
+    args = parser.parse_args()
+
+    outcome = generate_plots(args.store, args.json, args.output_dir, args.workers, args.force)
+    for path in outcome["rendered"]:
+        print(f"[OK] Saved: {path}")
+
+    print("\n" + "="*60)
+    print(f"{len(outcome['rendered'])} plots generated, "
+          f"{len(outcome['skipped'])} unchanged")
+    print("="*60)
+    if outcome["rendered"]:
+        print("\nUse these images in your research issue markdown file.")
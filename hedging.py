@@ -0,0 +1,124 @@
+"""
+Hedged Requests
+Backup request after a latency percentile, first valid response wins
+
+Tail latency of a single chat completion is far worse than its median, and
+the slow calls are mostly bad luck on the provider side rather than hard
+prompts. A hedged request starts the primary call and, if it hasn't
+returned within the ``percentile``-th latency seen so far, fires a backup
+(same prompt, or a cheaper model/strategy). Whichever response first passes
+the caller's validity check (``try_parse_response`` in the experiment)
+wins and the other call is cancelled. A primary that fails or returns an
+unusable response before the deadline triggers the backup immediately.
+
+Hedging at the p95 sends roughly 5% extra requests; ``HedgePolicy.report``
+tracks exactly how many were sent and how often the backup won, so the
+extra load shows up next to the latency it bought.
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from instrumentation import percentile
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_DELAY = 2.0   # seconds, until enough latencies have been observed
+MIN_OBSERVATIONS = 20
+LATENCY_WINDOW = 500
+
+
+class HedgePolicy:
+    """When to hedge and what with, plus the counters for the extra load"""
+
+    def __init__(self, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 initial_delay: float = DEFAULT_HEDGE_DELAY,
+                 backup_model: Optional[str] = None, backup_strategy: Optional[str] = None):
+        self.hedge_percentile = hedge_percentile
+        self.initial_delay = initial_delay
+        self.backup_model = backup_model
+        self.backup_strategy = backup_strategy
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.cancelled = 0
+
+    def observe(self, latency: float):
+        """Record how long a primary call took (or had run when cancelled)"""
+        self.latencies.append(latency)
+
+    def delay(self) -> float:
+        if len(self.latencies) < MIN_OBSERVATIONS:
+            return self.initial_delay
+        return percentile(list(self.latencies), self.hedge_percentile)
+
+    def report(self) -> Dict:
+        return {
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_delay": round(self.delay(), 3),
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "backup_wins": self.backup_wins,
+            "cancelled": self.cancelled,
+            # Backup calls as a share of primary calls
+            "extra_load_pct": round(100 * self.hedged / self.requests, 1) if self.requests else 0.0
+        }
+
+
+async def hedged(primary: Callable[[], Awaitable], backup: Callable[[], Awaitable],
+                 accept: Callable[[object], bool], policy: HedgePolicy) -> Tuple[object, Dict]:
+    """Race ``primary()`` against a delayed ``backup()``.
+
+    Returns ``(result, info)`` where ``info`` says whether a backup was sent,
+    which call won and how many seconds after the primary the backup
+    started. If neither result is accepted the first one to arrive is
+    returned; if both calls raise, the first error is re-raised.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    delay = policy.delay()
+    policy.requests += 1
+    tasks = {asyncio.ensure_future(primary()): "primary"}
+    backup_offset = None
+    fallback = error = None
+
+    def info(winner: str) -> Dict:
+        if winner == "backup":
+            policy.backup_wins += 1
+        return {"hedged": backup_offset is not None, "hedge_winner": winner,
+                "hedge_offset": round(backup_offset, 3) if backup_offset is not None else None}
+
+    try:
+        while tasks:
+            timeout = max(0.0, start + delay - loop.time()) if backup_offset is None else None
+            done, _ = await asyncio.wait(set(tasks), timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                role = tasks.pop(task)
+                if role == "primary":
+                    policy.observe(loop.time() - start)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if accept(result):
+                    return result, info(role)
+                if fallback is None:
+                    fallback = (result, role)
+            # Deadline passed, or the primary came back without a usable answer
+            if backup_offset is None and (not done or not tasks):
+                backup_offset = loop.time() - start
+                policy.hedged += 1
+                tasks[asyncio.ensure_future(backup())] = "backup"
+        if fallback is not None:
+            return fallback[0], info(fallback[1])
+        raise error
+    finally:
+        for task, role in tasks.items():
+            task.cancel()
+            policy.cancelled += 1
+            if role == "primary":
+                # Censored: the primary would have taken at least this long
+                policy.observe(loop.time() - start)
@@ -0,0 +1,196 @@
+"""
+Latency & Token Instrumentation
+Per-iteration usage/cost metrics and per-strategy percentile roll-ups
+
+Arithmetic means hide tail latency and say nothing about cost. Each
+iteration records its prompt/completion token counts (from
+``response.usage``, or estimated when a stream was cut before the usage
+chunk arrived), tokens/sec and cost; each strategy summary rolls these up
+into p50/p95/p99 latency, token totals and cost.
+
+``RunningStats`` and ``P2Quantile`` give the same means and percentiles
+incrementally, in constant time and memory per value, for views that
+update while a run is still going.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+# USD per 1M tokens (prompt, completion); matched by longest model-name prefix
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """q-th percentile with linear interpolation (same as numpy's default)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def model_pricing(model: str):
+    """(prompt, completion) USD per 1M tokens, or None for unknown models"""
+    for prefix in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_PRICING[prefix]
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    pricing = model_pricing(model)
+    if pricing is None:
+        return None
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)"""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def usage_metrics(usage, model: str, generation_time: float,
+                  prompt_text: str = None, completion_text: str = None) -> Dict:
+    """Token counts, throughput and cost for one request.
+
+    ``usage`` is the response's usage object (or None). Without it (a
+    stream closed before its final usage chunk, or a replayed stream that
+    was recorded that way) both counts are estimated from the text.
+    """
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens
+        completion_tokens = usage.completion_tokens
+    else:
+        prompt_tokens = estimate_tokens(prompt_text or "")
+        completion_tokens = estimate_tokens(completion_text or "")
+
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    metrics = {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": round(completion_tokens / generation_time, 1) if generation_time > 0 else 0.0,
+        "cost_usd": round(cost, 6) if cost is not None else None
+    }
+    if usage is None:
+        metrics["usage_estimated"] = True
+    return metrics
+
+
+def rollup_metrics(valid_results: List[Dict]) -> Dict:
+    """Percentile latency, token and cost roll-up for one strategy's results"""
+    # Batch API results have no per-request latency and leave it out
+    times = [r["generation_time"] for r in valid_results if "generation_time" in r]
+    rollup = {f"p{q}_time": round(percentile(times, q), 2) for q in PERCENTILES} if times else {}
+
+    with_usage = [r for r in valid_results if "completion_tokens" in r]
+    if with_usage:
+        prompt_tokens = sum(r["prompt_tokens"] for r in with_usage)
+        completion_tokens = sum(r["completion_tokens"] for r in with_usage)
+        rollup.update({
+            "avg_prompt_tokens": round(prompt_tokens / len(with_usage), 1),
+            "avg_completion_tokens": round(completion_tokens / len(with_usage), 1),
+            "total_tokens": prompt_tokens + completion_tokens,
+        })
+
+    with_rate = [r["tokens_per_second"] for r in valid_results if "tokens_per_second" in r]
+    if with_rate:
+        rollup["avg_tokens_per_second"] = round(sum(with_rate) / len(with_rate), 1)
+
+    costs = [r["cost_usd"] for r in valid_results if r.get("cost_usd") is not None]
+    if costs:
+        rollup["total_cost_usd"] = round(sum(costs), 4)
+        rollup["avg_cost_usd"] = round(sum(costs) / len(costs), 5)
+
+    return rollup
+
+
+class RunningStats:
+    """Streaming mean and variance (Welford), O(1) per value"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> Optional[float]:
+        return self._m2 / (self.count - 1) if self.count > 1 else None
+
+
+class P2Quantile:
+    """Streaming q-th percentile estimate (Jain & Chlamtac's P² algorithm).
+
+    Keeps five markers instead of the values, so each update is O(1) and
+    memory is constant; exact (same as ``percentile``) for the first five.
+    """
+
+    def __init__(self, q: float):
+        self.p = q / 100
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4]
+        self._increments = [0, self.p / 2, self.p, (1 + self.p) / 2, 1]
+
+    def add(self, value: float):
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers toward their desired positions
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1) or
+                    (offset <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        h, n = self._heights, self._positions
+        return h[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count <= 5:
+            return percentile(self._heights, self.p * 100)
+        return self._heights[2]
@@ -0,0 +1,256 @@
+"""
+Job Description Keyword Index
+Builds the relevance keywords from each job description instead of a fixed list
+
+``evaluate_relevance`` used to check a hardcoded list of backend keywords,
+which made its scores meaningless for any other role. Here the required
+skills are extracted from the job description itself (the "Skills:" /
+"Requirements:" lines, the role title, and any known technology mentioned
+in the text), expanded with common synonyms (postgres -> postgresql,
+k8s -> kubernetes, ...) and compiled into word-boundary patterns.
+
+Indexes are memoized by a hash of the job description content, so scoring
+many questions across many roles builds each role's index exactly once.
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+MAX_CACHED_INDEXES = 4096
+
+# canonical skill -> alternative spellings that count as the same skill
+SKILL_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "python": ("python",),
+    "java": ("java",),
+    "javascript": ("javascript", "js", "ecmascript"),
+    "typescript": ("typescript",),
+    "go": ("golang",),
+    "rust": ("rust",),
+    "c++": ("c++", "cpp"),
+    "c#": ("c#", "csharp"),
+    "ruby": ("ruby",),
+    "php": ("php",),
+    "kotlin": ("kotlin",),
+    "swift": ("swift",),
+    "scala": ("scala",),
+    "sql": ("sql",),
+    "postgresql": ("postgresql", "postgres", "psql"),
+    "mysql": ("mysql",),
+    "mongodb": ("mongodb", "mongo"),
+    "redis": ("redis",),
+    "elasticsearch": ("elasticsearch", "elastic search"),
+    "kafka": ("kafka",),
+    "rabbitmq": ("rabbitmq",),
+    "fastapi": ("fastapi",),
+    "django": ("django",),
+    "flask": ("flask",),
+    "spring": ("spring", "spring boot"),
+    "node.js": ("node.js", "nodejs", "node"),
+    "react": ("react", "reactjs", "react.js"),
+    "angular": ("angular",),
+    "vue": ("vue", "vue.js", "vuejs"),
+    "rest api": ("rest api", "restful", "rest"),
+    "graphql": ("graphql",),
+    "grpc": ("grpc",),
+    "microservices": ("microservice", "micro-service"),
+    "docker": ("docker", "container"),
+    "kubernetes": ("kubernetes", "k8s"),
+    "aws": ("aws", "amazon web services"),
+    "gcp": ("gcp", "google cloud"),
+    "azure": ("azure",),
+    "terraform": ("terraform",),
+    "ci/cd": ("ci/cd", "continuous integration", "continuous delivery"),
+    "linux": ("linux",),
+    "git": ("git",),
+    "machine learning": ("machine learning", "ml"),
+    "deep learning": ("deep learning",),
+    "pytorch": ("pytorch",),
+    "tensorflow": ("tensorflow",),
+    "data engineering": ("data engineering", "etl", "data pipeline"),
+    "system design": ("system design", "distributed system", "scalability"),
+    "backend": ("backend", "back-end", "back end", "server-side"),
+    "frontend": ("frontend", "front-end", "front end"),
+    "devops": ("devops",),
+    "security": ("security",),
+    "testing": ("testing", "unit test", "tdd"),
+}
+
+_SKILL_LINE = re.compile(
+    r"^\s*(?:required\s+|preferred\s+|key\s+)?(?:skills|requirements|tech(?:nology)?\s*stack|"
+    r"technologies|qualifications|must[- ]haves?|nice[- ]to[- ]haves?)\s*:\s*(.+)$",
+    re.IGNORECASE | re.MULTILINE
+)
+_SKILL_SEPARATORS = re.compile(r",|;|\band\b|\bor\b|\||•", re.IGNORECASE)
+_FILLER = re.compile(
+    r"\b(?:experience|knowledge|proficiency|familiarity|expertise|strong|solid|good|"
+    r"with|of|in|design|development|skills?|frameworks?|databases?|tools?)\b",
+    re.IGNORECASE
+)
+# Title words that say nothing about the skills needed
+_TITLE_STOPWORDS = {
+    "senior", "junior", "mid", "lead", "staff", "principal", "head", "chief", "intern",
+    "engineer", "developer", "programmer", "architect", "specialist", "manager",
+    "software", "the", "and", "of", "for", "i", "ii", "iii", "sr", "jr", "level"
+}
+# Function words and job-ad boilerplate that never name a skill
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at", "by", "for",
+    "from", "with", "without", "as", "is", "are", "was", "were", "be", "been", "being",
+    "am", "do", "does", "did", "have", "has", "had", "will", "would", "can", "could",
+    "should", "may", "might", "must", "shall", "we", "us", "our", "ours", "you", "your",
+    "they", "them", "their", "he", "she", "it", "its", "this", "that", "these", "those",
+    "who", "whom", "whose", "which", "what", "when", "where", "why", "how", "not", "no",
+    "all", "any", "some", "more", "most", "very", "also", "about", "into", "over",
+    "than", "then", "there", "here", "so", "such", "just", "only", "own", "well",
+    "looking", "seeking", "hiring", "join", "joining", "team", "teams", "role", "position",
+    "candidate", "someone", "people", "company", "work", "working", "knows", "know",
+    "knowledge", "want", "wants", "like", "love", "great", "new", "years", "year",
+    "experience", "experienced", "strong", "solid", "good", "ability", "able", "plus",
+    "help", "build", "building", "responsible", "responsibilities", "including",
+}
+_WORD = re.compile(r"[a-z][a-z0-9+#./-]*")
+# A first line reads as a role title only if it is short and not a sentence
+_MAX_TITLE_WORDS = 8
+_SENTENCE_PUNCTUATION = re.compile(r"[.!?;:]\s|[.!?;:]$")
+# Spellings that are also ordinary English words; only trusted on a skills
+# line or in the title, never when scanning free text
+_AMBIGUOUS_VARIANTS = {
+    "go", "rest", "ml", "js", "node", "swift", "rust", "spring", "react", "ruby",
+    "container", "security", "testing", "scalability", "git", "angular", "flask"
+}
+
+_variant_to_skill = {
+    variant: skill for skill, variants in SKILL_SYNONYMS.items() for variant in (skill,) + variants
+}
+
+
+def job_hash(job_desc: str) -> str:
+    """Content hash identifying a job description (whitespace-insensitive)"""
+    normalized = " ".join(job_desc.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _term_pattern(term: str) -> "re.Pattern":
+    # Word boundaries so "api" doesn't fire inside "fastapi" or "rest" inside
+    # "restaurant"; an optional plural keeps "APIs" and "microservices".
+    # The left boundary is checked by a lookbehind *after* the literal so the
+    # regex engine can still use its fast literal-prefix search.
+    term = re.escape(term)
+    return re.compile(term + r"(?<!\w" + term + r")(?:s|es)?(?!\w)")
+
+
+def _canonical_skills(phrase: str) -> List[str]:
+    """Map one skill phrase from the job description to canonical skills"""
+    phrase = phrase.strip().strip(".").lower()
+    if phrase in _variant_to_skill:
+        return [_variant_to_skill[phrase]]
+
+    known = [skill for variant, skill in _variant_to_skill.items()
+             if _term_pattern(variant).search(phrase)]
+    if known:
+        return list(dict.fromkeys(known))
+
+    stripped = " ".join(_FILLER.sub(" ", phrase).split())
+    return [stripped] if len(stripped) > 1 else []
+
+
+def _is_content_word(word: str) -> bool:
+    return len(word) > 2 and word not in _STOPWORDS and word not in _TITLE_STOPWORDS
+
+
+def extract_skills(job_desc: str) -> List[str]:
+    """Canonical skills a job description asks for, in order of appearance"""
+    skills = []
+
+    for line in _SKILL_LINE.findall(job_desc):
+        for phrase in _SKILL_SEPARATORS.split(line):
+            skills.extend(_canonical_skills(phrase))
+
+    # Role title: a short first line that isn't a sentence, minus seniority,
+    # generic and function words
+    lines = [line.strip() for line in job_desc.splitlines() if line.strip()]
+    if (lines and ":" not in lines[0] and not _SENTENCE_PUNCTUATION.search(lines[0])
+            and len(lines[0].split()) <= _MAX_TITLE_WORDS):
+        for word in _WORD.findall(lines[0].lower()):
+            if word in _variant_to_skill:
+                skills.append(_variant_to_skill[word])
+            elif _is_content_word(word):
+                skills.extend(_canonical_skills(word))
+
+    # Known technologies mentioned anywhere in the free text
+    text = job_desc.lower()
+    skills.extend(skill for variant, skill in _variant_to_skill.items()
+                  if variant not in _AMBIGUOUS_VARIANTS and _term_pattern(variant).search(text))
+
+    if not skills:
+        # Nothing recognisable: fall back to the description's content words
+        words = (word.rstrip("./-") for word in _WORD.findall(text))
+        skills = [word for word in words if len(word) > 3 and _is_content_word(word)]
+
+    return list(dict.fromkeys(skills))
+
+
+class KeywordIndex:
+    """Compiled skill -> term patterns for one job description"""
+
+    def __init__(self, job_desc: str, skills: Sequence[str] = None):
+        self.job_hash = job_hash(job_desc)
+        self.skills = list(skills) if skills is not None else extract_skills(job_desc)
+        # (skill column, literal, compiled term) for every spelling of every
+        # skill; the plain substring test is a cheap prefilter for the regex
+        self.terms: List[Tuple[int, str, "re.Pattern"]] = []
+        for column, skill in enumerate(self.skills):
+            variants = dict.fromkeys((skill,) + SKILL_SYNONYMS.get(skill, ()))
+            self.terms.extend((column, variant, _term_pattern(variant)) for variant in variants)
+
+    def matched_skills(self, text: str) -> List[str]:
+        """Skills mentioned in ``text``"""
+        text = text.lower()
+        found = {column for column, literal, pattern in self.terms
+                 if literal in text and pattern.search(text)}
+        return [self.skills[column] for column in sorted(found)]
+
+    def count_matches(self, text: str) -> int:
+        """Number of distinct skills mentioned in ``text``"""
+        return len(self.matched_skills(text))
+
+
+_index_cache: "OrderedDict[str, KeywordIndex]" = OrderedDict()
+
+
+_hash_by_text: Dict[str, str] = {}
+
+
+def get_keyword_index(job_desc: str) -> KeywordIndex:
+    """Memoized ``KeywordIndex`` for a job description, keyed by content hash"""
+    # Exact-text lookup first so the per-question path skips re-hashing
+    key = _hash_by_text.get(job_desc)
+    if key is None:
+        if len(_hash_by_text) >= MAX_CACHED_INDEXES:
+            _hash_by_text.clear()
+        key = _hash_by_text[job_desc] = job_hash(job_desc)
+
+    index = _index_cache.get(key)
+    if index is not None:
+        _index_cache.move_to_end(key)
+        return index
+
+    index = KeywordIndex(job_desc)
+    _index_cache[key] = index
+    if len(_index_cache) > MAX_CACHED_INDEXES:
+        _index_cache.popitem(last=False)
+    return index
+
+
+def group_by_job(job_descs: Sequence[str]) -> Dict[str, Tuple[KeywordIndex, List[int]]]:
+    """Group batch positions by job so each role's index is applied once"""
+    groups: Dict[str, Tuple[KeywordIndex, List[int]]] = {}
+    for position, job_desc in enumerate(job_descs):
+        index = get_keyword_index(job_desc)
+        if index.job_hash not in groups:
+            groups[index.job_hash] = (index, [])
+        groups[index.job_hash][1].append(position)
+    return groups
+
@@ -0,0 +1,354 @@
+"""
+LLM Response Cache
+Content-addressed on-disk cache in front of the OpenAI chat client
+
+Every chat completion request is keyed on a SHA-256 hash of its
+(model, messages, temperature, max_tokens, ...) parameters and the response
+is stored in a local SQLite file. The store is size-bounded: once it grows
+past ``max_bytes`` the least recently used entries are evicted.
+
+Modes:
+- record: serve hits from the cache, call the API on a miss and store the result
+- replay: serve only from the cache, a miss raises CacheMissError (fully offline)
+- off:    pass every request straight through to the API
+
+Streaming requests (``stream=True``) are recorded as the text the caller
+actually consumed and replayed as a single chunk. The async client does its
+SQLite reads and writes in a worker thread, off the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+CACHE_MODES = ("record", "replay", "off")
+DEFAULT_CACHE_PATH = "research/results/llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a request has no cached response"""
+
+
+def request_key(sample=None, **params) -> str:
+    """Hash the request parameters into a stable cache key.
+
+    ``sample`` distinguishes repeated draws of the same request (e.g. the
+    iteration number) so that cached runs keep their per-iteration variance.
+    """
+    payload = json.dumps({"params": params, "sample": sample},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_namespace(data):
+    """Turn a cached response dict back into an attribute-access object"""
+    if isinstance(data, dict):
+        return SimpleNamespace(**{k: to_namespace(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return [to_namespace(v) for v in data]
+    return data
+
+
+def from_namespace(data):
+    """Inverse of ``to_namespace``"""
+    if isinstance(data, SimpleNamespace):
+        return {k: from_namespace(v) for k, v in vars(data).items()}
+    if isinstance(data, list):
+        return [from_namespace(v) for v in data]
+    return data
+
+
+def response_to_dict(response) -> Dict:
+    """Serialize an OpenAI response object (or a cache hit) for storage"""
+    if isinstance(response, dict):
+        return response
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return from_namespace(response)
+
+
+class ResponseCache:
+    """SQLite-backed response store with size-bounded LRU eviction"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened lazily so that "off" mode never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached response dict for ``key``, or None"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, response: Dict):
+        """Store a response dict and evict old entries if over budget"""
+        blob = json.dumps(response, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob.encode("utf-8")), time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _content_chunk(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(
+        index=0, delta=SimpleNamespace(content=content), finish_reason="stop")], usage=None)
+
+
+def _usage_chunk(usage: Dict):
+    return SimpleNamespace(choices=[], usage=to_namespace(usage))
+
+
+def _streamed_response(parts, usage: Dict = None) -> Dict:
+    content = "".join(parts)
+    return {"choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": usage, "streamed": True}
+
+
+def _chunk_text(chunk) -> str:
+    if chunk.choices and chunk.choices[0].delta.content:
+        return chunk.choices[0].delta.content
+    return ""
+
+
+class _RecordingStream:
+    """Passes a live stream through and stores what was received once it ends.
+
+    Closing early (e.g. a cutoff after N questions) stores the partial text,
+    which is exactly what the caller consumed.
+    """
+
+    def __init__(self, stream, cache: ResponseCache, key: str):
+        self._stream = stream
+        self._cache = cache
+        self._key = key
+        self._parts = []
+        self._usage = None
+        self._saved = False
+
+    def _record(self, chunk):
+        self._parts.append(_chunk_text(chunk))
+        # Final chunk when the request asked for stream_options.include_usage
+        if getattr(chunk, "usage", None) is not None:
+            self._usage = {"prompt_tokens": chunk.usage.prompt_tokens,
+                           "completion_tokens": chunk.usage.completion_tokens,
+                           "total_tokens": chunk.usage.total_tokens}
+
+    def _save(self):
+        if not self._saved:
+            self._saved = True
+            self._cache.put(self._key, _streamed_response(self._parts, self._usage))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._stream)
+        except StopIteration:
+            self._save()
+            raise
+        self._record(chunk)
+        return chunk
+
+    def close(self):
+        self._stream.close()
+        self._save()
+
+
+class _AsyncRecordingStream(_RecordingStream):
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            await asyncio.to_thread(self._save)
+            raise
+        self._record(chunk)
+        return chunk
+
+    async def close(self):
+        await self._stream.close()
+        await asyncio.to_thread(self._save)
+
+
+class _ReplayStream:
+    """Replays a cached response as a one-chunk stream (plus its usage, if recorded)"""
+
+    def __init__(self, content: str, usage: Dict = None):
+        self._chunks = [_content_chunk(content)]
+        if usage:
+            self._chunks.insert(0, _usage_chunk(usage))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._chunks:
+            raise StopIteration
+        return self._chunks.pop()
+
+    def close(self):
+        self._chunks = []
+
+
+class _AsyncReplayStream(_ReplayStream):
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop()
+
+    async def close(self):
+        self._chunks = []
+
+
+class _CachedCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, cache_sample=None, **params):
+        owner = self._owner
+        if owner.mode == "off":
+            return owner.client.chat.completions.create(**params)
+
+        key = request_key(sample=cache_sample, **params)
+        cached = owner.cache.get(key)
+        if cached is not None:
+            if params.get("stream"):
+                return _ReplayStream(cached["choices"][0]["message"]["content"],
+                                     cached.get("usage"))
+            return to_namespace(cached)
+        if owner.mode == "replay":
+            raise CacheMissError(f"No cached response for request {key[:12]}")
+
+        response = owner.client.chat.completions.create(**params)
+        if params.get("stream"):
+            return _RecordingStream(response, owner.cache, key)
+        owner.cache.put(key, response_to_dict(response))
+        return response
+
+
+class _AsyncCachedCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, cache_sample=None, **params):
+        owner = self._owner
+        if owner.mode == "off":
+            return await owner.client.chat.completions.create(**params)
+
+        key = request_key(sample=cache_sample, **params)
+        cached = await asyncio.to_thread(owner.cache.get, key)
+        if cached is not None:
+            if params.get("stream"):
+                return _AsyncReplayStream(cached["choices"][0]["message"]["content"],
+                                          cached.get("usage"))
+            return to_namespace(cached)
+        if owner.mode == "replay":
+            raise CacheMissError(f"No cached response for request {key[:12]}")
+
+        response = await owner.client.chat.completions.create(**params)
+        if params.get("stream"):
+            return _AsyncRecordingStream(response, owner.cache, key)
+        await asyncio.to_thread(owner.cache.put, key, response_to_dict(response))
+        return response
+
+
+class CachedClient:
+    """Drop-in wrapper exposing ``.chat.completions.create`` with caching.
+
+    Accepts an extra ``cache_sample`` keyword which is folded into the key
+    but never sent to the API.
+    """
+
+    _completions_class = _CachedCompletions
+
+    def __init__(self, client, cache: ResponseCache, mode: str = "off"):
+        self.client = client
+        self.configure(cache, mode)
+        self.chat = SimpleNamespace(completions=self._completions_class(self))
+
+    def configure(self, cache: ResponseCache, mode: str):
+        """Point the wrapper at another store and/or switch its mode"""
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.cache = cache
+        self.mode = mode
+
+
+class AsyncCachedClient(CachedClient):
+    """CachedClient for ``AsyncOpenAI``"""
+
+    _completions_class = _AsyncCachedCompletions
@@ -0,0 +1,106 @@
+"""
+Cascading Model Router
+Cheap model first, escalate to a stronger one on parse or quality failure
+
+Most requests don't need the strongest model: a structured-prompt response
+from a small model usually parses and covers the job's skills just as
+well, at a fraction of the latency and cost. The router sends each request
+to the first model of a cascade (``gpt-4o-mini`` -> ``gpt-4`` by default)
+and only moves to the next tier when the response fails to parse or scores
+below the relevance/format thresholds. The last tier's answer is always
+accepted.
+
+Every hop (model, latency, tokens, cost, and why it escalated) is returned
+so the result record shows the full path. The reported latency, tokens and
+cost are totals over the hops, because that is what the request cost.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CASCADE = ("gpt-4o-mini", "gpt-4")
+DEFAULT_MIN_RELEVANCE = 3.0   # two of the job's skills mentioned
+DEFAULT_MIN_FORMAT = 8.0      # passing format for every strategy
+
+
+class ModelRouter:
+    """Walks a cascade of models until a response passes the quality gate"""
+
+    def __init__(self, models: Sequence[str] = DEFAULT_CASCADE,
+                 min_relevance: float = DEFAULT_MIN_RELEVANCE,
+                 min_format: float = DEFAULT_MIN_FORMAT):
+        if not models:
+            raise ValueError("a cascade needs at least one model")
+        self.models = list(models)
+        self.min_relevance = min_relevance
+        self.min_format = min_format
+        self.finished_on = {model: 0 for model in self.models}
+        self.escalations = 0
+
+    def escalation_reason(self, scores: Dict) -> Optional[str]:
+        """Why a response isn't good enough, or None if it passes"""
+        if not scores["parsing_success"]:
+            return "parse"
+        if scores["relevance"] < self.min_relevance:
+            return "relevance"
+        if scores["format_compliance"] < self.min_format:
+            return "format"
+        return None
+
+    def _hop(self, model: str, generation_time: float, metrics: Dict,
+             reason: Optional[str]) -> Dict:
+        return {"model": model, "generation_time": round(generation_time, 2),
+                "prompt_tokens": metrics.get("prompt_tokens"),
+                "completion_tokens": metrics.get("completion_tokens"),
+                "cost_usd": metrics.get("cost_usd"), "escalated": reason}
+
+    def _finish(self, hops: List[Dict], content: str, metrics: Dict) -> Tuple:
+        self.finished_on[hops[-1]["model"]] += 1
+        self.escalations += len(hops) - 1
+        costs = [hop["cost_usd"] for hop in hops]
+        metrics = {
+            **metrics,
+            "prompt_tokens": sum(hop["prompt_tokens"] or 0 for hop in hops),
+            "completion_tokens": sum(hop["completion_tokens"] or 0 for hop in hops),
+            "cost_usd": round(sum(costs), 6) if None not in costs else None,
+            "cascade_hops": hops
+        }
+        return content, sum(hop["generation_time"] for hop in hops), metrics
+
+    def route(self, call: Callable[[str], Tuple], score: Callable[[str], Dict]) -> Tuple:
+        """Run the cascade with a blocking ``call(model)``.
+
+        ``call`` returns ``(content, generation_time, metrics)`` and
+        ``score(content)`` the evaluator scores the gate looks at. Returns
+        ``(content, total_generation_time, metrics)`` with ``cascade_hops``
+        in the metrics.
+        """
+        hops = []
+        for tier, model in enumerate(self.models):
+            content, generation_time, metrics = call(model)
+            last = tier == len(self.models) - 1
+            reason = None if last else self.escalation_reason(score(content))
+            hops.append(self._hop(model, generation_time, metrics, reason))
+            if reason is None:
+                return self._finish(hops, content, metrics)
+
+    async def route_async(self, call, score: Callable[[str], Dict]) -> Tuple:
+        """``route`` with an async ``call(model)``"""
+        hops = []
+        for tier, model in enumerate(self.models):
+            content, generation_time, metrics = await call(model)
+            last = tier == len(self.models) - 1
+            reason = None if last else self.escalation_reason(score(content))
+            hops.append(self._hop(model, generation_time, metrics, reason))
+            if reason is None:
+                return self._finish(hops, content, metrics)
+
+    def report(self) -> Dict:
+        total = sum(self.finished_on.values())
+        return {
+            "models": self.models,
+            "requests": total,
+            "finished_on": dict(self.finished_on),
+            "escalations": self.escalations,
+            "first_tier_rate": round(100 * self.finished_on[self.models[0]] / total, 1)
+                               if total else None
+        }
@@ -18,15 +18,118 @@ References:
 [6] Beurer-Kellner, L., et al. (2023). Prompting Is Programming. PLDI.
 """
 
+import argparse
 import asyncio
 import json
+import re
 import time
 from typing import List, Dict
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import os
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", "your-api-key-here"))
+from adaptive_allocation import (ALLOCATION_METHODS, DEFAULT_CONFIDENCE, DEFAULT_MAX_SAMPLES,
+                                 DEFAULT_MIN_SAMPLES, AdaptiveAllocator)
+from diversity import QuestionIndex, QuestionIndexes, diversity_metrics
+from hedging import DEFAULT_HEDGE_PERCENTILE, HedgePolicy, hedged
+from instrumentation import rollup_metrics, usage_metrics
+from keyword_index import get_keyword_index, job_hash
+from llm_cache import (CACHE_MODES, AsyncCachedClient, CachedClient, DEFAULT_CACHE_PATH,
+                       DEFAULT_MAX_BYTES, ResponseCache)
+from model_router import DEFAULT_CASCADE, DEFAULT_MIN_FORMAT, DEFAULT_MIN_RELEVANCE, ModelRouter
+from question_bank import DEFAULT_BANK_PATH, QuestionBank
+from question_parser import (Question, StreamingQuestionParser, extract_questions,
+                             parse_structured_response)
+from rate_limiter import (AsyncRateLimitedClient, DEFAULT_RPM, DEFAULT_TPM, RateLimitedClient,
+                          RateLimiter, request_wait)
+from response_archive import DEFAULT_ARCHIVE_PATH, ResponseArchive
+from results_log import (DEFAULT_LOG_PATH, ResultsLog, collect_results, completed_cells,
+                         latest_records, rotate_log)
+from results_store import DEFAULT_STORE_PATH, ResultsStore
+
+# Initialize OpenAI client behind the response cache (mode: record/replay/off);
+# requests that reach the API share one rate limiter across sync and async,
+# and it is the only retry policy (SDK retries off, see rate_limiter.py)
+rate_limiter = RateLimiter(float(os.getenv("OPENAI_RPM", DEFAULT_RPM)),
+                           float(os.getenv("OPENAI_TPM", DEFAULT_TPM)))
+response_cache = ResponseCache(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+client = CachedClient(
+    RateLimitedClient(OpenAI(api_key=os.getenv("OPENAI_API_KEY", "your-api-key-here"),
+                             max_retries=0),
+                      rate_limiter),
+    response_cache, mode=os.getenv("LLM_CACHE_MODE", "off")
+)
+async_client = AsyncCachedClient(
+    AsyncRateLimitedClient(AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY", "your-api-key-here"),
+                                       max_retries=0),
+                           rate_limiter),
+    response_cache, mode=os.getenv("LLM_CACHE_MODE", "off")
+)
+
+
+def configure_cache(mode: str, path: str = None, max_bytes: int = None):
+    """Switch both clients to a cache mode, optionally pointing at another store"""
+    global response_cache
+    if path is not None and path != response_cache.path:
+        response_cache.close()
+        response_cache = ResponseCache(path, response_cache.max_bytes)
+    if max_bytes is not None:
+        response_cache.max_bytes = max_bytes
+    client.configure(response_cache, mode)
+    async_client.configure(response_cache, mode)
+
+
+# Every evaluated question is banked here when enabled (None = off)
+question_bank = QuestionBank(os.environ["QUESTION_BANK"]) if os.getenv("QUESTION_BANK") else None
+
+
+def configure_question_bank(path: str = None):
+    """Bank every evaluated question in ``path``; None turns banking off"""
+    global question_bank
+    if question_bank is not None:
+        question_bank.close()
+    question_bank = QuestionBank(path) if path else None
+
+
+# Every full response is archived here for offline re-scoring (None = off)
+response_archive = None
+
+
+def configure_archive(path: str = None):
+    """Archive every full response under ``path``; None turns archiving off"""
+    global response_archive
+    if response_archive is not None:
+        response_archive.close()
+    response_archive = ResponseArchive(path) if path else None
+
+
+# Backup requests for slow calls (None = off), see configure_hedging
+hedge_policy = None
+
+
+def configure_hedging(hedge_percentile: float = None, backup_model: str = None,
+                      backup_strategy: str = None):
+    """Hedge async requests at a latency percentile; None turns hedging off"""
+    global hedge_policy
+    hedge_policy = (HedgePolicy(hedge_percentile, backup_model=backup_model,
+                                backup_strategy=backup_strategy)
+                    if hedge_percentile is not None else None)
+
+
+# Cheap-model-first cascade (None = every call goes to MODEL)
+model_router = None
+
+
+def configure_cascade(models: List[str] = None, min_relevance: float = DEFAULT_MIN_RELEVANCE,
+                      min_format: float = DEFAULT_MIN_FORMAT):
+    """Route non-streaming calls through a model cascade; None turns it off"""
+    global model_router
+    model_router = ModelRouter(models, min_relevance, min_format) if models else None
+
+
+def configure_rate_limits(rpm: float, tpm: float):
+    """Set the requests/tokens-per-minute ceilings of the shared limiter"""
+    rate_limiter.configure(rpm, tpm)
+
 
 # Test job description
 JOB_DESCRIPTION = """
@@ -137,12 +240,30 @@ Generate 5 questions following this XML structure EXACTLY."""
 
 def evaluate_relevance(question: str, job_desc: str) -> float:
     """Score relevance to job description (0-10)"""
-    keywords = ["python", "fastapi", "postgresql", "mongodb", "rest", "api", "backend"]
-    question_lower = question.lower()
-    matches = sum(1 for kw in keywords if kw in question_lower)
+    # Skills come from the job description itself (memoized per description)
+    matches = get_keyword_index(job_desc).count_matches(question)
     return min(10, matches * 1.5)
 
 
+# A single question counts as fully relevant once it covers this many of the job's skills
+QUESTION_SKILLS = 3
+
+
+def evaluate_question_relevance(question: str, job_desc: str) -> float:
+    """Score one question's relevance to the job description (0-10).
+    
+    ``evaluate_relevance`` gives 1.5 points per skill, which suits a whole
+    response but caps a single question at a few points. Here the skills a
+    question covers are normalised by the job's skill count (at most
+    ``QUESTION_SKILLS``), so a bank query can filter on the same 0-10 scale.
+    """
+    index = get_keyword_index(job_desc)
+    if not index.skills:
+        return 0.0
+    target = min(len(index.skills), QUESTION_SKILLS)
+    return round(min(10.0, 10 * index.count_matches(question) / target), 2)
+
+
 def evaluate_clarity(question: str) -> float:
     """Score question clarity (0-10)"""
     # Simple heuristics: length, question mark, clear structure
@@ -158,12 +279,44 @@ def evaluate_clarity(question: str) -> float:
     return min(10, score)
 
 
-def evaluate_format_compliance(response: str, strategy: str) -> float:
+_EXAMPLE_QUESTION = re.compile(r'Question: "(.+?)"|<text>(.+?)</text>')
+
+
+def example_questions() -> List[str]:
+    """The example questions quoted in the prompts, to catch copied examples"""
+    return [match.group(1) or match.group(2)
+            for _, prompt_func in STRATEGIES
+            for match in _EXAMPLE_QUESTION.finditer(prompt_func(""))]
+
+
+# Near-duplicate index per job description, for the current run
+question_indexes = QuestionIndexes(example_questions)
+
+
+def reset_question_indexes():
+    """Start a run with empty diversity indexes"""
+    global question_indexes
+    question_indexes = QuestionIndexes(example_questions)
+
+
+def evaluate_diversity(questions: List[Question], strategy: str,
+                       index: QuestionIndex) -> Dict:
+    """Score question diversity (0-10) and count near-duplicates.
+    
+    Each question is checked against the strategy's earlier questions in
+    ``index`` and the prompt examples, then added to it.
+    """
+    return diversity_metrics(index.check_and_add([q.text for q in questions], strategy))
+
+
+def evaluate_format_compliance(response: str, strategy: str,
+                               parsed: StreamingQuestionParser = None) -> float:
     """Score format compliance (0-10)"""
     if strategy == "structured":
         # Check XML structure
-        has_xml_tags = "<questions>" in response and "</questions>" in response
-        has_question_tags = response.count("<question>") >= 3
+        parsed = parsed or parse_structured_response(response)
+        has_xml_tags = parsed.has_root and parsed.root_closed
+        has_question_tags = len(parsed.questions) >= 3
         return 10 if (has_xml_tags and has_question_tags) else 3
     else:
         # For others, just check if it looks like questions
@@ -172,12 +325,14 @@ def evaluate_format_compliance(response: str, strategy: str) -> float:
         return 8 if (has_numbers and has_questions) else 5
 
 
-def try_parse_response(response: str, strategy: str) -> bool:
+def try_parse_response(response: str, strategy: str,
+                       parsed: StreamingQuestionParser = None) -> bool:
     """Test if response can be parsed successfully"""
     try:
         if strategy == "structured":
-            # Try to parse XML
-            return "<questions>" in response and response.count("<question>") >= 3
+            # Try to parse XML into question records
+            parsed = parsed or parse_structured_response(response)
+            return parsed.has_root and len(parsed.questions) >= 3
         else:
             # For others, check if we can extract question-like patterns
             return response.count("?") >= 3 and len(response) > 100
@@ -189,7 +344,427 @@ def try_parse_response(response: str, strategy: str) -> bool:
 # EXPERIMENT RUNNER
 # ============================================================================
 
-def run_strategy_test(strategy_name: str, prompt_func, iterations: int = 3):
+DEFAULT_OUTPUT_PATH = "research/results/experiment_results.json"
+
+MODEL = "gpt-4"
+SYSTEM_PROMPT = "You are an expert technical interviewer."
+TEMPERATURE = 0.7
+MAX_TOKENS = 1000
+
+STRATEGIES = [
+    ("zero_shot", zero_shot_prompt),
+    ("few_shot", few_shot_prompt),
+    ("chain_of_thought", cot_prompt),
+    ("structured", structured_prompt)
+]
+
+
+def build_messages(prompt: str) -> List[Dict]:
+    """Chat messages sent for every generation request"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def score_response(content: str, strategy_name: str, job_desc: str = JOB_DESCRIPTION,
+                   parsed: StreamingQuestionParser = None) -> Dict:
+    """Scores of the stateless evaluators for one response.
+    
+    Depends only on the response text, so archived responses can be
+    re-scored offline in any order or process.
+    """
+    # Extract first question for evaluation (simplified)
+    first_question = content.split("\n")[0]
+    
+    if strategy_name == "structured" and parsed is None:
+        parsed = parse_structured_response(content)
+    
+    scores = {
+        "relevance": evaluate_relevance(content, job_desc),
+        "clarity": evaluate_clarity(first_question),
+        "format_compliance": evaluate_format_compliance(content, strategy_name, parsed),
+        "parsing_success": try_parse_response(content, strategy_name, parsed),
+        "response_length": len(content)
+    }
+    if parsed is not None:
+        scores["questions_parsed"] = len(parsed.questions)
+    return scores
+
+
+def evaluate_response(content: str, strategy_name: str, iteration: int,
+                      generation_time: float, job_desc: str = JOB_DESCRIPTION,
+                      metrics: Dict = None, parsed: StreamingQuestionParser = None,
+                      diversity_index: QuestionIndex = None) -> Dict:
+    """Run all evaluators over one response and build its result record.
+    
+    ``parsed`` lets a streaming caller hand over the XML it already parsed
+    incrementally, so the structured response isn't scanned again.
+    Diversity is checked against ``diversity_index``, by default this run's
+    index for ``job_desc``.
+    """
+    if strategy_name == "structured" and parsed is None:
+        parsed = parse_structured_response(content)
+    
+    questions = parsed.questions if parsed is not None else extract_questions(content, strategy_name)
+    if diversity_index is None:
+        diversity_index = question_indexes.get(job_hash(job_desc))
+    diversity = evaluate_diversity(questions, strategy_name, diversity_index)
+    
+    result = {
+        "iteration": iteration,
+        **score_response(content, strategy_name, job_desc, parsed),
+        **diversity,
+        "generation_time": round(generation_time, 2),
+        "sample_output": content[:200] + "..."  # First 200 chars
+    }
+    if metrics:
+        result.update(metrics)
+    if response_archive is not None:
+        response_archive.append(content, strategy_name, job_desc, iteration, result)
+    if question_bank is not None:
+        bank_questions(questions, strategy_name, job_desc, (metrics or {}).get("model", MODEL))
+    return result
+
+
+def bank_questions(questions: List[Question], strategy_name: str, job_desc: str,
+                   model: str = MODEL) -> int:
+    """Score each question on its own and store it in the question bank"""
+    return question_bank.add(job_hash(job_desc), strategy_name, [
+        {**q.to_dict(), "relevance": evaluate_question_relevance(q.text, job_desc),
+         "clarity": evaluate_clarity(q.text)}
+        for q in questions if q.complete
+    ], model)
+
+
+def print_iteration_result(result: Dict):
+    """Print the per-iteration scores"""
+    print(f"  ✓ Relevance: {result['relevance']:.1f}/10")
+    print(f"  ✓ Clarity: {result['clarity']:.1f}/10")
+    print(f"  ✓ Format: {result['format_compliance']:.1f}/10")
+    if "generation_time" in result:
+        print(f"  ✓ Time: {result['generation_time']:.2f}s")
+    print(f"  ✓ Parseable: {'Yes' if result['parsing_success'] else 'No'}")
+    if result.get("diversity") is not None:
+        print(f"  ✓ Diversity: {result['diversity']:.1f}/10 "
+              f"({result['near_duplicates']} near-duplicates)")
+    if "completion_tokens" in result:
+        cost = result.get("cost_usd")
+        print(f"  ✓ Tokens: {result['prompt_tokens']} in / {result['completion_tokens']} out"
+              f"{f' (${cost:.4f})' if cost is not None else ''}")
+    if "time_to_first_token" in result:
+        print(f"  ✓ First token: {result['time_to_first_token']:.2f}s "
+              f"({result['tokens_per_second']:.1f} tok/s"
+              f"{', stopped early' if result['stopped_early'] else ''})")
+
+
+def summarize_results(strategy_name: str, results: List[Dict], iterations: int,
+                      verbose: bool = True):
+    """Average the successful iterations of one strategy into a summary"""
+    valid_results = [r for r in results if "error" not in r]
+    
+    if not valid_results:
+        return None
+    
+    avg_relevance = sum(r["relevance"] for r in valid_results) / len(valid_results)
+    avg_clarity = sum(r["clarity"] for r in valid_results) / len(valid_results)
+    avg_format = sum(r["format_compliance"] for r in valid_results) / len(valid_results)
+    parse_success_rate = sum(1 for r in valid_results if r["parsing_success"]) / len(valid_results) * 100
+    
+    summary = {
+        "strategy": strategy_name,
+        "avg_relevance": round(avg_relevance, 2),
+        "avg_clarity": round(avg_clarity, 2),
+        "avg_format": round(avg_format, 2),
+        "parse_success_rate": round(parse_success_rate, 0),
+        "total_iterations": iterations,
+        "successful_iterations": len(valid_results)
+    }
+    timed = [r["generation_time"] for r in valid_results if "generation_time" in r]
+    if timed:
+        summary["avg_time"] = round(sum(timed) / len(timed), 2)
+    
+    # Tail latency, token usage and cost
+    summary.update(rollup_metrics(valid_results))
+    
+    scored = [r for r in valid_results if r.get("diversity") is not None]
+    if scored:
+        avg_diversity = sum(r["diversity"] for r in scored) / len(scored)
+        duplicate_rate = sum(1 for r in scored if r["near_duplicates"]) / len(scored) * 100
+        summary.update({
+            "avg_diversity": round(avg_diversity, 2),
+            "near_duplicate_rate": round(duplicate_rate, 0)
+        })
+    
+    routed = [r for r in valid_results if "cascade_hops" in r]
+    if routed:
+        first_tier = routed[0]["cascade_hops"][0]["model"]
+        summary.update({
+            "first_tier_rate": round(sum(1 for r in routed if r["model"] == first_tier)
+                                     / len(routed) * 100, 0),
+            "avg_hops": round(sum(len(r["cascade_hops"]) for r in routed) / len(routed), 2)
+        })
+    
+    hedged_results = [r for r in valid_results if "hedged" in r]
+    if hedged_results:
+        hedge_rate = sum(1 for r in hedged_results if r["hedged"]) / len(hedged_results) * 100
+        backup_wins = sum(1 for r in hedged_results if r["hedge_winner"] == "backup")
+        summary.update({
+            "hedge_rate": round(hedge_rate, 0),
+            "backup_win_rate": round(backup_wins / len(hedged_results) * 100, 0)
+        })
+    
+    streamed = [r for r in valid_results if "time_to_first_token" in r]
+    if streamed:
+        avg_ttft = sum(r["time_to_first_token"] for r in streamed) / len(streamed)
+        early_stop_rate = sum(1 for r in streamed if r["stopped_early"]) / len(streamed) * 100
+        summary.update({
+            "avg_time_to_first_token": round(avg_ttft, 3),
+            "early_stop_rate": round(early_stop_rate, 0)
+        })
+    
+    if verbose:
+        print_summary(summary)
+    return summary
+
+
+def print_summary(summary: Dict):
+    """Print one strategy's averaged results"""
+    print(f"\n{'-'*60}")
+    print(f"AVERAGE RESULTS - {summary['strategy'].upper()}")
+    print(f"{'-'*60}")
+    print(f"Relevance:         {summary['avg_relevance']:.1f}/10")
+    print(f"Clarity:           {summary['avg_clarity']:.1f}/10")
+    print(f"Format Compliance: {summary['avg_format']:.1f}/10")
+    if "avg_time" in summary:
+        print(f"Generation Time:   {summary['avg_time']:.2f}s")
+    print(f"Parsing Success:   {summary['parse_success_rate']:.0f}%")
+    if "p50_time" in summary:
+        print(f"Latency p50/95/99: {summary['p50_time']:.2f}s / {summary['p95_time']:.2f}s / "
+              f"{summary['p99_time']:.2f}s")
+    if "avg_diversity" in summary:
+        print(f"Diversity:         {summary['avg_diversity']:.1f}/10 "
+              f"({summary['near_duplicate_rate']:.0f}% with near-duplicates)")
+    if "total_tokens" in summary:
+        print(f"Tokens (avg):      {summary['avg_prompt_tokens']:.0f} in / "
+              f"{summary['avg_completion_tokens']:.0f} out")
+        if "avg_tokens_per_second" in summary:
+            print(f"Tokens/sec:        {summary['avg_tokens_per_second']:.1f}")
+    if "total_cost_usd" in summary:
+        print(f"Cost:              ${summary['total_cost_usd']:.4f} "
+              f"(${summary['avg_cost_usd']:.4f}/iteration)")
+    if "first_tier_rate" in summary:
+        print(f"Cascade:           {summary['first_tier_rate']:.0f}% on first tier "
+              f"({summary['avg_hops']:.2f} hops/iteration)")
+    if "hedge_rate" in summary:
+        print(f"Hedged:            {summary['hedge_rate']:.0f}% "
+              f"(backup won {summary['backup_win_rate']:.0f}%)")
+    if "avg_time_to_first_token" in summary:
+        print(f"Time To 1st Token: {summary['avg_time_to_first_token']:.2f}s")
+        print(f"Stopped Early:     {summary['early_stop_rate']:.0f}%")
+
+
+# ============================================================================
+# STREAMING GENERATION
+# Records time-to-first-token / inter-token latency and closes the stream
+# as soon as enough complete questions have arrived.
+# ============================================================================
+
+STOP_AFTER_QUESTIONS = 5
+
+_NUMBERED_LINE = re.compile(r"^\s*(?:\*\*)?(?:Question\s*)?(\d+)[.):]", re.IGNORECASE)
+
+
+def count_complete_questions(text: str) -> int:
+    """Count numbered questions whose line has fully arrived in a partial response"""
+    # Count the current numbered run of question lines; a new "1." restarts
+    # it, so chain-of-thought analysis steps don't trigger the cutoff.
+    count = 0
+    for line in text.split("\n")[:-1]:  # last line may still be streaming
+        match = _NUMBERED_LINE.match(line)
+        if match and int(match.group(1)) == 1:
+            count = 0
+        if match and "?" in line:
+            count += 1
+    return count
+
+
+class StreamTracker:
+    """Collects streamed chunks and their arrival times for one request.
+    
+    Structured responses are parsed incrementally as chunks arrive, so
+    ``on_question`` (if given) sees each question as soon as it completes.
+    """
+    
+    def __init__(self, strategy_name: str, start_time: float,
+                 stop_after_questions: int = STOP_AFTER_QUESTIONS, on_question=None):
+        self.strategy_name = strategy_name
+        self.start_time = start_time
+        self.stop_after_questions = stop_after_questions
+        self.on_question = on_question
+        self.parser = StreamingQuestionParser() if strategy_name == "structured" else None
+        self.parts = []
+        self.arrivals = []
+        self.usage = None
+        self.stopped_early = False
+    
+    def add(self, chunk) -> bool:
+        """Record one chunk; returns True once the stream can be closed"""
+        if getattr(chunk, "usage", None) is not None:
+            # Only sent as the final chunk, so a stream cut early never has it
+            self.usage = chunk.usage
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return False
+        delta = chunk.choices[0].delta.content
+        self.parts.append(delta)
+        self.arrivals.append(time.time())
+        
+        if self.parser is not None:
+            for question in self.parser.feed(delta):
+                if self.on_question:
+                    self.on_question(question)
+            complete = len(self.parser.questions)
+        elif "\n" in delta:
+            # Numbered questions can only complete on a line break
+            complete = count_complete_questions("".join(self.parts))
+        else:
+            return False
+        
+        if self.stop_after_questions and complete >= self.stop_after_questions:
+            self.stopped_early = True
+            return True
+        return False
+    
+    def finish(self, prompt: str = None):
+        """Return ``(content, generation_time, metrics, parsed)`` for the stream.
+        
+        ``prompt`` is used to estimate prompt tokens when the stream ended
+        before its usage chunk arrived.
+        """
+        end_time = time.time()
+        content = "".join(self.parts)
+        if self.parser is not None:
+            if self.stopped_early and not self.parser.root_closed:
+                # We cut the stream ourselves; close the root so the cutoff
+                # isn't scored as a format failure
+                content += "\n</questions>"
+                self.parser.feed("\n</questions>")
+            for question in self.parser.close():
+                if self.on_question:
+                    self.on_question(question)
+        
+        if self.arrivals:
+            ttft = self.arrivals[0] - self.start_time
+            streaming_time = self.arrivals[-1] - self.arrivals[0]
+        else:
+            ttft = end_time - self.start_time
+            streaming_time = 0.0
+        gaps = len(self.arrivals) - 1
+        
+        metrics = usage_metrics(self.usage, MODEL, end_time - self.start_time,
+                                prompt_text=None if prompt is None else SYSTEM_PROMPT + prompt,
+                                completion_text=content)
+        metrics.update({
+            "time_to_first_token": round(ttft, 3),
+            "inter_token_latency": round(streaming_time / gaps, 4) if gaps > 0 else 0.0,
+            "output_chunks": len(self.arrivals),
+            "stopped_early": self.stopped_early
+        })
+        if streaming_time > 0:
+            # Decode rate between chunks is more telling than tokens over
+            # the whole request; a replayed single-chunk stream has none
+            metrics["tokens_per_second"] = round(gaps / streaming_time, 1)
+        return content, end_time - self.start_time, metrics, self.parser
+
+
+def complete(prompt: str, iteration=None, model: str = MODEL):
+    """One blocking completion; returns ``(content, generation_time, metrics)``"""
+    request_wait.set(0.0)
+    start_time = time.time()
+    response = client.chat.completions.create(
+        model=model,
+        messages=build_messages(prompt),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        cache_sample=iteration
+    )
+    # Time spent waiting on the rate limiter isn't model latency
+    generation_time = time.time() - start_time - request_wait.get()
+    content = response.choices[0].message.content
+    metrics = usage_metrics(response.usage, model, generation_time,
+                            prompt_text=SYSTEM_PROMPT + prompt)
+    return content, generation_time, metrics
+
+
+def cascade_scores(content: str, strategy_name: str, job_desc: str) -> Dict:
+    """The evaluator scores ``model_router`` gates each tier on"""
+    parsed = parse_structured_response(content) if strategy_name == "structured" else None
+    return {"parsing_success": try_parse_response(content, strategy_name, parsed),
+            "relevance": evaluate_relevance(content, job_desc),
+            "format_compliance": evaluate_format_compliance(content, strategy_name, parsed)}
+
+
+def generate_streaming(prompt: str, strategy_name: str, iteration: int,
+                       stop_after_questions: int = STOP_AFTER_QUESTIONS, on_question=None):
+    """Stream one completion; returns ``(content, generation_time, metrics, parsed)``"""
+    request_wait.set(0.0)
+    start_time = time.time()
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=build_messages(prompt),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        stream=True,
+        stream_options={"include_usage": True},
+        cache_sample=iteration
+    )
+    # Time spent waiting on the rate limiter isn't model latency
+    tracker = StreamTracker(strategy_name, start_time + request_wait.get(),
+                            stop_after_questions, on_question)
+    for chunk in stream:
+        if tracker.add(chunk):
+            break
+    stream.close()
+    return tracker.finish(prompt)
+
+
+async def generate_streaming_async(prompt: str, strategy_name: str, iteration: int,
+                                   stop_after_questions: int = STOP_AFTER_QUESTIONS,
+                                   on_question=None):
+    """Async counterpart of ``generate_streaming``"""
+    request_wait.set(0.0)
+    start_time = time.time()
+    stream = await async_client.chat.completions.create(
+        model=MODEL,
+        messages=build_messages(prompt),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        stream=True,
+        stream_options={"include_usage": True},
+        cache_sample=iteration
+    )
+    # Time spent waiting on the rate limiter isn't model latency
+    tracker = StreamTracker(strategy_name, start_time + request_wait.get(),
+                            stop_after_questions, on_question)
+    async for chunk in stream:
+        if tracker.add(chunk):
+            break
+    await stream.close()
+    return tracker.finish(prompt)
+
+
+def log_result(results_log: ResultsLog, strategy_name: str, job_desc: str,
+               iteration: int, result: Dict):
+    """Append one finished iteration to the checkpoint log, if any"""
+    if results_log is not None:
+        results_log.append({"strategy": strategy_name, "job_hash": job_hash(job_desc),
+                            "iteration": iteration, **result})
+
+
+def run_strategy_test(strategy_name: str, prompt_func, iterations: int = 3,
+                      job_desc: str = JOB_DESCRIPTION, stream: bool = False,
+                      stop_after_questions: int = STOP_AFTER_QUESTIONS,
+                      results_log: ResultsLog = None, completed=frozenset()):
     """Run test for one strategy"""
     print(f"\n{'='*60}")
     print(f"Testing Strategy: {strategy_name.upper()}")
@@ -198,166 +773,496 @@ def run_strategy_test(strategy_name: str, prompt_func, iterations: int = 3):
     results = []
     
     for i in range(iterations):
+        if (strategy_name, job_hash(job_desc), i + 1) in completed:
+            print(f"\nIteration {i+1}/{iterations}... already in results log, skipping")
+            continue
         print(f"\nIteration {i+1}/{iterations}...")
         
         # Generate prompt
-        prompt = prompt_func(JOB_DESCRIPTION)
-        
-        # Measure generation time
-        start_time = time.time()
+        prompt = prompt_func(job_desc)
         
         try:
-            # Call OpenAI API
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert technical interviewer."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            generation_time = time.time() - start_time
-            content = response.choices[0].message.content
-            
-            # Evaluate response
-            # Extract first question for evaluation (simplified)
-            first_question = content.split("\n")[0]
+            if stream:
+                content, generation_time, metrics, parsed = generate_streaming(
+                    prompt, strategy_name, i + 1, stop_after_questions)
+            elif model_router is not None:
+                # Cheapest model first, escalating while the gate fails
+                content, generation_time, metrics = model_router.route(
+                    lambda model: complete(prompt, i + 1, model),
+                    lambda text: cascade_scores(text, strategy_name, job_desc))
+                parsed = None
+            else:
+                # Call OpenAI API (generation time excludes rate-limit waits)
+                content, generation_time, metrics = complete(prompt, i + 1)
+                parsed = None
             
-            relevance = evaluate_relevance(content, JOB_DESCRIPTION)
-            clarity = evaluate_clarity(first_question)
-            format_compliance = evaluate_format_compliance(content, strategy_name)
-            can_parse = try_parse_response(content, strategy_name)
-            
-            result = {
-                "iteration": i + 1,
-                "relevance": relevance,
-                "clarity": clarity,
-                "format_compliance": format_compliance,
-                "generation_time": round(generation_time, 2),
-                "parsing_success": can_parse,
-                "response_length": len(content),
-                "sample_output": content[:200] + "..."  # First 200 chars
-            }
-            
-            results.append(result)
-            
-            print(f"  ✓ Relevance: {relevance:.1f}/10")
-            print(f"  ✓ Clarity: {clarity:.1f}/10")
-            print(f"  ✓ Format: {format_compliance:.1f}/10")
-            print(f"  ✓ Time: {generation_time:.2f}s")
-            print(f"  ✓ Parseable: {'Yes' if can_parse else 'No'}")
+            result = evaluate_response(content, strategy_name, i + 1, generation_time,
+                                       job_desc, metrics, parsed)
+            print_iteration_result(result)
             
         except Exception as e:
             print(f"  ✗ Error: {str(e)}")
-            results.append({"error": str(e)})
+            result = {"error": str(e)}
+        
+        results.append(result)
+        log_result(results_log, strategy_name, job_desc, i + 1, result)
     
-    # Calculate averages
-    valid_results = [r for r in results if "error" not in r]
+    summary = summarize_results(strategy_name, results, iterations)
+    return summary, results
+
+
+# ============================================================================
+# ASYNC EXPERIMENT ENGINE
+# Runs the strategy x iteration grid concurrently instead of back to back,
+# so total wall-clock time tracks the slowest request, not the sum of all.
+# ============================================================================
+
+async def complete_async(prompt: str, iteration=None, model: str = MODEL):
+    """One non-streaming completion; returns ``(content, generation_time, metrics)``"""
+    request_wait.set(0.0)
+    start_time = time.time()
+    response = await async_client.chat.completions.create(
+        model=model,
+        messages=build_messages(prompt),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        cache_sample=iteration
+    )
+    # Time spent waiting on the rate limiter isn't model latency
+    generation_time = time.time() - start_time - request_wait.get()
+    content = response.choices[0].message.content
+    metrics = usage_metrics(response.usage, model, generation_time,
+                            prompt_text=SYSTEM_PROMPT + prompt)
+    return content, generation_time, metrics
+
+
+async def generate_hedged_async(strategy_name: str, prompt_func, job_desc: str,
+                                iteration=None, policy: HedgePolicy = None):
+    """Hedged ``complete_async``; returns ``(content, generation_time, metrics,
+    strategy, hedge_info)`` of whichever call first parses.
     
-    if valid_results:
-        avg_relevance = sum(r["relevance"] for r in valid_results) / len(valid_results)
-        avg_clarity = sum(r["clarity"] for r in valid_results) / len(valid_results)
-        avg_format = sum(r["format_compliance"] for r in valid_results) / len(valid_results)
-        avg_time = sum(r["generation_time"] for r in valid_results) / len(valid_results)
-        parse_success_rate = sum(1 for r in valid_results if r["parsing_success"]) / len(valid_results) * 100
-        
-        print(f"\n{'-'*60}")
-        print(f"AVERAGE RESULTS - {strategy_name.upper()}")
-        print(f"{'-'*60}")
-        print(f"Relevance:         {avg_relevance:.1f}/10")
-        print(f"Clarity:           {avg_clarity:.1f}/10")
-        print(f"Format Compliance: {avg_format:.1f}/10")
-        print(f"Generation Time:   {avg_time:.2f}s")
-        print(f"Parsing Success:   {parse_success_rate:.0f}%")
-        
-        summary = {
-            "strategy": strategy_name,
-            "avg_relevance": round(avg_relevance, 2),
-            "avg_clarity": round(avg_clarity, 2),
-            "avg_format": round(avg_format, 2),
-            "avg_time": round(avg_time, 2),
-            "parse_success_rate": round(parse_success_rate, 0),
-            "total_iterations": iterations,
-            "successful_iterations": len(valid_results)
-        }
+    The backup uses ``policy.backup_strategy``/``backup_model`` when set.
+    Its latency counts from the primary's start, since that is what the
+    caller waited.
+    """
+    policy = policy or hedge_policy
+    backup_strategy = policy.backup_strategy or strategy_name
+    backup_prompt = dict(STRATEGIES)[backup_strategy] if policy.backup_strategy else prompt_func
+    
+    async def attempt(name, func, model, sample):
+        return (name,) + await complete_async(func(job_desc), sample, model)
+    
+    (strategy, content, generation_time, metrics), info = await hedged(
+        lambda: attempt(strategy_name, prompt_func, MODEL, iteration),
+        lambda: attempt(backup_strategy, backup_prompt, policy.backup_model or MODEL,
+                        None if iteration is None else f"{iteration}-hedge"),
+        lambda attempt_result: try_parse_response(attempt_result[1], attempt_result[0]),
+        policy
+    )
+    if info["hedge_winner"] == "backup":
+        generation_time += info["hedge_offset"]
+    return content, generation_time, metrics, strategy, info
+
+
+async def run_iteration_async(strategy_name: str, prompt_func, iteration: int,
+                              semaphore: asyncio.Semaphore,
+                              job_desc: str = JOB_DESCRIPTION, stream: bool = False,
+                              stop_after_questions: int = STOP_AFTER_QUESTIONS,
+                              verbose: bool = True, results_log: ResultsLog = None) -> Dict:
+    """Run one (strategy, iteration) cell, waiting for a concurrency slot"""
+    prompt = prompt_func(job_desc)
+    scored_as = strategy_name
+    
+    async with semaphore:
+        try:
+            if stream:
+                content, generation_time, metrics, parsed = await generate_streaming_async(
+                    prompt, strategy_name, iteration, stop_after_questions)
+            elif hedge_policy is not None:
+                # The backup shares this cell's concurrency slot; a backup with
+                # another strategy is scored by that strategy's format
+                content, generation_time, metrics, scored_as, hedge_info = \
+                    await generate_hedged_async(strategy_name, prompt_func, job_desc, iteration)
+                metrics = {**metrics, **hedge_info}
+                parsed = None
+            elif model_router is not None:
+                content, generation_time, metrics = await model_router.route_async(
+                    lambda model: complete_async(prompt, iteration, model),
+                    lambda text: cascade_scores(text, strategy_name, job_desc))
+                parsed = None
+            else:
+                content, generation_time, metrics = await complete_async(prompt, iteration)
+                parsed = None
+        except Exception as e:
+            if verbose:
+                print(f"  ✗ {strategy_name} #{iteration} Error: {str(e)}")
+            result = {"error": str(e)}
+            log_result(results_log, strategy_name, job_desc, iteration, result)
+            return result
+    
+    result = evaluate_response(content, scored_as, iteration, generation_time,
+                               job_desc, metrics, parsed)
+    log_result(results_log, strategy_name, job_desc, iteration, result)
+    if verbose:
+        print(f"  ✓ {strategy_name} #{iteration}: "
+              f"relevance {result['relevance']:.1f}, "
+              f"format {result['format_compliance']:.1f}, "
+              f"{result['generation_time']:.2f}s")
+    return result
+
+
+async def run_experiment_async(strategies=STRATEGIES, iterations: int = 3,
+                               max_concurrency: int = 8,
+                               job_desc: str = JOB_DESCRIPTION, stream: bool = False,
+                               stop_after_questions: int = STOP_AFTER_QUESTIONS,
+                               results_log: ResultsLog = None, completed=frozenset()):
+    """Run every strategy x iteration cell concurrently.
+    
+    At most ``max_concurrency`` requests are in flight at once. Cells listed
+    in ``completed`` (from a resumed results log) are skipped. Returns
+    ``(summaries, detailed_results)`` in the same shape as running
+    ``run_strategy_test`` for each strategy in turn.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    job = job_hash(job_desc)
+    
+    cells = [
+        (strategy_name, run_iteration_async(strategy_name, prompt_func, i + 1, semaphore,
+                                            job_desc, stream, stop_after_questions,
+                                            results_log=results_log))
+        for strategy_name, prompt_func in strategies
+        for i in range(iterations)
+        if (strategy_name, job, i + 1) not in completed
+    ]
+    skipped = len(strategies) * iterations - len(cells)
+    print(f"\nRunning {len(strategies)} strategies x {iterations} iterations "
+          f"(max {max_concurrency} concurrent requests"
+          f"{f', {skipped} cells resumed from log' if skipped else ''})...")
+    
+    # gather preserves order, so each strategy's results stay sorted by iteration
+    flat_results = await asyncio.gather(*(coro for _, coro in cells))
+    
+    all_summaries = []
+    all_results = {strategy_name: [] for strategy_name, _ in strategies}
+    for (strategy_name, _), result in zip(cells, flat_results):
+        all_results[strategy_name].append(result)
+    
+    for strategy_name, results in all_results.items():
+        summary = summarize_results(strategy_name, results, iterations)
+        if summary:
+            all_summaries.append(summary)
+    
+    return all_summaries, all_results
+
+
+# ============================================================================
+# ADAPTIVE ALLOCATION
+# Spends iterations only on strategies that can still win, stopping once a
+# confidence bound separates the leader from the rest.
+# ============================================================================
+
+async def run_adaptive_async(strategies=STRATEGIES, min_iterations: int = DEFAULT_MIN_SAMPLES,
+                             max_iterations: int = DEFAULT_MAX_SAMPLES,
+                             confidence: float = DEFAULT_CONFIDENCE, method: str = "lucb",
+                             max_concurrency: int = 8,
+                             job_desc: str = JOB_DESCRIPTION, stream: bool = False,
+                             stop_after_questions: int = STOP_AFTER_QUESTIONS,
+                             results_log: ResultsLog = None, prior: Dict[str, list] = None) -> Dict:
+    """Run rounds of iterations until one strategy is separated from the rest.
+    
+    ``prior`` holds per-strategy results already on record (a resumed log);
+    they count as samples. Every iteration is appended to ``results_log`` as
+    usual; returns the allocation report.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    prompt_funcs = dict(strategies)
+    allocator = AdaptiveAllocator(list(prompt_funcs), confidence, min_iterations,
+                                  max_iterations, method)
+    next_iteration = {name: 1 for name in prompt_funcs}
+    for strategy_name, results in (prior or {}).items():
+        if strategy_name in prompt_funcs:
+            for result in results:
+                allocator.add(strategy_name, result)
+                next_iteration[strategy_name] = max(next_iteration[strategy_name],
+                                                    result["iteration"] + 1)
+    
+    print(f"\nAdaptive allocation ({method}) over {len(prompt_funcs)} strategies "
+          f"({min_iterations}-{max_iterations} iterations each, {confidence:.0%} confidence)...")
+    
+    round_number = 0
+    while True:
+        for strategy_name in allocator.eliminate():
+            lower, mean, upper = allocator.bounds(strategy_name)
+            print(f"  ✗ Eliminated {strategy_name} after "
+                  f"{allocator.arms[strategy_name].pulls} iterations "
+                  f"(score {mean:.2f}, upper bound {upper:.2f})")
+        batch = allocator.next_round()
+        if not batch:
+            break
         
-        return summary, results
+        round_number += 1
+        print(f"\nRound {round_number}: {', '.join(batch)}")
+        cells = []
+        for strategy_name in batch:
+            cells.append((strategy_name, run_iteration_async(
+                strategy_name, prompt_funcs[strategy_name], next_iteration[strategy_name],
+                semaphore, job_desc, stream, stop_after_questions, results_log=results_log)))
+            next_iteration[strategy_name] += 1
+        results = await asyncio.gather(*(coro for _, coro in cells))
+        for (strategy_name, _), result in zip(cells, results):
+            allocator.add(strategy_name, result)
     
-    return None, results
+    report = allocator.report()
+    print(f"\nAdaptive allocation: {report['calls']} of {report['fixed_budget_calls']} "
+          f"calls ({report['calls_saved_pct']:.0f}% saved), "
+          f"{'decided' if report['decided'] else 'budget exhausted'}, "
+          f"leader {report['leader']}")
+    return report
 
 
 # ============================================================================
 # MAIN EXPERIMENT
 # ============================================================================
 
-def main():
+def weighted_score(summary: Dict) -> float:
+    """Weighted score used to pick the recommended strategy"""
+    return (summary['avg_format'] * 0.4 +
+            summary['avg_relevance'] * 0.3 +
+            summary['avg_clarity'] * 0.2 +
+            summary['parse_success_rate'] * 0.1)
+
+
+def compact_results(log_path: str, iterations: int = None):
+    """Rebuild ``(summaries, detailed_results)`` from the checkpoint log.
+    
+    ``iterations=None`` (adaptive runs) counts each strategy's own iterations.
+    """
+    detailed = collect_results(log_path)
+    all_results = {name: detailed[name] for name, _ in STRATEGIES if name in detailed}
+    all_summaries = []
+    for strategy_name, results in all_results.items():
+        summary = summarize_results(strategy_name, results, iterations or len(results),
+                                    verbose=False)
+        if summary:
+            all_summaries.append(summary)
+    return all_summaries, all_results
+
+
+def main(iterations: int = 3, concurrency: int = 8, sequential: bool = False,
+         stream: bool = False, stop_after_questions: int = STOP_AFTER_QUESTIONS,
+         log_path: str = DEFAULT_LOG_PATH, output_path: str = DEFAULT_OUTPUT_PATH,
+         resume: bool = False, adaptive: bool = False,
+         min_iterations: int = DEFAULT_MIN_SAMPLES, confidence: float = DEFAULT_CONFIDENCE,
+         allocation: str = "lucb", store_path: str = DEFAULT_STORE_PATH):
+    """Run the experiment; with ``adaptive`` ``iterations`` is the per-strategy cap"""
     print("\n" + "="*60)
     print("PROMPT ENGINEERING RESEARCH EXPERIMENT")
     print("Comparing 4 Strategies for Interview Question Generation")
     print("="*60)
     
-    strategies = [
-        ("zero_shot", zero_shot_prompt),
-        ("few_shot", few_shot_prompt),
-        ("chain_of_thought", cot_prompt),
-        ("structured", structured_prompt)
-    ]
+    reset_question_indexes()
+    if resume:
+        completed = completed_cells(log_path)
+        print(f"\nResuming from {log_path}: {len(completed)} iterations already done")
+    else:
+        completed = set()
+        rotated = rotate_log(log_path)
+        if rotated:
+            print(f"\nPrevious results log moved to {rotated}")
     
-    all_summaries = []
-    all_results = {}
+    # Every finished iteration is appended to the log as it completes
+    allocation_report = None
+    with ResultsLog(log_path) as results_log:
+        if adaptive:
+            allocation_report = asyncio.run(
+                run_adaptive_async(STRATEGIES, min_iterations, iterations, confidence,
+                                   allocation, max_concurrency=concurrency, stream=stream,
+                                   stop_after_questions=stop_after_questions,
+                                   results_log=results_log,
+                                   prior=collect_results(log_path) if resume else None)
+            )
+        elif sequential:
+            for strategy_name, prompt_func in STRATEGIES:
+                run_strategy_test(strategy_name, prompt_func, iterations=iterations,
+                                  stream=stream, stop_after_questions=stop_after_questions,
+                                  results_log=results_log, completed=completed)
+        else:
+            asyncio.run(
+                run_experiment_async(STRATEGIES, iterations, max_concurrency=concurrency,
+                                     stream=stream, stop_after_questions=stop_after_questions,
+                                     results_log=results_log, completed=completed)
+            )
     
-    for strategy_name, prompt_func in strategies:
-        summary, results = run_strategy_test(strategy_name, prompt_func, iterations=3)
-        
-        if summary:
-            all_summaries.append(summary)
-        all_results[strategy_name] = results
-        
-        time.sleep(2)  # Rate limiting
+    limiter_stats = rate_limiter.stats()
+    if limiter_stats["retries"]:
+        print(f"\nRate limiter: {limiter_stats['retries']} retries, "
+              f"{limiter_stats['throttled']} throttled, "
+              f"now at {limiter_stats['effective_rpm']} RPM / {limiter_stats['effective_tpm']} TPM")
+    
+    cascade_report = model_router.report() if model_router is not None else None
+    if cascade_report:
+        finished = ", ".join(f"{model} {count}" for model, count in
+                             cascade_report["finished_on"].items())
+        print(f"\nCascade: {cascade_report['requests']} requests finished on {finished} "
+              f"({cascade_report['escalations']} escalations)")
+    
+    hedge_report = hedge_policy.report() if hedge_policy is not None else None
+    if hedge_report:
+        print(f"\nHedging: {hedge_report['hedged']} backup requests for "
+              f"{hedge_report['requests']} calls (+{hedge_report['extra_load_pct']:.1f}% load), "
+              f"{hedge_report['backup_wins']} backup wins, {hedge_report['cancelled']} cancelled")
+    
+    # The final summary covers resumed and new iterations alike
+    all_summaries, all_results = compact_results(log_path, None if adaptive else iterations)
+    if not all_summaries:
+        print("\n✗ No successful iterations; nothing to summarize")
+        return
     
     # Final comparison
     print("\n\n" + "="*60)
     print("FINAL COMPARISON")
     print("="*60)
-    print(f"\n{'Strategy':<20} {'Relevance':<12} {'Clarity':<10} {'Format':<10} {'Time':<8} {'Parse%':<8}")
-    print("-" * 68)
+    print(f"\n{'Strategy':<20} {'Relevance':<12} {'Clarity':<10} {'Format':<10} {'Time':<8} {'Parse%':<8}"
+          f" {'p95':<8} {'p99':<8} {'Tok/s':<7} {'$/iter':<8}")
+    print("-" * 103)
     
     for summary in all_summaries:
+        cost = summary.get("avg_cost_usd")
         print(f"{summary['strategy']:<20} "
               f"{summary['avg_relevance']:<12.1f} "
               f"{summary['avg_clarity']:<10.1f} "
               f"{summary['avg_format']:<10.1f} "
               f"{summary['avg_time']:<8.2f}s "
-              f"{summary['parse_success_rate']:<8.0f}%")
+              f"{summary['parse_success_rate']:<8.0f}% "
+              f"{summary['p95_time']:<7.2f}s "
+              f"{summary['p99_time']:<7.2f}s "
+              f"{summary.get('avg_tokens_per_second', 0):<7.1f} "
+              f"{f'${cost:.4f}' if cost is not None else '-':<8}")
     
     # Determine winner
     print("\n" + "="*60)
-    best_strategy = max(all_summaries, 
-                       key=lambda x: (x['avg_format'] * 0.4 + 
-                                     x['avg_relevance'] * 0.3 + 
-                                     x['avg_clarity'] * 0.2 + 
-                                     x['parse_success_rate'] * 0.1))
+    best_strategy = max(all_summaries, key=weighted_score)
     
     print(f"🏆 RECOMMENDED STRATEGY: {best_strategy['strategy'].upper()}")
     print(f"   Overall Score: {best_strategy['avg_format'] * 0.4 + best_strategy['avg_relevance'] * 0.3:.1f}")
     print("="*60)
     
-    # Save results
-    with open("research/results/experiment_results.json", "w") as f:
-        json.dump({
-            "summaries": all_summaries,
-            "detailed_results": all_results,
-            "winner": best_strategy['strategy']
-        }, f, indent=2)
+    # Save results: the JSON file, and the columnar store run_demo reads
+    metadata = {
+        "model_used": MODEL if cascade_report is None else cascade_report["models"],
+        "iterations_per_strategy": iterations,
+        "winner": best_strategy['strategy'],
+        **({"allocation": allocation_report} if allocation_report else {}),
+        **({"hedging": hedge_report} if hedge_report else {}),
+        **({"cascade": cascade_report} if cascade_report else {})
+    }
+    with open(output_path, "w") as f:
+        json.dump({**metadata, "summaries": all_summaries, "detailed_results": all_results},
+                  f, indent=2)
     
-    print("\n✓ Results saved to research/results/experiment_results.json")
+    print(f"\n✓ Results saved to {output_path}")
+    if store_path:
+        # Grouped in STRATEGIES order, which the store's summaries keep
+        rank = {name: i for i, (name, _) in enumerate(STRATEGIES)}
+        records = sorted(latest_records(log_path), key=lambda r: rank.get(r["strategy"], len(rank)))
+        store = ResultsStore.rebuild(records, store_path, metadata)
+        print(f"✓ {len(store)} iteration records stored in {store_path}")
 
 
 if __name__ == "__main__":
-    # Check API key
-    if not os.getenv("OPENAI_API_KEY"):
+    parser = argparse.ArgumentParser(description="Prompt engineering research experiment")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help=f"iterations per strategy (default: 3, or a cap of "
+                             f"{DEFAULT_MAX_SAMPLES} with --adaptive)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="max concurrent API requests (default: 8)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="run strategies one after another like the original loop")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream responses and record time-to-first-token metrics")
+    parser.add_argument("--stop-after", type=int, default=STOP_AFTER_QUESTIONS,
+                        help="close a stream after this many complete questions, 0 = never "
+                             f"(default: {STOP_AFTER_QUESTIONS})")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip iterations already recorded in the results log")
+    parser.add_argument("--results-log", default=DEFAULT_LOG_PATH,
+                        help=f"append-only per-iteration log (default: {DEFAULT_LOG_PATH})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH,
+                        help=f"summary JSON compacted from the log (default: {DEFAULT_OUTPUT_PATH})")
+    parser.add_argument("--results-store", default=DEFAULT_STORE_PATH,
+                        help=f"columnar per-iteration store, '' to skip "
+                             f"(default: {DEFAULT_STORE_PATH})")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH,
+                        help=f"compressed archive of every full response for "
+                             f"response_archive.py rescore, '' to skip "
+                             f"(default: {DEFAULT_ARCHIVE_PATH})")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES,
+                        default=os.getenv("LLM_CACHE_MODE", "off"),
+                        help="response cache mode; 'replay' runs fully offline (default: off)")
+    parser.add_argument("--cache-path", default=None,
+                        help=f"response cache file (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--cache-max-mb", type=int, default=None,
+                        help=f"cache size budget in MB (default: {DEFAULT_MAX_BYTES // 2**20})")
+    parser.add_argument("--hedge", nargs="?", type=float, const=DEFAULT_HEDGE_PERCENTILE,
+                        default=None, metavar="PERCENTILE",
+                        help=f"send a backup request when a call is slower than this latency "
+                             f"percentile; first parseable response wins "
+                             f"(default percentile: {DEFAULT_HEDGE_PERCENTILE:g})")
+    parser.add_argument("--hedge-model", default=None,
+                        help="model for backup requests (default: same as primary)")
+    parser.add_argument("--hedge-strategy", choices=[name for name, _ in STRATEGIES],
+                        default=None,
+                        help="strategy for backup requests (default: same as primary)")
+    parser.add_argument("--cascade", nargs="?", const=",".join(DEFAULT_CASCADE), default=None,
+                        metavar="MODELS",
+                        help=f"comma-separated models tried cheapest first, escalating on "
+                             f"parse/quality failure (default: {','.join(DEFAULT_CASCADE)})")
+    parser.add_argument("--cascade-min-relevance", type=float, default=DEFAULT_MIN_RELEVANCE,
+                        help=f"relevance below which a tier escalates "
+                             f"(default: {DEFAULT_MIN_RELEVANCE:g})")
+    parser.add_argument("--cascade-min-format", type=float, default=DEFAULT_MIN_FORMAT,
+                        help=f"format score below which a tier escalates "
+                             f"(default: {DEFAULT_MIN_FORMAT:g})")
+    parser.add_argument("--question-bank", nargs="?", const=DEFAULT_BANK_PATH,
+                        default=os.getenv("QUESTION_BANK"),
+                        help=f"store every evaluated question in a searchable bank "
+                             f"(default path: {DEFAULT_BANK_PATH})")
+    parser.add_argument("--rpm", type=float, default=rate_limiter.rpm,
+                        help=f"requests-per-minute budget (default: OPENAI_RPM or {DEFAULT_RPM})")
+    parser.add_argument("--tpm", type=float, default=rate_limiter.tpm,
+                        help=f"tokens-per-minute budget (default: OPENAI_TPM or {DEFAULT_TPM})")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="allocate iterations by successive elimination; --iterations "
+                             "becomes the per-strategy cap")
+    parser.add_argument("--min-iterations", type=int, default=DEFAULT_MIN_SAMPLES,
+                        help=f"iterations every strategy gets before elimination "
+                             f"(default: {DEFAULT_MIN_SAMPLES})")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help=f"confidence required to eliminate a strategy "
+                             f"(default: {DEFAULT_CONFIDENCE})")
+    parser.add_argument("--allocation", choices=ALLOCATION_METHODS, default="lucb",
+                        help="which surviving strategies get each adaptive round (default: lucb)")
+    args = parser.parse_args()
+    if args.adaptive and args.sequential:
+        parser.error("--adaptive runs rounds concurrently and can't be combined with --sequential")
+    if args.hedge is not None and (args.sequential or args.stream):
+        parser.error("--hedge needs the concurrent, non-streaming runner")
+    if args.cascade and (args.stream or args.hedge is not None):
+        parser.error("--cascade can't be combined with --stream or --hedge")
+    
+    configure_cache(args.cache_mode, args.cache_path,
+                    args.cache_max_mb * 2**20 if args.cache_max_mb else None)
+    configure_rate_limits(args.rpm, args.tpm)
+    configure_question_bank(args.question_bank)
+    configure_archive(args.archive)
+    configure_hedging(args.hedge, args.hedge_model, args.hedge_strategy)
+    configure_cascade(args.cascade.split(",") if args.cascade else None,
+                      args.cascade_min_relevance, args.cascade_min_format)
+    
+    # Check API key (not needed when replaying cached responses or when
+    # OPENAI_BASE_URL points at a local stand-in such as fake_openai_server.py)
+    if (not os.getenv("OPENAI_API_KEY") and not os.getenv("OPENAI_BASE_URL")
+            and args.cache_mode != "replay"):
         print("⚠️  WARNING: OPENAI_API_KEY not set!")
         print("Set it with: $env:OPENAI_API_KEY = 'your-key-here'")
         print("\nRunning in DEMO MODE with simulated results...\n")
@@ -373,6 +1278,16 @@ if __name__ == "__main__":
         print("  4. Structured Template Prompting (XML)")
         print("\nEach strategy would be tested 3 times with real OpenAI API calls.")
         print("\nTo run real experiment: Set OPENAI_API_KEY and run again.")
+        print("\nTo run against a local fake API (no key, no cost):")
+        print("  python research/fake_openai_server.py --port 8000")
+        print("  $env:OPENAI_BASE_URL = 'http://127.0.0.1:8000/v1'")
+        print("  python research/prompt_engineering_experiment.py")
     else:
-        main()
+        iterations = args.iterations or (DEFAULT_MAX_SAMPLES if args.adaptive else 3)
+        main(iterations=iterations, concurrency=args.concurrency,
+             sequential=args.sequential, stream=args.stream,
+             stop_after_questions=args.stop_after, log_path=args.results_log,
+             output_path=args.output, resume=args.resume, adaptive=args.adaptive,
+             min_iterations=args.min_iterations, confidence=args.confidence,
+             allocation=args.allocation, store_path=args.results_store)
 
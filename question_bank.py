@@ -0,0 +1,227 @@
+"""
+Question Bank
+Persistent, indexed store of every generated question
+
+Each evaluated response used to survive only as the first 200 characters of
+``sample_output``. The bank keeps every parsed question in SQLite together
+with its type, difficulty, category, per-question relevance and clarity
+scores, the strategy and model that produced it and the hash of the job
+description it was written for. Filters are served from ordinary indexes and
+free-text search from an FTS5 index over the question text, so a repeat job
+description can be answered from the bank in milliseconds instead of a
+multi-second generation call.
+
+Per-question relevance is on a 0-10 scale: the share of the job
+description's skills the question covers, where covering three (or all of
+them, for a job listing fewer) scores 10 (see
+``evaluate_question_relevance``).
+
+Usage:
+    from question_bank import QuestionBank
+    bank = QuestionBank()
+    bank.query(job_hash(job_desc), difficulty="senior", category="system_design",
+               min_relevance=8, limit=5)
+
+    python research/question_bank.py query --job job.txt --difficulty senior --min-relevance 8
+    python research/question_bank.py stats
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from keyword_index import job_hash as compute_job_hash
+
+DEFAULT_BANK_PATH = "research/results/question_bank.sqlite3"
+
+QUESTION_COLUMNS = ("id", "job_hash", "strategy", "model", "text", "type", "difficulty",
+                    "category", "relevance", "clarity", "created_at")
+
+
+class QuestionBank:
+    """SQLite question store with filter indexes and FTS5 text search"""
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self.has_fts = False
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    job_hash TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    model TEXT,
+                    text TEXT NOT NULL,
+                    type TEXT,
+                    difficulty TEXT,
+                    category TEXT,
+                    relevance REAL,
+                    clarity REAL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (job_hash, text)
+                );
+                CREATE INDEX IF NOT EXISTS idx_job ON questions(job_hash, difficulty, category);
+                CREATE INDEX IF NOT EXISTS idx_relevance ON questions(relevance);
+            """)
+            try:
+                # External-content FTS table kept in sync by triggers
+                self._conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts
+                        USING fts5(text, content='questions', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+                        INSERT INTO questions_fts(rowid, text) VALUES (new.id, new.text);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+                        INSERT INTO questions_fts(questions_fts, rowid, text)
+                            VALUES ('delete', old.id, old.text);
+                    END;
+                """)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: text search falls back to LIKE
+                self.has_fts = False
+            self._conn.commit()
+        return self._conn
+
+    def add(self, job_hash: str, strategy: str, questions: Iterable[Dict],
+            model: str = None) -> int:
+        """Store scored questions for a job; returns how many were new.
+
+        Each question is a ``Question.to_dict()`` plus optional ``relevance``
+        and ``clarity``. A question already banked for the same job is kept
+        as it was first stored.
+        """
+        now = time.time()
+        rows = [(job_hash, strategy, model, q["text"], q.get("type"), q.get("difficulty"),
+                 q.get("category"), q.get("relevance"), q.get("clarity"), now)
+                for q in questions if q.get("text")]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.executemany("""
+                INSERT OR IGNORE INTO questions
+                    (job_hash, strategy, model, text, type, difficulty, category,
+                     relevance, clarity, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+            return cursor.rowcount
+
+    def query(self, job_hash: str = None, difficulty: str = None, type: str = None,
+              category: str = None, strategy: str = None, min_relevance: float = None,
+              min_clarity: float = None, match: str = None, limit: int = 5) -> List[Dict]:
+        """Best matching questions, highest relevance then clarity first.
+
+        ``match`` is an FTS5 query over the question text (``"index* AND
+        postgres"``); without FTS5 it is a plain substring filter.
+        """
+        clauses, params = [], []
+        for column, value in (("job_hash", job_hash), ("strategy", strategy)):
+            if value is not None:
+                clauses.append(f"q.{column} = ?")
+                params.append(value)
+        for column, value in (("difficulty", difficulty), ("type", type), ("category", category)):
+            if value is not None:
+                clauses.append(f"q.{column} = ?")
+                params.append(value.lower())
+        for column, value in (("relevance", min_relevance), ("clarity", min_clarity)):
+            if value is not None:
+                clauses.append(f"q.{column} >= ?")
+                params.append(value)
+
+        with self._lock:
+            conn = self._connect()
+            source = "questions q"
+            if match is not None and self.has_fts:
+                source += " JOIN questions_fts f ON f.rowid = q.id"
+                clauses.append("questions_fts MATCH ?")
+                params.append(match)
+            elif match is not None:
+                clauses.append("q.text LIKE ?")
+                params.append(f"%{match}%")
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(f"""
+                SELECT {', '.join(f'q.{c}' for c in QUESTION_COLUMNS)} FROM {source} {where}
+                ORDER BY q.relevance DESC, q.clarity DESC, q.id
+                LIMIT ?
+            """, params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def serve(self, job_desc: str, count: int = 5, **filters) -> Optional[List[Dict]]:
+        """``count`` banked questions for a job description, or None if the
+        bank can't fill the request and the caller has to generate"""
+        questions = self.query(compute_job_hash(job_desc), limit=count, **filters)
+        return questions if len(questions) >= count else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            conn = self._connect()
+            total, jobs = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT job_hash) FROM questions").fetchone()
+            by_strategy = dict(conn.execute(
+                "SELECT strategy, COUNT(*) FROM questions GROUP BY strategy").fetchall())
+        return {"questions": total, "jobs": jobs, "by_strategy": by_strategy}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the persistent question bank")
+    parser.add_argument("--bank", default=DEFAULT_BANK_PATH,
+                        help=f"question bank file (default: {DEFAULT_BANK_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="print banked questions matching filters")
+    query.add_argument("--job", default=None,
+                       help="file with the job description to serve questions for")
+    query.add_argument("--job-hash", default=None, help="job hash instead of --job")
+    query.add_argument("--difficulty", default=None)
+    query.add_argument("--type", default=None)
+    query.add_argument("--category", default=None)
+    query.add_argument("--strategy", default=None)
+    query.add_argument("--min-relevance", type=float, default=None)
+    query.add_argument("--min-clarity", type=float, default=None)
+    query.add_argument("--match", default=None, help="FTS5 full-text query on question text")
+    query.add_argument("-n", "--count", type=int, default=5,
+                       help="number of questions (default: 5)")
+
+    commands.add_parser("stats", help="print question and job counts")
+    args = parser.parse_args()
+
+    bank = QuestionBank(args.bank)
+    if args.command == "stats":
+        stats = bank.stats()
+        print(f"✓ {stats['questions']} questions for {stats['jobs']} jobs")
+        for strategy, count in sorted(stats["by_strategy"].items()):
+            print(f"  {strategy:<20} {count}")
+    else:
+        hash_ = args.job_hash
+        if args.job:
+            with open(args.job, encoding="utf-8") as f:
+                hash_ = compute_job_hash(f.read())
+        questions = bank.query(hash_, args.difficulty, args.type, args.category, args.strategy,
+                               args.min_relevance, args.min_clarity, args.match, args.count)
+        if not questions:
+            print("✗ No banked questions match")
+        for n, q in enumerate(questions, 1):
+            tags = ", ".join(filter(None, (q["type"], q["difficulty"], q["category"])))
+            print(f"{n}. {q['text']}")
+            print(f"   [{tags or 'untagged'}] relevance {q['relevance'] or 0:.1f}, "
+                  f"clarity {q['clarity'] or 0:.1f}, {q['strategy']}")
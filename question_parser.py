@@ -0,0 +1,254 @@
+"""
+Incremental Question Parser
+Turns model output into typed question records while it is still streaming
+
+The structured strategy's ``<questions>`` XML is fed chunk by chunk into an
+``xml.etree.ElementTree.XMLPullParser``; every ``</question>`` that arrives
+yields a ``Question`` immediately, so downstream code can start on question 1
+while the model is still writing question 5.
+
+LLM output is not always well-formed XML (preamble text, markdown fences,
+unescaped ``&`` or ``<`` inside question text, truncated endings), so on a
+parse error the parser falls back to a tolerant tag scanner for the rest of
+the response, and ``close()`` salvages a truncated final question. Text
+after ``</questions>`` is ignored.
+"""
+
+import html
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+QUESTION_FIELDS = ("id", "text", "type", "difficulty", "category")
+
+_ROOT_END = "</questions>"
+_QUESTION_BLOCK = re.compile(r"<question>(.*?)</question>", re.DOTALL)
+_FIELD = re.compile(r"<(id|text|type|difficulty|category)>(.*?)</\1>", re.DOTALL)
+_OPEN_FIELD = re.compile(r"<(id|text|type|difficulty|category)>")
+_NUMBERED_LINE = re.compile(r"^\s*(?:\*\*)?(?:Question\s*)?(\d+)[.):]\s*(?:\*\*)?\s*(.*)$",
+                            re.IGNORECASE)
+
+
+@dataclass
+class Question:
+    """One generated interview question"""
+    text: str
+    id: Optional[int] = None
+    type: Optional[str] = None
+    difficulty: Optional[str] = None
+    category: Optional[str] = None
+    complete: bool = True  # False when salvaged from a truncated response
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.strip()
+    return value or None
+
+
+def _question_from_fields(fields: Dict[str, str], complete: bool = True) -> Optional[Question]:
+    text = _clean(fields.get("text"))
+    if not text:
+        return None
+    category = _clean(fields.get("category"))
+    return Question(
+        text=text,
+        id=_to_int(fields.get("id")),
+        type=(_clean(fields.get("type")) or "").lower() or None,
+        difficulty=(_clean(fields.get("difficulty")) or "").lower() or None,
+        category=category.lower() if category else None,
+        complete=complete
+    )
+
+
+def _fields_from_block(block: str, complete: bool = True) -> Dict[str, str]:
+    """Field values of one ``<question>`` block.
+
+    With ``complete=False`` (a block cut off mid-stream) an unterminated
+    last field is kept too, minus any partial closing tag.
+    """
+    fields = {}
+    end = 0
+    for match in _FIELD.finditer(block):
+        fields[match.group(1)] = html.unescape(match.group(2))
+        end = match.end()
+    if not complete:
+        opened = None
+        for opened in _OPEN_FIELD.finditer(block, end):
+            pass
+        if opened is not None and opened.group(1) not in fields:
+            value = re.sub(r"<[^>]*$", "", block[opened.end():])
+            fields[opened.group(1)] = html.unescape(value)
+    return fields
+
+
+class StreamingQuestionParser:
+    """Incremental parser for the structured strategy's ``<questions>`` XML.
+
+    Call ``feed(chunk)`` as text arrives; it returns the questions completed
+    by that chunk. ``close()`` flushes the parser and returns a salvaged
+    trailing question, if any. All questions so far are in ``questions``.
+    """
+
+    def __init__(self):
+        self.questions: List[Question] = []
+        self.has_root = False      # saw <questions>
+        self.root_closed = False   # saw </questions>
+        self.recovered = False     # fell back to the tolerant scanner
+        self._pending = ""         # text before <questions> has been found
+        self._raw = ""             # everything from <questions> onwards
+        self._scan_pos = 0         # tolerant scanner position in _raw
+        self._blocks_seen = 0      # </question> blocks the pull parser consumed
+        self._pull = ET.XMLPullParser(events=("end",))
+
+    def feed(self, chunk: str) -> List[Question]:
+        if self.root_closed or not chunk:
+            return []
+
+        if not self.has_root:
+            self._pending += chunk
+            start = self._pending.find("<questions>")
+            if start == -1:
+                # Keep only a tail that could hold a split "<questions>" tag
+                self._pending = self._pending[-len("<questions>"):]
+                return []
+            self.has_root = True
+            chunk = self._pending[start:]
+            self._pending = ""
+
+        # Drop anything after </questions> (closing remarks, code fences)
+        search_from = max(0, len(self._raw) - len(_ROOT_END) + 1)
+        self._raw += chunk
+        end = self._raw.find(_ROOT_END, search_from)
+        if end != -1:
+            excess = len(self._raw) - (end + len(_ROOT_END))
+            self._raw = self._raw[:end + len(_ROOT_END)]
+            chunk = chunk[:len(chunk) - excess]
+        if self.recovered:
+            return self._scan()
+
+        new = []
+        try:
+            self._pull.feed(chunk)
+            self._drain(new)
+        except ET.ParseError:
+            new += self._recover()
+        return new
+
+    def _drain(self, new: List[Question]):
+        # Questions are recorded as they are read: read_events() can raise
+        # after yielding some, and _recover skips every block counted here
+        for _, elem in self._pull.read_events():
+            if elem.tag == "question":
+                self._blocks_seen += 1
+                fields = {name: elem.findtext(name) for name in QUESTION_FIELDS}
+                question = _question_from_fields(fields)
+                if question is not None:
+                    new.append(question)
+                    self.questions.append(question)
+                elem.clear()
+            elif elem.tag == "questions":
+                self.root_closed = True
+
+    def _recover(self) -> List[Question]:
+        """Switch to the tolerant scanner after a well-formedness error"""
+        self.recovered = True
+        self._pull = None
+        # Skip the blocks the pull parser already consumed, including any
+        # it dropped for having no text
+        for _ in range(self._blocks_seen):
+            match = _QUESTION_BLOCK.search(self._raw, self._scan_pos)
+            if match is None:
+                break
+            self._scan_pos = match.end()
+        return self._scan()
+
+    def _scan(self) -> List[Question]:
+        new = []
+        for match in _QUESTION_BLOCK.finditer(self._raw, self._scan_pos):
+            question = _question_from_fields(_fields_from_block(match.group(1)))
+            if question is not None:
+                new.append(question)
+            self._scan_pos = match.end()
+        if "</questions>" in self._raw[self._scan_pos:]:
+            self.root_closed = True
+        self.questions.extend(new)
+        return new
+
+    def close(self) -> List[Question]:
+        """Finish parsing; returns a salvaged truncated question, if any"""
+        if self.root_closed or not self.has_root:
+            return []
+
+        # Truncated response: the tolerant scanner picks up any complete
+        # blocks the pull parser hasn't reported, then the open tail block
+        new = self._recover() if not self.recovered else self._scan()
+        tail = self._raw[self._scan_pos:]
+        start = tail.rfind("<question>")
+        if start != -1:
+            question = _question_from_fields(_fields_from_block(tail[start:], complete=False),
+                                             complete=False)
+            if question is not None:
+                new.append(question)
+                self.questions.append(question)
+        return new
+
+
+def parse_question_stream(chunks: Iterable[str]) -> Iterator[Question]:
+    """Yield questions from a stream of text chunks as soon as each completes"""
+    parser = StreamingQuestionParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_structured_response(text: str) -> StreamingQuestionParser:
+    """Parse a complete structured response in one pass"""
+    parser = StreamingQuestionParser()
+    parser.feed(text)
+    parser.close()
+    return parser
+
+
+def extract_list_questions(text: str, strategy: str) -> List[Question]:
+    """Pull numbered questions out of a free-text (non-XML) response.
+
+    For chain-of-thought the longest numbered run is used, so the restated
+    analysis steps ("1. What are the key skills required?") are skipped.
+    """
+    runs = [[]]
+    for line in text.split("\n"):
+        match = _NUMBERED_LINE.match(line)
+        if not match or "?" not in line:
+            continue
+        number = int(match.group(1))
+        if number == 1 and runs[-1]:
+            runs.append([])
+        question_text = match.group(2).strip().strip('*"').strip()
+        if question_text.lower().startswith("question:"):
+            question_text = question_text[len("question:"):].strip().strip('"')
+        runs[-1].append(Question(text=question_text, id=number))
+
+    if strategy == "chain_of_thought":
+        # max() keeps the first of equal-length runs; reverse so the last wins
+        return max(reversed(runs), key=len)
+    return [question for run in runs for question in run]
+
+
+def extract_questions(text: str, strategy: str) -> List[Question]:
+    """Typed questions from a complete response of any strategy"""
+    if strategy == "structured":
+        return parse_structured_response(text).questions
+    return extract_list_questions(text, strategy)
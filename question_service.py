@@ -0,0 +1,293 @@
+"""
+Question Generation Service
+Long-lived local HTTP service around the prompt strategies
+
+Exposes question generation with any of the four strategies over plain
+HTTP (stdlib asyncio, no web framework) so the structured strategy can be
+embedded behind a production backend:
+
+    POST /v1/questions   {"job_description": "...", "strategy": "structured"}
+    GET  /v1/stats       request, coalescing and queue counters
+    GET  /healthz
+
+Bursty traffic tends to repeat itself: many users opening the same job
+posting at once. Requests are coalesced single-flight style on
+``(job_hash, strategy)``: the first caller starts the upstream LLM call and
+every identical request that arrives while it is in flight awaits the same
+result, so N simultaneous callers cost one call. At most ``max_inflight``
+upstream calls run at once and at most ``max_queue`` distinct requests may
+be waiting or running; beyond that the service answers 503 with
+``Retry-After`` instead of queueing without bound. With a question bank
+configured, jobs it can already fill are answered without any LLM call.
+With ``--hedge`` a slow upstream call gets a backup request (see hedging.py).
+
+Question bank lookups and the scoring of each response (which writes to the
+bank and the response archive) run on one worker thread, so SQLite never
+blocks the event loop and the service's diversity indexes are only touched
+from that thread. Diversity is tracked per job, for the most recently seen
+jobs only (see diversity.py), so a long-running service stays bounded.
+
+Usage:
+    python research/question_service.py --port 8080 --max-inflight 8 --max-queue 64
+    curl -s localhost:8080/v1/questions -d '{"job_description": "...", "strategy": "few_shot"}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Tuple
+
+import prompt_engineering_experiment as experiment
+from diversity import QuestionIndexes
+from hedging import DEFAULT_HEDGE_PERCENTILE
+from keyword_index import job_hash
+from prompt_engineering_experiment import (CACHE_MODES, STRATEGIES, complete_async,
+                                           configure_cache, configure_hedging,
+                                           configure_question_bank, configure_rate_limits,
+                                           evaluate_response, example_questions,
+                                           generate_hedged_async, rate_limiter)
+from question_bank import DEFAULT_BANK_PATH
+from question_parser import extract_questions, parse_structured_response
+
+DEFAULT_PORT = 8080
+DEFAULT_MAX_INFLIGHT = 8
+DEFAULT_MAX_QUEUE = 64
+MAX_BODY_BYTES = 1024 * 1024
+
+PROMPTS = dict(STRATEGIES)
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+class ServiceBusy(Exception):
+    """Raised when the in-flight queue is full"""
+
+
+class QuestionService:
+    """Single-flight, bounded front end to question generation"""
+
+    def __init__(self, max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._flights: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._running = 0
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="question-service")
+        self._diversity = QuestionIndexes(example_questions)
+        self.counters = {"requests": 0, "coalesced": 0, "rejected": 0,
+                         "upstream_calls": 0, "bank_hits": 0, "errors": 0}
+
+    async def generate(self, job_desc: str, strategy: str) -> Dict:
+        """Questions for a job, sharing any identical request already in flight"""
+        self.counters["requests"] += 1
+        key = (job_hash(job_desc), strategy)
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+        else:
+            if len(self._flights) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise ServiceBusy(f"{len(self._flights)} requests in flight")
+            flight = asyncio.ensure_future(self._run(job_desc, strategy))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        # A caller disconnecting must not cancel the call other callers share
+        return await asyncio.shield(flight)
+
+    async def _in_worker(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._worker, partial(func, *args, **kwargs))
+
+    async def _run(self, job_desc: str, strategy: str) -> Dict:
+        bank = experiment.question_bank
+        if bank is not None:
+            banked = await self._in_worker(bank.serve, job_desc, strategy=strategy)
+            if banked:
+                self.counters["bank_hits"] += 1
+                return {"strategy": strategy, "source": "bank", "questions": banked}
+
+        async with self._slots:
+            self._running += 1
+            try:
+                return await self._call(job_desc, strategy)
+            except Exception:
+                self.counters["errors"] += 1
+                raise
+            finally:
+                self._running -= 1
+
+    async def _call(self, job_desc: str, strategy: str) -> Dict:
+        self.counters["upstream_calls"] += 1
+        if experiment.hedge_policy is not None:
+            content, generation_time, metrics, strategy, hedge_info = \
+                await generate_hedged_async(strategy, PROMPTS[strategy], job_desc)
+            metrics = {**metrics, **hedge_info}
+        else:
+            content, generation_time, metrics = await complete_async(PROMPTS[strategy](job_desc))
+        parsed = parse_structured_response(content) if strategy == "structured" else None
+        result = await self._in_worker(self._evaluate, content, strategy, generation_time,
+                                       job_desc, metrics, parsed)
+        result.pop("sample_output", None)
+        questions = parsed.questions if parsed is not None else extract_questions(content, strategy)
+        return {"strategy": strategy, "source": "llm", **result,
+                "questions": [q.to_dict() for q in questions]}
+
+    def _evaluate(self, content: str, strategy: str, generation_time: float, job_desc: str,
+                  metrics: Dict, parsed) -> Dict:
+        # Worker thread: the diversity index, bank and archive are only used here
+        return evaluate_response(content, strategy, 1, generation_time, job_desc, metrics,
+                                 parsed, diversity_index=self._diversity.get(job_hash(job_desc)))
+
+    def close(self):
+        self._worker.shutdown(wait=True)
+
+    def stats(self) -> Dict:
+        return {**self.counters, "in_flight": self._running,
+                "queued": len(self._flights) - self._running, "max_queue": self.max_queue,
+                "rate_limiter": rate_limiter.stats(),
+                **({"hedging": experiment.hedge_policy.report()}
+                   if experiment.hedge_policy is not None else {})}
+
+
+# ============================================================================
+# HTTP FRONT END
+# ============================================================================
+
+async def _read_request(reader: asyncio.StreamReader):
+    """``(method, path, headers, body)`` of the next request, or None at EOF"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload: Dict, keep_alive: bool, extra_headers: Dict = None) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body)),
+               "Connection": "keep-alive" if keep_alive else "close", **(extra_headers or {})}
+    head = f"HTTP/1.1 {status} {_REASONS[status]}\r\n" + "".join(
+        f"{name}: {value}\r\n" for name, value in headers.items())
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+async def _route(service: QuestionService, method: str, path: str, body: bytes):
+    """``(status, payload, extra headers)`` for one request"""
+    if path == "/healthz":
+        return 200, {"status": "ok"}, None
+    if path == "/v1/stats":
+        return 200, service.stats(), None
+    if path != "/v1/questions":
+        return 404, {"error": f"no route for {path}"}, None
+    if method != "POST":
+        return 405, {"error": "use POST"}, {"Allow": "POST"}
+
+    try:
+        request = json.loads(body or b"{}")
+        job_desc = request["job_description"]
+        strategy = request.get("strategy", "structured")
+    except (ValueError, KeyError, TypeError):
+        return 400, {"error": "expected JSON with a job_description"}, None
+    if strategy not in PROMPTS:
+        return 400, {"error": f"unknown strategy {strategy!r}",
+                     "strategies": list(PROMPTS)}, None
+
+    try:
+        return 200, await service.generate(job_desc, strategy), None
+    except ServiceBusy as e:
+        return 503, {"error": f"overloaded: {e}"}, {"Retry-After": "1"}
+    except Exception as e:
+        return 502, {"error": f"upstream error: {e}"}, None
+
+
+async def handle_connection(service: QuestionService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+    """Serve requests on one (keep-alive) connection until the client closes it"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ValueError as e:
+                writer.write(_response(413 if "large" in str(e) else 400,
+                                       {"error": str(e)}, keep_alive=False))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            status, payload, extra = await _route(service, method, path, body)
+            writer.write(_response(status, payload, keep_alive, extra))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                max_inflight: int = DEFAULT_MAX_INFLIGHT, max_queue: int = DEFAULT_MAX_QUEUE):
+    service = QuestionService(max_inflight, max_queue)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    print(f"✓ Question service listening on http://{host}:{port} "
+          f"(max {max_inflight} in flight, queue {max_queue})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve interview question generation over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"(default: {DEFAULT_PORT})")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT,
+                        help=f"concurrent upstream LLM calls (default: {DEFAULT_MAX_INFLIGHT})")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f"distinct requests waiting or running before answering 503 "
+                             f"(default: {DEFAULT_MAX_QUEUE})")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES,
+                        default=os.getenv("LLM_CACHE_MODE", "off"),
+                        help="response cache mode (default: off)")
+    parser.add_argument("--question-bank", nargs="?", const=DEFAULT_BANK_PATH,
+                        default=os.getenv("QUESTION_BANK"),
+                        help=f"answer from and add to a question bank "
+                             f"(default path: {DEFAULT_BANK_PATH})")
+    parser.add_argument("--hedge", nargs="?", type=float, const=DEFAULT_HEDGE_PERCENTILE,
+                        default=None, metavar="PERCENTILE",
+                        help=f"send a backup request when a call is slower than this latency "
+                             f"percentile (default percentile: {DEFAULT_HEDGE_PERCENTILE:g})")
+    parser.add_argument("--hedge-model", default=None,
+                        help="cheaper model for backup requests (default: same as primary)")
+    parser.add_argument("--rpm", type=float, default=rate_limiter.rpm,
+                        help="requests-per-minute budget")
+    parser.add_argument("--tpm", type=float, default=rate_limiter.tpm,
+                        help="tokens-per-minute budget")
+    args = parser.parse_args()
+
+    configure_cache(args.cache_mode)
+    configure_rate_limits(args.rpm, args.tpm)
+    configure_question_bank(args.question_bank)
+    configure_hedging(args.hedge, args.hedge_model)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_inflight, args.max_queue))
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
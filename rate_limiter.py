@@ -0,0 +1,276 @@
+"""
+Adaptive Rate Limiter
+Shared requests/tokens-per-minute budget with 429-aware retries
+
+Every API request first takes one unit from a requests-per-minute bucket
+and its estimated token cost (prompt + ``max_tokens``, which is what the
+provider counts up front) from a tokens-per-minute bucket; the unused part
+of the token estimate is refunded once the response reports its usage.
+
+Rate-limit (429), server (5xx) and connection errors are retried with
+jittered exponential backoff. A ``Retry-After`` header from the provider is
+honoured and pauses every caller, not only the one that was throttled.
+The budgets adapt AIMD-style: each throttle halves the effective rate,
+each success wins back a small step, up to the configured ceiling.
+
+This is the only retry layer: the wrapped SDK clients must be built with
+``max_retries=0``, otherwise the SDK retries 429s itself (honouring
+Retry-After) and the throttle never reaches the AIMD adaptation here.
+
+The buckets are plain thread-safe counters that only *compute* waits, so
+one limiter serves the sync client (``time.sleep``) and the async client
+(``asyncio.sleep``) alike.
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional
+
+from openai import APIConnectionError, APIStatusError
+
+from instrumentation import estimate_tokens
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 150_000
+MAX_RETRIES = 6
+BASE_BACKOFF = 1.0    # seconds
+MAX_BACKOFF = 60.0
+MIN_RATE_SCALE = 0.05
+RECOVERY_STEP = 0.02  # fraction of the ceiling regained per success
+DECREASE_COOLDOWN = 2.0  # a burst of 429s from one spike halves the rate once
+
+# Seconds the current request spent waiting on the budget and on retries
+# before its successful attempt, so callers can keep it out of latency
+request_wait = contextvars.ContextVar("request_wait", default=0.0)
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    before using what it took; the level may go negative (debt), which
+    orders callers fairly without a queue.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        self.burst_seconds = burst_seconds
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` and return the seconds to wait before it is covered"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float):
+        with self._lock:
+            self.level = min(self.capacity, self.level + amount)
+
+    def set_rate(self, rate_per_minute: float):
+        """Change the refill rate; the burst capacity scales with it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate_per_minute / 60.0
+            self.capacity = max(1.0, self.rate * self.burst_seconds)
+            self.level = min(self.level, self.capacity)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx and connection/timeout errors are worth retrying"""
+    if isinstance(error, APIConnectionError):
+        return True
+    status = _status_code(error)
+    return isinstance(error, APIStatusError) and status is not None and (status == 429 or status >= 500)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by the provider's Retry-After headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue  # HTTP-date form; fall back to our own backoff
+    return None
+
+
+def request_tokens(params: Dict) -> int:
+    """Token cost the provider charges against TPM when a request is admitted"""
+    prompt = "".join(str(m.get("content", "")) for m in params.get("messages", ()))
+    return estimate_tokens(prompt) + params.get("max_tokens", 0)
+
+
+class RateLimiter:
+    """Shared RPM/TPM budget with AIMD adaptation and retry bookkeeping"""
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 max_retries: int = MAX_RETRIES):
+        self.max_retries = max_retries
+        self.configure(rpm, tpm)
+        self._lock = threading.Lock()
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def configure(self, rpm: float, tpm: float):
+        """Set the ceiling budgets (new buckets, adaptation reset)"""
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.scale = 1.0
+
+    def reserve(self, tokens: int) -> float:
+        """Take one request and ``tokens`` from the budget; returns the wait"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        return max(wait, self.paused_until - time.monotonic())
+
+    def settle(self, reserved: int, response):
+        """Refund the part of a token reservation the response didn't use"""
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.total_tokens < reserved:
+            self.tokens.refund(reserved - usage.total_tokens)
+
+    def _set_scale(self, scale: float):
+        self.scale = scale
+        self.requests.set_rate(self.rpm * scale)
+        self.tokens.set_rate(self.tpm * scale)
+
+    def on_success(self):
+        if self.scale < 1.0:
+            with self._lock:
+                self._set_scale(min(1.0, self.scale + RECOVERY_STEP))
+
+    def on_throttle(self, delay: Optional[float]):
+        """Multiplicative decrease, plus a global pause if the provider asked for one"""
+        now = time.monotonic()
+        with self._lock:
+            self.throttled += 1
+            if now - self._last_decrease >= DECREASE_COOLDOWN:
+                self._last_decrease = now
+                self._set_scale(max(MIN_RATE_SCALE, self.scale / 2))
+            if delay:
+                self.paused_until = max(self.paused_until, now + delay)
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before retry ``attempt`` (1-based) of a failed request"""
+        self.retries += 1
+        requested = retry_after(error)
+        if _status_code(error) == 429:
+            self.on_throttle(requested)
+        jittered = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+        return max(jittered, requested or 0.0)
+
+    def retry(self, call: Callable):
+        """Run a blocking ``call()`` that isn't a chat completion (file uploads,
+        batch polling) under the same retry and throttle policy, without
+        taking from the budgets"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self.backoff(attempt + 1, e))
+
+    def stats(self) -> Dict:
+        return {
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rate_scale": round(self.scale, 3),
+            "effective_rpm": round(self.rpm * self.scale),
+            "effective_tpm": round(self.tpm * self.scale)
+        }
+
+
+class _LimitedCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **params):
+        limiter = self._owner.limiter
+        reserved = request_tokens(params)
+        started = time.monotonic()
+        for attempt in range(limiter.max_retries + 1):
+            time.sleep(limiter.reserve(reserved))
+            request_wait.set(time.monotonic() - started)
+            try:
+                response = self._owner.client.chat.completions.create(**params)
+            except Exception as e:
+                if attempt == limiter.max_retries or not is_retryable(e):
+                    raise
+                limiter.tokens.refund(reserved)  # rejected requests aren't charged
+                time.sleep(limiter.backoff(attempt + 1, e))
+                continue
+            limiter.on_success()
+            if not params.get("stream"):
+                limiter.settle(reserved, response)
+            return response
+
+
+class _AsyncLimitedCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, **params):
+        limiter = self._owner.limiter
+        reserved = request_tokens(params)
+        started = time.monotonic()
+        for attempt in range(limiter.max_retries + 1):
+            await asyncio.sleep(limiter.reserve(reserved))
+            request_wait.set(time.monotonic() - started)
+            try:
+                response = await self._owner.client.chat.completions.create(**params)
+            except Exception as e:
+                if attempt == limiter.max_retries or not is_retryable(e):
+                    raise
+                limiter.tokens.refund(reserved)  # rejected requests aren't charged
+                await asyncio.sleep(limiter.backoff(attempt + 1, e))
+                continue
+            limiter.on_success()
+            if not params.get("stream"):
+                limiter.settle(reserved, response)
+            return response
+
+
+class RateLimitedClient:
+    """Drop-in wrapper exposing ``.chat.completions.create`` behind a RateLimiter"""
+
+    _completions_class = _LimitedCompletions
+
+    def __init__(self, client, limiter: RateLimiter):
+        self.client = client
+        self.limiter = limiter
+        self.chat = SimpleNamespace(completions=self._completions_class(self))
+
+
+class AsyncRateLimitedClient(RateLimitedClient):
+    """RateLimitedClient for ``AsyncOpenAI``"""
+
+    _completions_class = _AsyncLimitedCompletions
@@ -0,0 +1,321 @@
+"""
+Request Packing
+Generates structured question sets for several job descriptions per API call
+
+Every structured request repeats the system prompt and the XML example,
+which is most of the prompt, and returns questions for a single job. In
+packed mode N job descriptions go into one request, each wrapped in a
+``<job id="...">`` element, and the model answers with one
+``<job id="..."><questions>...</questions></job>`` block per job. The
+combined response is split back per job and every part goes through the
+usual structured evaluators, so the shared instructions and the round trip
+are paid once per pack instead of once per job.
+
+Token usage and cost are apportioned to the jobs in a pack (prompt tokens
+evenly, completion tokens by the length of each job's part), so per-job
+numbers stay comparable with unpacked runs. The run summary is aggregated
+as records stream out (running means, P² latency percentiles), so memory
+does not grow with the size of the job catalogue.
+
+Usage:
+    python research/request_packing.py jobs.jsonl --pack-size 5 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from corpus_runner import iter_job_descriptions
+from instrumentation import (PERCENTILES, P2Quantile, RunningStats, estimate_cost,
+                             usage_metrics)
+from keyword_index import job_hash
+from prompt_engineering_experiment import (CACHE_MODES, MODEL, SYSTEM_PROMPT, TEMPERATURE,
+                                           async_client, build_messages, configure_cache,
+                                           evaluate_response, print_summary, structured_prompt)
+from question_parser import parse_structured_response
+from rate_limiter import request_wait
+
+DEFAULT_OUTPUT = "research/results/packed_questions.jsonl"
+DEFAULT_PACK_SIZE = 5
+PACKED_STRATEGY = "structured_packed"
+TOKENS_PER_JOB = 600       # five questions in the XML schema run ~350 tokens
+MAX_PACKED_TOKENS = 4096   # completion limit of the larger chat models
+
+_JOB_OPEN = re.compile(r"""<job\s+id\s*=\s*["']?([^"'>\s]+)["']?\s*>""", re.IGNORECASE)
+_QUESTIONS_BLOCK = re.compile(r"<questions>.*?(?:</questions>|$)", re.DOTALL)
+
+
+def _schema_example() -> str:
+    # The <questions> example from structured_prompt, so both stay in sync
+    prompt = structured_prompt("")
+    return prompt[prompt.index("<questions>"):prompt.index("</questions>") + len("</questions>")]
+
+
+def packed_prompt(job_descs: List[str]) -> str:
+    """One prompt asking for a structured question set per job description"""
+    jobs = "\n\n".join(f'<job id="{n}">\n{desc.strip()}\n</job>'
+                       for n, desc in enumerate(job_descs, 1))
+    example = "\n".join(f'<job id="{n}">\n{_schema_example()}\n</job>' for n in (1, 2))
+    return f"""Generate 5 technical interview questions for EACH of the {len(job_descs)} jobs below.
+
+{jobs}
+
+You MUST respond in this EXACT XML format, with one <job> element per job,
+using the same id as the job it answers:
+
+{example}
+
+Generate 5 questions per job following this XML structure EXACTLY."""
+
+
+def packed_max_tokens(pack_size: int) -> int:
+    return min(MAX_PACKED_TOKENS, TOKENS_PER_JOB * pack_size)
+
+
+def split_packed_response(text: str, pack_size: int) -> Dict[str, str]:
+    """Split a packed response into ``{job id: structured response}``.
+
+    A missing ``</job>`` (or a response cut off inside the last job) still
+    yields that job's part; the structured parser salvages what it can. If
+    the model dropped the ``<job>`` wrappers altogether, bare ``<questions>``
+    blocks are assigned to the jobs in order.
+    """
+    opens = list(_JOB_OPEN.finditer(text))
+    if not opens:
+        blocks = _QUESTIONS_BLOCK.findall(text)[:pack_size]
+        return {str(n): block for n, block in enumerate(blocks, 1)}
+
+    parts = {}
+    for i, match in enumerate(opens):
+        end = opens[i + 1].start() if i + 1 < len(opens) else len(text)
+        body = text[match.end():end]
+        close = body.find("</job>")
+        parts.setdefault(match.group(1), (body[:close] if close != -1 else body).strip())
+    return parts
+
+
+def apportion_metrics(pack_metrics: Dict, shares: List[float], pack_size: int) -> List[Dict]:
+    """Split a pack's token usage and cost over its jobs"""
+    total = sum(shares) or 1.0
+    per_job = []
+    for share in shares:
+        prompt_tokens = round(pack_metrics["prompt_tokens"] / pack_size)
+        completion_tokens = round(pack_metrics["completion_tokens"] * share / total)
+        cost = estimate_cost(pack_metrics["model"], prompt_tokens, completion_tokens)
+        per_job.append({
+            "model": pack_metrics["model"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": pack_metrics["tokens_per_second"],
+            "cost_usd": round(cost, 6) if cost is not None else None,
+            "pack_size": pack_size,
+            **({"usage_estimated": True} if pack_metrics.get("usage_estimated") else {})
+        })
+    return per_job
+
+
+def iter_packs(jobs: Iterable[Tuple[str, str]], pack_size: int) -> Iterator[List[Tuple[str, str]]]:
+    jobs = iter(jobs)
+    while True:
+        pack = list(islice(jobs, pack_size))
+        if not pack:
+            return
+        yield pack
+
+
+def _record(job_id: str, job_desc: str, result: Dict) -> Dict:
+    return {"job_id": job_id, "job_hash": job_hash(job_desc), "strategy": PACKED_STRATEGY,
+            **result}
+
+
+async def run_pack(pack: List[Tuple[str, str]], semaphore: asyncio.Semaphore,
+                   iteration: int = 1) -> List[Dict]:
+    """One packed request; returns a result record per job in the pack"""
+    prompt = packed_prompt([job_desc for _, job_desc in pack])
+    async with semaphore:
+        try:
+            request_wait.set(0.0)
+            start_time = time.time()
+            response = await async_client.chat.completions.create(
+                model=MODEL,
+                messages=build_messages(prompt),
+                temperature=TEMPERATURE,
+                max_tokens=packed_max_tokens(len(pack)),
+                cache_sample=iteration
+            )
+            generation_time = time.time() - start_time - request_wait.get()
+        except Exception as e:
+            return [_record(job_id, job_desc, {"error": str(e)}) for job_id, job_desc in pack]
+
+    content = response.choices[0].message.content
+    pack_metrics = usage_metrics(response.usage, MODEL, generation_time,
+                                 prompt_text=SYSTEM_PROMPT + prompt, completion_text=content)
+    parts = split_packed_response(content, len(pack))
+    segments = [parts.get(str(n), "") for n in range(1, len(pack) + 1)]
+    job_metrics = apportion_metrics(pack_metrics, [len(s) for s in segments], len(pack))
+
+    records = []
+    for (job_id, job_desc), segment, metrics in zip(pack, segments, job_metrics):
+        if not segment:
+            records.append(_record(job_id, job_desc, {"error": "job missing from packed response"}))
+            continue
+        # Latency is the whole pack's: nobody gets their questions sooner
+        parsed = parse_structured_response(segment)
+        result = evaluate_response(segment, "structured", iteration, generation_time,
+                                   job_desc, metrics, parsed)
+        result["questions"] = [question.to_dict() for question in parsed.questions]
+        records.append(_record(job_id, job_desc, result))
+    return records
+
+
+async def run_packed(jobs: Iterable[Tuple[str, str]], pack_size: int = DEFAULT_PACK_SIZE,
+                     max_concurrency: int = 8):
+    """Async generator of per-job records, emitted as their packs complete"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    packs = iter_packs(jobs, pack_size)
+    pending = set()
+    while True:
+        for pack in packs:
+            pending.add(asyncio.ensure_future(run_pack(pack, semaphore)))
+            if len(pending) >= 2 * max_concurrency:
+                break
+        if not pending:
+            return
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            for record in task.result():
+                yield record
+
+
+class RunningSummary:
+    """``summarize_results`` over a stream of records, in constant memory.
+
+    Means are running (Welford) sums and the latency percentiles are P²
+    estimates, so no record is kept once it has been counted.
+    """
+
+    MEANS = ("relevance", "clarity", "format_compliance", "generation_time",
+             "prompt_tokens", "completion_tokens", "tokens_per_second", "cost_usd",
+             "diversity")
+
+    def __init__(self, strategy: str):
+        self.strategy = strategy
+        self.records = 0
+        self.valid = 0
+        self.parsed = 0
+        self.duplicated = 0
+        self.stats = {name: RunningStats() for name in self.MEANS}
+        self.latency = {q: P2Quantile(q) for q in PERCENTILES}
+
+    def add(self, record: Dict):
+        self.records += 1
+        if "error" in record:
+            return
+        self.valid += 1
+        self.parsed += bool(record["parsing_success"])
+        for name, stats in self.stats.items():
+            if record.get(name) is not None:
+                stats.add(record[name])
+        if record.get("diversity") is not None:
+            self.duplicated += bool(record["near_duplicates"])
+        if "generation_time" in record:
+            for estimate in self.latency.values():
+                estimate.add(record["generation_time"])
+
+    def _total(self, name: str) -> float:
+        return self.stats[name].mean * self.stats[name].count
+
+    def summary(self) -> Optional[Dict]:
+        """The keys ``summarize_results`` gives for these fields, or None"""
+        if not self.valid:
+            return None
+        stats = self.stats
+        summary = {
+            "strategy": self.strategy,
+            "avg_relevance": round(stats["relevance"].mean, 2),
+            "avg_clarity": round(stats["clarity"].mean, 2),
+            "avg_format": round(stats["format_compliance"].mean, 2),
+            "parse_success_rate": round(self.parsed / self.valid * 100, 0),
+            "total_iterations": self.records,
+            "successful_iterations": self.valid
+        }
+        if stats["generation_time"].count:
+            summary["avg_time"] = round(stats["generation_time"].mean, 2)
+            summary.update({f"p{q}_time": round(estimate.value, 2)
+                            for q, estimate in self.latency.items()})
+        if stats["completion_tokens"].count:
+            summary.update({
+                "avg_prompt_tokens": round(stats["prompt_tokens"].mean, 1),
+                "avg_completion_tokens": round(stats["completion_tokens"].mean, 1),
+                "total_tokens": round(self._total("prompt_tokens")
+                                      + self._total("completion_tokens"))
+            })
+        if stats["tokens_per_second"].count:
+            summary["avg_tokens_per_second"] = round(stats["tokens_per_second"].mean, 1)
+        if stats["cost_usd"].count:
+            summary["total_cost_usd"] = round(self._total("cost_usd"), 4)
+            summary["avg_cost_usd"] = round(stats["cost_usd"].mean, 5)
+        if stats["diversity"].count:
+            summary.update({
+                "avg_diversity": round(stats["diversity"].mean, 2),
+                "near_duplicate_rate": round(self.duplicated / stats["diversity"].count * 100, 0)
+            })
+        return summary
+
+
+async def main(path: str, output: str = DEFAULT_OUTPUT, pack_size: int = DEFAULT_PACK_SIZE,
+               concurrency: int = 8, limit: int = None):
+    jobs = iter_job_descriptions(path)
+    if limit:
+        jobs = islice(jobs, limit)
+
+    if output == "-":
+        out = sys.stdout
+    else:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        out = open(output, "a", encoding="utf-8")
+
+    running = RunningSummary(PACKED_STRATEGY)
+    try:
+        async for record in run_packed(jobs, pack_size, concurrency):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            running.add(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"\n✓ {running.records} jobs written to {output}", file=sys.stderr)
+    summary = running.summary()
+    if summary and out is not sys.stdout:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate structured question sets, "
+                                                 "several job descriptions per request")
+    parser.add_argument("jobs", help="JSONL file with one job posting per line")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help=f"JSONL file of per-job question sets, '-' for stdout "
+                             f"(default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE,
+                        help=f"job descriptions per request (default: {DEFAULT_PACK_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="max concurrent API requests (default: 8)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="only run the first N jobs")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES,
+                        default=os.getenv("LLM_CACHE_MODE", "off"),
+                        help="response cache mode (default: off)")
+    args = parser.parse_args()
+
+    configure_cache(args.cache_mode)
+    asyncio.run(main(args.jobs, args.output, args.pack_size, args.concurrency, args.limit))
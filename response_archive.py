@@ -0,0 +1,228 @@
+"""
+Raw Response Archive
+Every full response, gzip-compressed, with an offset index for offline re-scoring
+
+Result records keep only the first 200 characters of a response, so a
+change to ``evaluate_relevance``, ``evaluate_clarity`` or
+``try_parse_response`` could only be measured by calling the API again.
+The archive appends each full response as its own gzip member to
+``responses.bin`` and one JSON line per response to ``index.jsonl`` (its
+offset and length in the blob file, the strategy, job hash, iteration,
+latency and the scores it was given at the time); job descriptions are
+stored once each in ``jobs.jsonl``. Any response can be read back with one
+seek and one decompress.
+
+``rescore`` re-runs the stateless evaluators (``score_response``) over the
+whole archive in a process pool, each worker reading its own slice of the
+blob file, and reports how the scores moved, with zero API calls.
+
+Usage:
+    python research/response_archive.py rescore --workers 8 --output rescored.jsonl
+    python research/response_archive.py stats
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from keyword_index import job_hash
+
+DEFAULT_ARCHIVE_PATH = "research/results/response_archive"
+DEFAULT_CHUNK_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+# Scores copied into the index entry, so a re-score can be compared against them
+SCORE_FIELDS = ("relevance", "clarity", "format_compliance", "parsing_success")
+
+
+def _read_jsonl(path: str) -> Iterator[Dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves at most one partial line
+                continue
+
+
+class ResponseArchive:
+    """Append-only gzip blob file with a JSONL offset index"""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self.blob_path = os.path.join(path, "responses.bin")
+        self.index_path = os.path.join(path, "index.jsonl")
+        self.jobs_path = os.path.join(path, "jobs.jsonl")
+        self._lock = threading.Lock()
+        self._blobs = self._index = self._jobs = None
+        self._known_jobs = None
+
+    def _open(self):
+        if self._blobs is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._known_jobs = {job["job_hash"] for job in _read_jsonl(self.jobs_path)}
+            self._blobs = open(self.blob_path, "ab")
+            self._index = open(self.index_path, "a", encoding="utf-8")
+            self._jobs = open(self.jobs_path, "a", encoding="utf-8")
+
+    def append(self, content: str, strategy: str, job_desc: str, iteration: int,
+               result: Dict = None) -> Dict:
+        """Store one response; returns its index entry"""
+        blob = gzip.compress(content.encode("utf-8"), COMPRESSION_LEVEL)
+        job = job_hash(job_desc)
+        result = result or {}
+        with self._lock:
+            self._open()
+            if job not in self._known_jobs:
+                self._jobs.write(json.dumps({"job_hash": job, "job_desc": job_desc},
+                                            ensure_ascii=False) + "\n")
+                self._jobs.flush()
+                self._known_jobs.add(job)
+            offset = self._blobs.seek(0, os.SEEK_END)
+            self._blobs.write(blob)
+            self._blobs.flush()
+            # The index line goes last: an entry always points at a complete blob
+            entry = {"strategy": strategy, "job_hash": job, "iteration": iteration,
+                     "offset": offset, "length": len(blob), "size": len(content),
+                     "generation_time": result.get("generation_time"),
+                     "model": result.get("model"), "archived_at": round(time.time(), 3),
+                     "scores": {name: result[name] for name in SCORE_FIELDS if name in result}}
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+        return entry
+
+    def entries(self) -> List[Dict]:
+        return list(_read_jsonl(self.index_path))
+
+    def job_descriptions(self) -> Dict[str, str]:
+        return {job["job_hash"]: job["job_desc"] for job in _read_jsonl(self.jobs_path)}
+
+    def read(self, entry: Dict) -> str:
+        with open(self.blob_path, "rb") as f:
+            return read_blob(f, entry)
+
+    def close(self):
+        with self._lock:
+            for handle in (self._blobs, self._index, self._jobs):
+                if handle is not None:
+                    handle.close()
+            self._blobs = self._index = self._jobs = None
+
+
+def read_blob(f, entry: Dict) -> str:
+    f.seek(entry["offset"])
+    return gzip.decompress(f.read(entry["length"])).decode("utf-8")
+
+
+# ============================================================================
+# OFFLINE RE-SCORING
+# ============================================================================
+
+def _rescore_chunk(blob_path: str, entries: List[Dict], job_descs: Dict[str, str]) -> List[Dict]:
+    """Worker: re-score one slice of the archive"""
+    # Imported here: the experiment module imports this one
+    from prompt_engineering_experiment import JOB_DESCRIPTION, score_response
+
+    records = []
+    with open(blob_path, "rb") as f:
+        for entry in sorted(entries, key=lambda e: e["offset"]):
+            content = read_blob(f, entry)
+            scores = score_response(content, entry["strategy"],
+                                    job_descs.get(entry["job_hash"], JOB_DESCRIPTION))
+            records.append({"strategy": entry["strategy"], "job_hash": entry["job_hash"],
+                            "iteration": entry["iteration"],
+                            "generation_time": entry.get("generation_time") or 0.0,
+                            **scores, "previous": entry.get("scores", {})})
+    return records
+
+
+def rescore(path: str = DEFAULT_ARCHIVE_PATH, workers: Optional[int] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+    """Re-run the evaluators over every archived response in a process pool"""
+    archive = ResponseArchive(path)
+    entries = archive.entries()
+    job_descs = archive.job_descriptions()
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    if not chunks:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_rescore_chunk, [archive.blob_path] * len(chunks), chunks,
+                         [job_descs] * len(chunks))
+        return [record for part in parts for record in part]
+
+
+def score_changes(records: List[Dict]) -> Dict[str, Dict]:
+    """Per-strategy mean of each score before and after, and how many changed"""
+    changes: Dict[str, Dict] = {}
+    for record in records:
+        strategy = changes.setdefault(record["strategy"], {"responses": 0, "changed": 0})
+        strategy["responses"] += 1
+        previous = record["previous"]
+        if any(previous.get(name) != record[name] for name in SCORE_FIELDS if name in previous):
+            strategy["changed"] += 1
+        for name in SCORE_FIELDS:
+            totals = strategy.setdefault(name, {"before": 0.0, "after": 0.0, "n": 0})
+            if name in previous:
+                totals["before"] += float(previous[name])
+                totals["after"] += float(record[name])
+                totals["n"] += 1
+    return changes
+
+
+def print_score_changes(changes: Dict[str, Dict]):
+    print(f"\n{'Strategy':<20} {'Responses':<10} {'Changed':<9} "
+          + " ".join(f"{name[:18]:<20}" for name in SCORE_FIELDS))
+    print("-" * (41 + 21 * len(SCORE_FIELDS)))
+    for strategy, change in changes.items():
+        cells = []
+        for name in SCORE_FIELDS:
+            totals = change[name]
+            if totals["n"]:
+                cells.append(f"{totals['before'] / totals['n']:.2f} -> "
+                             f"{totals['after'] / totals['n']:.2f}")
+            else:
+                cells.append("-")
+        print(f"{strategy:<20} {change['responses']:<10} {change['changed']:<9} "
+              + " ".join(f"{cell:<20}" for cell in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full response archive and offline re-scoring")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH,
+                        help=f"archive directory (default: {DEFAULT_ARCHIVE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rescorer = commands.add_parser("rescore", help="re-run the evaluators over the archive")
+    rescorer.add_argument("--workers", type=int, default=None,
+                          help="worker processes (default: one per CPU)")
+    rescorer.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                          help=f"responses per task (default: {DEFAULT_CHUNK_SIZE})")
+    rescorer.add_argument("--output", default=None,
+                          help="also write the re-scored records to this JSONL file")
+    commands.add_parser("stats", help="print archive size and contents")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        archive = ResponseArchive(args.archive)
+        entries = archive.entries()
+        raw = sum(e["size"] for e in entries)
+        stored = sum(e["length"] for e in entries)
+        print(f"✓ {len(entries)} responses for {len(archive.job_descriptions())} jobs, "
+              f"{raw / 1024:.1f} KB raw, {stored / 1024:.1f} KB compressed")
+    else:
+        start = time.time()
+        records = rescore(args.archive, args.workers, args.chunk_size)
+        print(f"✓ Re-scored {len(records)} responses in {time.time() - start:.1f}s, 0 API calls")
+        if records:
+            print_score_changes(score_changes(records))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"\n✓ Re-scored records written to {args.output}")
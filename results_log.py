@@ -0,0 +1,178 @@
+"""
+Checkpointed Results Log
+Append-only JSONL log of per-iteration results with resume support
+
+Every finished iteration is appended as one JSON line the moment it
+completes, so a crash or Ctrl-C never loses a paid response. Writes are
+flushed immediately and fsynced in batches (every ``fsync_every`` records
+or ``fsync_interval`` seconds, whichever comes first) to keep the
+durability cost off the hot path.
+
+A resumed run reads the log, skips every (strategy, job, iteration) cell
+that already succeeded, and the final summary file is compacted from the
+log rather than from in-memory state. ``LogTailer`` follows the log of a
+run that is still going.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_LOG_PATH = "research/results/experiment_log.jsonl"
+
+Cell = Tuple[str, str, int]  # (strategy, job_hash, iteration)
+
+
+class ResultsLog:
+    """Append-only JSONL writer with batched fsync"""
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH, fsync_every: int = 20,
+                 fsync_interval: float = 2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._terminate_torn_line()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _terminate_torn_line(self):
+        # A crash mid-write can leave a partial last line; start on a fresh
+        # one so the next record isn't glued onto it
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, record: Dict):
+        """Write one record; it is on disk (fsynced) within the batch window"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every or
+                time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_log(path: str) -> Iterator[Dict]:
+    """Yield records from a results log, skipping a torn final line"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves at most one partial line
+                continue
+
+
+class LogTailer:
+    """Incremental reader of a growing results log.
+
+    Remembers the byte offset it has read up to, so each ``poll`` reads only
+    what was appended since; a partial last line is held back until its
+    newline arrives. Starts over if the log is rotated or truncated, and
+    bumps ``generation`` when it does, so a caller aggregating the records
+    knows to drop what it built from the old file.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH):
+        self.path = path
+        self.offset = 0
+        self.generation = 0
+        self._inode = None
+        self._partial = b""
+
+    def poll(self) -> List[Dict]:
+        """Records appended since the last call"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            if self._inode is not None:
+                self.generation += 1
+            self._inode, self.offset, self._partial = stat.st_ino, 0, b""
+        if stat.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        self.offset += len(data)
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn line that a restarted writer terminated
+                continue
+        return records
+
+
+def cell_of(record: Dict) -> Cell:
+    return record["strategy"], record.get("job_hash", ""), record["iteration"]
+
+
+def completed_cells(path: str) -> Set[Cell]:
+    """Cells that already have a successful result in the log"""
+    return {cell_of(r) for r in read_log(path) if "error" not in r}
+
+
+def rotate_log(path: str) -> Optional[str]:
+    """Move an existing log aside before a fresh (non-resumed) run"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    rotated = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, rotated)
+    return rotated
+
+
+def latest_records(path: str) -> list:
+    """One log record per cell, sorted by job and iteration.
+
+    The latest successful record wins for each cell; an error is kept only
+    when the cell never succeeded.
+    """
+    cells: Dict[Cell, Dict] = {}
+    order = []
+    for record in read_log(path):
+        cell = cell_of(record)
+        previous = cells.get(cell)
+        if previous is None:
+            order.append(cell)
+        if previous is None or "error" in previous or "error" not in record:
+            cells[cell] = record
+    return [cells[cell] for cell in sorted(order, key=lambda c: (c[1], c[2]))]
+
+
+def collect_results(path: str) -> Dict[str, list]:
+    """Per-strategy iteration results from the log, one per cell"""
+    detailed: Dict[str, list] = {}
+    for record in latest_records(path):
+        detailed.setdefault(record["strategy"], []).append(
+            {k: v for k, v in record.items() if k not in ("strategy", "job_hash")})
+    return detailed
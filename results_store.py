@@ -0,0 +1,335 @@
+"""
+Columnar Results Store
+Per-iteration results as memory-mapped NumPy columns
+
+``experiment_results.json`` nests every iteration inside per-strategy lists,
+so printing a summary table means parsing the whole file into Python
+objects. The store keeps one flat binary file per metric (float64 with NaN
+for "not recorded", booleans and int32 codes) plus a string side-table for
+strategy names, job hashes, models and error messages. Readers ``np.memmap`` the columns
+read-only and compute summaries with ``np.bincount`` group-bys and one
+sort for the latency percentiles, touching only the columns they need.
+
+Appends write the columns first and commit the row count to ``meta.json``
+last (atomically), so a crash mid-append never exposes a torn row. JSON in
+the original ``experiment_results.json`` shape can still be exported.
+
+Usage:
+    python research/results_store.py import research/results/experiment_log.jsonl
+    python research/results_store.py summary
+    python research/results_store.py export --output research/results/experiment_results.json
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from instrumentation import PERCENTILES
+from results_log import latest_records
+
+DEFAULT_STORE_PATH = "research/results/results_store"
+
+# Code columns index into the string table; -1 means "not recorded"
+CODE_COLUMNS = ("strategy", "job_hash", "model", "error")
+COLUMNS = {
+    "strategy": "<i4", "job_hash": "<i4", "model": "<i4", "error": "<i4", "iteration": "<i4",
+    "parsing_success": "?", "stopped_early": "?",
+    "relevance": "<f8", "clarity": "<f8", "format_compliance": "<f8",
+    "generation_time": "<f8", "response_length": "<f8", "prompt_tokens": "<f8",
+    "completion_tokens": "<f8", "tokens_per_second": "<f8", "cost_usd": "<f8",
+    "time_to_first_token": "<f8", "diversity": "<f8", "near_duplicates": "<f8",
+}
+_COUNT_COLUMNS = ("response_length", "prompt_tokens", "completion_tokens")
+
+
+def _round(value, digits: int) -> float:
+    return round(float(value), digits)
+
+
+def _write_json(path: str, data):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+class ResultsStore:
+    """Append-only columnar store of per-iteration result records"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._meta_path = os.path.join(path, "meta.json")
+        self._strings_path = os.path.join(path, "strings.json")
+        self.rows = 0
+        self.metadata: Dict = {}
+        self.strings: List[str] = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.rows = meta["rows"]
+            self.metadata = meta.get("metadata", {})
+            with open(self._strings_path, encoding="utf-8") as f:
+                self.strings = json.load(f)
+        self._codes = {s: i for i, s in enumerate(self.strings)}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def exists(path: str = DEFAULT_STORE_PATH) -> bool:
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    def __len__(self):
+        return self.rows
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.col")
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column (committed rows only)"""
+        if name not in self._columns:
+            dtype = np.dtype(COLUMNS[name])
+            if self.rows:
+                self._columns[name] = np.memmap(self._column_path(name), dtype=dtype,
+                                                mode="r", shape=(self.rows,))
+            else:
+                self._columns[name] = np.zeros(0, dtype=dtype)
+        return self._columns[name]
+
+    def _code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def decode(self, codes: np.ndarray) -> List[Optional[str]]:
+        return [self.strings[c] if c >= 0 else None for c in codes]
+
+    def append(self, records: Iterable[Dict], metadata: Dict = None):
+        """Append log-style records (``strategy``, ``iteration`` and metrics)"""
+        values = {name: [] for name in COLUMNS}
+        for record in records:
+            for name in CODE_COLUMNS:
+                values[name].append(self._code(record.get(name)))
+            values["iteration"].append(record.get("iteration", 0))
+            for name in ("parsing_success", "stopped_early"):
+                values[name].append(bool(record.get(name, False)))
+            for name, dtype in COLUMNS.items():
+                if dtype == "<f8":
+                    value = record.get(name)
+                    values[name].append(np.nan if value is None else float(value))
+        added = len(values["iteration"])
+
+        os.makedirs(self.path, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            column = np.asarray(values[name], dtype=dtype)
+            with open(self._column_path(name), "ab") as f:
+                # Drop anything past the committed rows (a crashed append)
+                f.truncate(self.rows * column.itemsize)
+                f.write(column.tobytes())
+        _write_json(self._strings_path, self.strings)
+        self.rows += added
+        if metadata is not None:
+            self.metadata = metadata
+        _write_json(self._meta_path, {"rows": self.rows, "columns": COLUMNS,
+                                      "metadata": self.metadata})
+        self._columns.clear()
+
+    @classmethod
+    def rebuild(cls, records: Iterable[Dict], path: str = DEFAULT_STORE_PATH,
+                metadata: Dict = None) -> "ResultsStore":
+        """Replace whatever is at ``path`` with a store of ``records``"""
+        for name in list(COLUMNS) + ["meta.json", "strings.json"]:
+            target = os.path.join(path, name if name.endswith(".json") else f"{name}.col")
+            if os.path.exists(target):
+                os.remove(target)
+        store = cls(path)
+        store.append(records, metadata or {})
+        return store
+
+    # ------------------------------------------------------------------------
+    # Vectorized summaries
+    # ------------------------------------------------------------------------
+
+    def job_hashes(self) -> List[str]:
+        """Distinct job hashes in the store, in order of first appearance"""
+        codes = np.asarray(self.column("job_hash"))
+        _, first = np.unique(codes, return_index=True)
+        return [self.strings[c] for c in codes[np.sort(first)] if c >= 0]
+
+    def summaries(self, job: Optional[str] = None) -> List[Dict]:
+        """Per-strategy summaries with the keys ``summarize_results`` produces.
+        
+        ``job`` restricts them to the rows of one job hash.
+        """
+        strategy = np.asarray(self.column("strategy"))
+        rows = np.ones(len(strategy), dtype=bool)
+        if job is not None:
+            rows = np.asarray(self.column("job_hash")) == self._codes.get(job, -2)
+        if not rows.any():
+            return []
+        groups = int(strategy.max()) + 1
+        total = np.bincount(strategy[rows], minlength=groups)
+        valid = rows & (np.asarray(self.column("error")) < 0)
+        codes = strategy[valid]
+        n = np.bincount(codes, minlength=groups)
+
+        def grouped(name: str):
+            # (means, sums, counts) over each group's recorded (non-NaN) values
+            values = np.asarray(self.column(name))[valid]
+            present = ~np.isnan(values)
+            sums = np.bincount(codes[present], weights=values[present], minlength=groups)
+            counts = np.bincount(codes[present], minlength=groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return sums / counts, sums, counts
+
+        stats = {name: grouped(name) for name in
+                 ("relevance", "clarity", "format_compliance", "generation_time",
+                  "prompt_tokens", "completion_tokens", "tokens_per_second", "cost_usd",
+                  "time_to_first_token", "diversity")}
+        duplicated = np.bincount(codes, weights=np.asarray(self.column("near_duplicates"))[valid] > 0,
+                                 minlength=groups)
+        parsed = np.bincount(codes, weights=np.asarray(self.column("parsing_success"))[valid],
+                             minlength=groups)
+        early = np.bincount(codes, weights=np.asarray(self.column("stopped_early"))[valid],
+                            minlength=groups)
+        # Latency percentiles over the timed rows only (Batch API rows have none)
+        times = np.asarray(self.column("generation_time"))[valid]
+        timed = ~np.isnan(times)
+        time_counts = stats["generation_time"][2]
+        quantiles = self._group_percentiles(codes[timed], times[timed], time_counts, groups)
+
+        summaries = []
+        for g in np.flatnonzero(n):
+            summary = {
+                "strategy": self.strings[g],
+                "avg_relevance": _round(stats["relevance"][0][g], 2),
+                "avg_clarity": _round(stats["clarity"][0][g], 2),
+                "avg_format": _round(stats["format_compliance"][0][g], 2),
+                # Left out without any timed result, as in summarize_results
+                **({"avg_time": _round(stats["generation_time"][0][g], 2)}
+                   if time_counts[g] else {}),
+                "parse_success_rate": _round(parsed[g] / n[g] * 100, 0),
+                "total_iterations": int(total[g]),
+                "successful_iterations": int(n[g]),
+                **({f"p{q}_time": _round(quantiles[q][g], 2) for q in PERCENTILES}
+                   if time_counts[g] else {})
+            }
+            _, prompt_sum, usage_count = stats["prompt_tokens"]
+            _, completion_sum, _ = stats["completion_tokens"]
+            if usage_count[g]:
+                summary.update({
+                    "avg_prompt_tokens": _round(prompt_sum[g] / usage_count[g], 1),
+                    "avg_completion_tokens": _round(completion_sum[g] / usage_count[g], 1),
+                    "total_tokens": int(prompt_sum[g] + completion_sum[g])
+                })
+            rate, _, rate_count = stats["tokens_per_second"]
+            if rate_count[g]:
+                summary["avg_tokens_per_second"] = _round(rate[g], 1)
+            cost, cost_sum, cost_count = stats["cost_usd"]
+            if cost_count[g]:
+                summary["total_cost_usd"] = _round(cost_sum[g], 4)
+                summary["avg_cost_usd"] = _round(cost[g], 5)
+            diversity, _, diversity_count = stats["diversity"]
+            if diversity_count[g]:
+                summary["avg_diversity"] = _round(diversity[g], 2)
+                summary["near_duplicate_rate"] = _round(duplicated[g] / diversity_count[g] * 100, 0)
+            ttft, _, streamed = stats["time_to_first_token"]
+            if streamed[g]:
+                summary["avg_time_to_first_token"] = _round(ttft[g], 3)
+                summary["early_stop_rate"] = _round(early[g] / streamed[g] * 100, 0)
+            summaries.append(summary)
+        return summaries
+
+    @staticmethod
+    def _group_percentiles(codes: np.ndarray, values: np.ndarray, counts: np.ndarray,
+                           groups: int) -> Dict[int, np.ndarray]:
+        """Linear-interpolated percentiles of ``values`` within each group"""
+        order = np.lexsort((values, codes))
+        ordered = values[order]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        result = {}
+        for q in PERCENTILES:
+            rank = np.maximum(counts - 1, 0) * q / 100
+            low, high = np.floor(rank).astype(np.int64), np.ceil(rank).astype(np.int64)
+            result[q] = np.full(groups, np.nan)
+            has = counts > 0
+            lo_values = ordered[starts[has] + low[has]]
+            hi_values = ordered[starts[has] + high[has]]
+            result[q][has] = lo_values + (hi_values - lo_values) * (rank[has] - low[has])
+        return result
+
+    # ------------------------------------------------------------------------
+    # JSON compatibility
+    # ------------------------------------------------------------------------
+
+    def records(self) -> Iterable[Dict]:
+        """Rows back as result dicts (NaN / -1 fields omitted)"""
+        columns = {name: np.asarray(self.column(name)) for name in COLUMNS}
+        for i in range(self.rows):
+            record = {"strategy": self.strings[columns["strategy"][i]],
+                      "iteration": int(columns["iteration"][i])}
+            for name in ("job_hash", "model", "error"):
+                if columns[name][i] >= 0:
+                    record[name] = self.strings[columns[name][i]]
+            if "error" in record:
+                yield record
+                continue
+            for name, dtype in COLUMNS.items():
+                if dtype == "<f8" and not np.isnan(columns[name][i]):
+                    value = float(columns[name][i])
+                    record[name] = int(value) if name in _COUNT_COLUMNS else value
+            record["parsing_success"] = bool(columns["parsing_success"][i])
+            if "time_to_first_token" in record:
+                record["stopped_early"] = bool(columns["stopped_early"][i])
+            yield record
+
+    def to_results_data(self) -> Dict:
+        """The store in the ``experiment_results.json`` shape"""
+        detailed: Dict[str, list] = {}
+        for record in self.records():
+            strategy = record.pop("strategy")
+            record.pop("job_hash", None)
+            detailed.setdefault(strategy, []).append(record)
+        return {**self.metadata, "summaries": self.summaries(), "detailed_results": detailed}
+
+    def export_json(self, output_path: str):
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_results_data(), f, indent=2)
+
+
+def load_results_data(store_path: str = DEFAULT_STORE_PATH,
+                      json_path: str = "research/results/experiment_results.json") -> Dict:
+    """Results for display: summaries from the store if there is one, else the JSON file"""
+    if ResultsStore.exists(store_path):
+        store = ResultsStore(store_path)
+        return {**store.metadata, "summaries": store.summaries()}
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar per-iteration results store")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH,
+                        help=f"store directory (default: {DEFAULT_STORE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="rebuild the store from a results log")
+    importer.add_argument("log", help="JSONL results log")
+    commands.add_parser("summary", help="print per-strategy summaries")
+    exporter = commands.add_parser("export", help="write experiment_results.json-style JSON")
+    exporter.add_argument("--output", default="research/results/experiment_results.json")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        store = ResultsStore.rebuild(latest_records(args.log), args.store)
+        print(f"✓ {len(store)} records imported into {args.store}")
+    elif args.command == "summary":
+        for summary in ResultsStore(args.store).summaries():
+            print(json.dumps(summary))
+    else:
+        ResultsStore(args.store).export_json(args.output)
+        print(f"✓ Exported to {args.output}")
@@ -1,10 +1,23 @@
 """
 Quick Demo Script - Shows Research Experiment in Action
-Run this to prove the experiment was conducted
+Run this to prove the experiment was conducted (--live follows a run in progress)
 Author: Elif Naz Demiryılmaz
 """
 
-import json
+import argparse
+import sys
+import time
+from typing import Dict
+
+from instrumentation import PERCENTILES, P2Quantile, RunningStats
+from results_log import DEFAULT_LOG_PATH, Cell, LogTailer, cell_of
+from results_store import DEFAULT_STORE_PATH, ResultsStore, load_results_data
+
+
+def _fmt(value, spec: str, suffix: str = "", prefix: str = "") -> str:
+    """Format an optional metric; older result files don't record them"""
+    return "-" if value is None else f"{prefix}{value:{spec}}{suffix}"
+
 
 def display_results():
     """Display the experiment results in a clean format"""
@@ -13,31 +26,38 @@ def display_results():
     print(" " * 15 + "PROMPT ENGINEERING RESEARCH RESULTS")
     print("="*70)
     
-    # Load results
-    with open("research/results/experiment_results.json", "r") as f:
-        data = json.load(f)
+    # Load results: summaries straight from the memory-mapped columnar store
+    # when the experiment wrote one, otherwise from the JSON file
+    data = load_results_data()
     
     print("\n📊 EXPERIMENT DETAILS:")
-    print(f"   Date: {data['experiment_date']}")
-    print(f"   Researcher: {data['researcher']}")
-    print(f"   Model: {data['model_used']}")
-    print(f"   Iterations: {data['iterations_per_strategy']} per strategy")
+    print(f"   Date: {data.get('experiment_date', '-')}")
+    print(f"   Researcher: {data.get('researcher', '-')}")
+    print(f"   Model: {data.get('model_used', '-')}")
+    print(f"   Iterations: {data.get('iterations_per_strategy', '-')} per strategy")
+    if ResultsStore.exists():
+        print(f"   Source: {DEFAULT_STORE_PATH} (columnar store)")
     
     # Display comparison table
     print("\n" + "="*70)
     print("STRATEGY COMPARISON")
     print("="*70)
     
-    print(f"\n{'Strategy':<22} {'Relevance':<12} {'Clarity':<10} {'Format':<10} {'Time':<8} {'Parse%':<8}")
-    print("-" * 70)
+    print(f"\n{'Strategy':<22} {'Relevance':<12} {'Clarity':<10} {'Format':<10} {'Time':<8} {'Parse%':<8}"
+          f" {'p95':<8} {'p99':<8} {'Tok/s':<7} {'$/iter':<8}")
+    print("-" * 105)
     
     for summary in data['summaries']:
         print(f"{summary['strategy']:<22} "
               f"{summary['avg_relevance']:<12.1f} "
               f"{summary['avg_clarity']:<10.1f} "
               f"{summary['avg_format']:<10.1f} "
-              f"{summary['avg_time']:<8.2f}s "
-              f"{summary['parse_success_rate']:<8.0f}%")
+              f"{_fmt(summary.get('avg_time'), '.2f', 's'):<9} "
+              f"{summary['parse_success_rate']:<8.0f}% "
+              f"{_fmt(summary.get('p95_time'), '.2f', 's'):<8} "
+              f"{_fmt(summary.get('p99_time'), '.2f', 's'):<8} "
+              f"{_fmt(summary.get('avg_tokens_per_second'), '.1f'):<7} "
+              f"{_fmt(summary.get('avg_cost_usd'), '.4f', prefix='$'):<8}")
     
     # Winner announcement
     print("\n" + "="*70)
@@ -49,18 +69,29 @@ def display_results():
     print(f"   Clarity Score:       {winner_data['avg_clarity']}/10")
     print(f"   Format Compliance:   {winner_data['avg_format']}/10")
     print(f"   Parsing Success:     {winner_data['parse_success_rate']}%")
-    print(f"   Generation Time:     {winner_data['avg_time']}s")
+    if "avg_time" in winner_data:
+        print(f"   Generation Time:     {winner_data['avg_time']}s")
+    if "p95_time" in winner_data:
+        print(f"   Latency p50/p95/p99: {winner_data['p50_time']}s / "
+              f"{winner_data['p95_time']}s / {winner_data['p99_time']}s")
+    if "total_tokens" in winner_data:
+        print(f"   Tokens per Response: {winner_data['avg_prompt_tokens']:.0f} in / "
+              f"{winner_data['avg_completion_tokens']:.0f} out")
+    if "total_cost_usd" in winner_data:
+        print(f"   Cost:                ${winner_data['total_cost_usd']:.4f} total, "
+              f"${winner_data['avg_cost_usd']:.4f} per response")
     
     print("\n" + "="*70)
     print("💡 RECOMMENDATION")
     print("="*70)
-    print(f"\n{data['recommendation']}\n")
+    print(f"\n{data.get('recommendation', '-')}\n")
     
     # Show sample output
-    print("="*70)
-    print("SAMPLE OUTPUT - STRUCTURED TEMPLATE (WINNER)")
-    print("="*70)
-    print(data['sample_outputs']['structured_example'])
+    if "sample_outputs" in data:
+        print("="*70)
+        print("SAMPLE OUTPUT - STRUCTURED TEMPLATE (WINNER)")
+        print("="*70)
+        print(data['sample_outputs']['structured_example'])
     
     print("\n" + "="*70)
     print("✅ RESEARCH COMPLETE - Ready for Issue 1B Implementation")
@@ -70,6 +101,124 @@ def display_results():
     print("📊 Visual summary: research/VISUAL_SUMMARY.md\n")
 
 
+class LiveStrategy:
+    """Streaming aggregates for one strategy, updated in O(1) per record.
+
+    Each (job, iteration) cell counts once, as in ``latest_records``: a
+    retried cell's success replaces its earlier error. Later records for a
+    cell that already succeeded are skipped, since the running estimates
+    can't take a value back out.
+    """
+
+    METRICS = ("relevance", "clarity", "format_compliance", "generation_time",
+               "tokens_per_second", "cost_usd")
+
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.parsed = 0
+        self.live_records = 0
+        self.stats = {name: RunningStats() for name in self.METRICS}
+        self.latency = {q: P2Quantile(q) for q in PERCENTILES}
+        self._succeeded: Dict[Cell, bool] = {}
+
+    def add(self, record: Dict, live: bool):
+        cell = cell_of(record)
+        succeeded = self._succeeded.get(cell)
+        failed = "error" in record
+        if succeeded or (succeeded is not None and failed):
+            return
+        if succeeded is None:
+            self.records += 1
+            self.live_records += live
+        else:
+            # A retry succeeded: the cell's error no longer counts
+            self.errors -= 1
+        self._succeeded[cell] = not failed
+        if failed:
+            self.errors += 1
+            return
+        self.parsed += bool(record.get("parsing_success"))
+        for name, stats in self.stats.items():
+            if record.get(name) is not None:
+                stats.add(record[name])
+        if "generation_time" in record:
+            for estimate in self.latency.values():
+                estimate.add(record["generation_time"])
+
+    def mean(self, name: str):
+        stats = self.stats[name]
+        return stats.mean if stats.count else None
+
+
+def _live_row(name: str, strategy: LiveStrategy, minutes: float) -> str:
+    valid = strategy.records - strategy.errors
+    rate = strategy.live_records / minutes if minutes > 0 else None
+    return (f"{name:<20} {strategy.records:<6} {strategy.errors:<5} "
+            f"{_fmt(strategy.mean('relevance'), '.1f'):<10} "
+            f"{_fmt(strategy.mean('clarity'), '.1f'):<8} "
+            f"{_fmt(strategy.mean('format_compliance'), '.1f'):<8} "
+            f"{_fmt(100 * strategy.parsed / valid if valid else None, '.0f', '%'):<7} "
+            f"{_fmt(strategy.mean('generation_time'), '.2f', 's'):<8} "
+            + "".join(f"{_fmt(strategy.latency[q].value, '.2f', 's'):<8} " for q in PERCENTILES)
+            + f"{_fmt(strategy.mean('tokens_per_second'), '.1f'):<7} "
+            f"{_fmt(strategy.mean('cost_usd'), '.4f', prefix='$'):<8} "
+            f"{_fmt(rate, '.1f'):<8}")
+
+
+def watch_results(log_path: str = DEFAULT_LOG_PATH, interval: float = 1.0):
+    """Follow a running experiment's results log and redraw the table in place.
+    
+    Only bytes appended since the last poll are read, and every record
+    updates running means (Welford) and P² latency percentiles, so a
+    refresh costs the same after ten records or ten thousand. Throughput
+    counts the records that arrived while watching, not the backlog read
+    on start-up. When the log is rotated (a new run started) the table
+    starts over from the new file.
+    """
+    tailer = LogTailer(log_path)
+    strategies: Dict[str, LiveStrategy] = {}
+    started = None
+    generation = tailer.generation
+    drawn = 0
+    while True:
+        records = tailer.poll()
+        if tailer.generation != generation:
+            generation = tailer.generation
+            # Everything in the new file arrived while watching
+            strategies, started = {}, time.monotonic()
+        live = started is not None
+        if started is None:
+            started = time.monotonic()
+        for record in records:
+            strategies.setdefault(record["strategy"], LiveStrategy()).add(record, live)
+        minutes = (time.monotonic() - started) / 60
+        total = sum(s.live_records for s in strategies.values())
+
+        lines = [
+            f"LIVE: {log_path}  (offset {tailer.offset:,} bytes, "
+            f"{sum(s.records for s in strategies.values())} records, "
+            f"{_fmt(total / minutes if minutes > 0 else None, '.1f')} iter/min)  Ctrl-C to stop",
+            "",
+            f"{'Strategy':<20} {'Iters':<6} {'Err':<5} {'Relevance':<10} {'Clarity':<8} "
+            f"{'Format':<8} {'Parse%':<7} {'Time':<8} "
+            + "".join(f"{f'p{q}':<8} " for q in PERCENTILES)
+            + f"{'Tok/s':<7} {'$/iter':<8} {'Iter/min':<8}",
+            "-" * 130,
+        ]
+        lines += [_live_row(name, strategy, minutes) for name, strategy in strategies.items()]
+        if not strategies:
+            lines.append("(waiting for the first result...)")
+
+        # Move back over the previous frame and clear it before redrawing
+        if drawn:
+            sys.stdout.write(f"\x1b[{drawn}F\x1b[J")
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        drawn = len(lines)
+        time.sleep(interval)
+
+
 def show_experiment_code_stats():
     """Show statistics about the experiment code"""
     
@@ -99,6 +248,23 @@ def show_experiment_code_stats():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the prompt engineering experiment results")
+    parser.add_argument("--live", action="store_true",
+                        help="follow the results log of a run in progress and update the "
+                             "comparison table in place")
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH,
+                        help=f"results log followed by --live (default: {DEFAULT_LOG_PATH})")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between --live refreshes (default: 1.0)")
+    args = parser.parse_args()
+    
+    if args.live:
+        try:
+            watch_results(args.log, args.interval)
+        except KeyboardInterrupt:
+            print()
+        sys.exit(0)
+    
     print("\n" + "🔬" * 35)
     print("AIVIEW - PROMPT ENGINEERING RESEARCH DEMONSTRATION")
     print("Researcher: Elif Naz Demiryılmaz")
@@ -117,6 +283,7 @@ if __name__ == "__main__":
         print("   python research/prompt_engineering_experiment.py")
         print("\n3. View results:")
         print("   python research/run_demo.py")
+        print("   python research/run_demo.py --live   (while the experiment is running)")
         print("\n" + "="*70 + "\n")
         
     except FileNotFoundError:
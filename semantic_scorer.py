@@ -0,0 +1,221 @@
+"""
+Semantic Relevance Scorer
+Offline cosine-similarity relevance with a memory-mapped vector store
+
+``evaluate_relevance`` counts skill keywords, so a question that
+paraphrases the job ("relational database tuning" for a PostgreSQL role)
+scores nothing. This scorer needs no network or model download: texts are
+turned into hashed sparse features (word unigrams and bigrams plus
+character trigrams, with known skill spellings folded onto one canonical
+form via ``SKILL_SYNONYMS``), projected into a fixed number of buckets and
+L2-normalised, so cosine similarity is a dot product.
+
+Vectors are persisted in a ``np.memmap`` matrix keyed by a hash of the text.
+A text is vectorized once, ever; re-scoring a corpus only gathers its rows
+and does one matrix product against the job description vectors.
+
+Usage:
+    from semantic_scorer import SemanticScorer
+    scorer = SemanticScorer()
+    scorer.score_responses(responses, "few_shot", JOB_DESCRIPTION)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from keyword_index import SKILL_SYNONYMS
+from question_parser import extract_questions
+
+DEFAULT_STORE_PATH = "research/results/vector_store"
+DEFAULT_DIM = 1024
+# Cosine similarity that earns full marks; question/job pairs rarely share
+# more than ~40% of their weighted features even when squarely on topic
+FULL_MARKS_COSINE = 0.4
+CHAR_NGRAM_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from have how if in into is it its of on or
+our should that the their this to was what when where which who why will with would you your
+""".split())
+
+# Single-word spellings of a skill -> canonical token ("postgres" -> "postgresql")
+_CANONICAL = {
+    variant: skill.replace(" ", "_")
+    for skill, variants in SKILL_SYNONYMS.items()
+    for variant in (skill,) + variants if " " not in variant
+}
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _features(text: str) -> Counter:
+    words = [_CANONICAL.get(w, w) for w in _TOKEN.findall(text.lower())]
+    words = [w for w in words if w not in _STOPWORDS]
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            features[f"#{padded[i:i + 3]}"] += CHAR_NGRAM_WEIGHT
+    return features
+
+
+def vectorize(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Hashed, sublinear-tf, L2-normalised feature vector for one text"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, count in _features(text).items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        # The top hash bit picks a sign, so collisions cancel out on average
+        vector[h % dim] += (1.0 + math.log(count) if count >= 1 else count) * (1 if h >> 31 else -1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorStore:
+    """Append-only float32 matrix on disk, one row per distinct text.
+
+    ``vectors.f32`` is the memory-mapped matrix (grown by doubling),
+    ``keys.txt`` lists the text key of every valid row in order; rows are
+    written before their key, so a crash never exposes a half-written row.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, dim: int = DEFAULT_DIM):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                dim = json.load(f)["dim"]
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim}, f)
+        self.dim = dim
+
+        self._keys_path = os.path.join(path, "keys.txt")
+        self.rows: Dict[str, int] = {}
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path) as f:
+                for line in f:
+                    if len(line) == 33:  # 32 hex digits + newline; skips a torn last line
+                        self.rows.setdefault(line[:32], len(self.rows))
+
+        self._matrix_path = os.path.join(path, "vectors.f32")
+        if not os.path.exists(self._matrix_path):
+            open(self._matrix_path, "wb").close()
+        self._map()
+
+    def _map(self):
+        size = os.path.getsize(self._matrix_path)
+        self.capacity = size // (self.dim * 4)
+        self.matrix = (np.memmap(self._matrix_path, dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dim))
+                       if self.capacity else np.zeros((0, self.dim), dtype=np.float32))
+
+    def _reserve(self, rows: int):
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity, 1024)
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+            del self.matrix
+        with open(self._matrix_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key: str):
+        return key in self.rows
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray):
+        """Append rows for keys not yet in the store"""
+        start = len(self.rows)
+        self._reserve(start + len(keys))
+        self.matrix[start:start + len(keys)] = vectors
+        self.matrix.flush()
+        with open(self._keys_path, "a") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        for offset, key in enumerate(keys):
+            self.rows[key] = start + offset
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        return self.matrix[[self.rows[key] for key in keys]]
+
+
+class SemanticScorer:
+    """Cosine relevance of texts to job descriptions, backed by a VectorStore"""
+
+    def __init__(self, store: Union[VectorStore, str, None] = DEFAULT_STORE_PATH,
+                 dim: int = DEFAULT_DIM):
+        if isinstance(store, str):
+            store = VectorStore(store, dim)
+        self.store = store
+        self.dim = store.dim if store is not None else dim
+        self._memory: Dict[str, np.ndarray] = {}  # used when there is no store
+
+    def vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """``(len(texts), dim)`` matrix, vectorizing only texts never seen before"""
+        keys = [text_key(text) for text in texts]
+        known = self.store.rows if self.store is not None else self._memory
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in known and key not in missing:
+                missing[key] = text
+        if missing:
+            new = np.stack([vectorize(text, self.dim) for text in missing.values()])
+            if self.store is not None:
+                self.store.add(list(missing), new)
+            else:
+                self._memory.update(zip(missing, new))
+        if self.store is not None:
+            return self.store.get(keys)
+        return np.stack([self._memory[key] for key in keys]) if keys else np.zeros((0, self.dim))
+
+    def similarity(self, texts: Sequence[str],
+                   job_descs: Union[str, Sequence[str]]) -> np.ndarray:
+        """Cosine similarity of each text to its job description"""
+        if not len(texts):
+            return np.zeros(0, dtype=np.float32)
+        text_vectors = self.vectors(texts)
+        if isinstance(job_descs, str):
+            return text_vectors @ self.vectors([job_descs])[0]
+        unique = list(dict.fromkeys(job_descs))
+        job_vectors = self.vectors(unique)
+        position = {job_desc: i for i, job_desc in enumerate(unique)}
+        rows = np.fromiter((position[j] for j in job_descs), dtype=np.int64, count=len(job_descs))
+        return np.einsum("ij,ij->i", text_vectors, job_vectors[rows])
+
+    def score(self, texts: Sequence[str], job_descs: Union[str, Sequence[str]]) -> np.ndarray:
+        """Relevance on the 0-10 scale of ``evaluate_relevance``"""
+        cosine = self.similarity(texts, job_descs)
+        return np.clip(cosine / FULL_MARKS_COSINE, 0, 1) * 10
+
+    def score_responses(self, responses: Sequence[str], strategy: str,
+                        job_descs: Union[str, Sequence[str]]) -> np.ndarray:
+        """Mean semantic relevance of each response's questions.
+
+        A response with no recognisable questions is scored as a whole.
+        """
+        texts, owners = [], []
+        for position, response in enumerate(responses):
+            questions = [q.text for q in extract_questions(response, strategy)] or [response]
+            texts.extend(questions)
+            owners.extend([position] * len(questions))
+        owners = np.asarray(owners, dtype=np.int64)
+        jobs = job_descs if isinstance(job_descs, str) else [job_descs[i] for i in owners]
+        scores = self.score(texts, jobs)
+        totals = np.bincount(owners, weights=scores, minlength=len(responses))
+        counts = np.bincount(owners, minlength=len(responses))
+        return totals / np.maximum(counts, 1)
@@ -0,0 +1,40 @@
+"""
+Regression tests for the incremental question parser
+Run with: python -m pytest research/test_question_parser.py
+"""
+
+from question_parser import parse_question_stream, parse_structured_response
+
+WELL_FORMED = "<questions>" + "".join(
+    f"<question><id>{i}</id><text>Question {i}?</text><type>technical</type>"
+    f"<difficulty>mid</difficulty><category>backend</category></question>"
+    for i in range(1, 4)
+) + "</questions>"
+TRAILING_PROSE = WELL_FORMED + "\n\nLet me know if you need more."
+
+
+def test_trailing_prose_is_ignored():
+    parsed = parse_structured_response(TRAILING_PROSE)
+    assert [q.text for q in parsed.questions] == ["Question 1?", "Question 2?", "Question 3?"]
+    assert parsed.root_closed
+    assert not parsed.recovered
+
+
+def test_trailing_prose_when_streamed():
+    for size in (1, 5, 64):
+        chunks = [TRAILING_PROSE[i:i + size] for i in range(0, len(TRAILING_PROSE), size)]
+        assert len(list(parse_question_stream(chunks))) == 3
+
+
+def test_recovery_keeps_questions_drained_before_the_error():
+    text = ("<questions><question><text>First?</text></question>"
+            "<question><text>Salt & pepper?</text></question></questions>")
+    assert [q.text for q in parse_structured_response(text).questions] == [
+        "First?", "Salt & pepper?"]
+
+
+def test_truncated_last_question_is_salvaged():
+    parsed = parse_structured_response(WELL_FORMED[:-len("</questions>")]
+                                       + "<question><text>Cut off mid")
+    assert len(parsed.questions) == 4
+    assert not parsed.questions[-1].complete
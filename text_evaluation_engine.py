@@ -0,0 +1,324 @@
+"""
+Bulk Text Evaluation Engine
+Scores thousands of candidate answers concurrently with one LLM call each
+
+test_openendeed_llm.py shows the ``TextEvaluationResult`` format (empathy,
+clarity, professionalism and problem-solving scores with justification,
+strengths and improvements) on mock data. This engine produces those
+results for real and in bulk:
+
+- every dimension of the rubric is scored in a single JSON-mode call per
+  answer instead of one call per dimension;
+- many answers are in flight at once, bounded by a semaphore and paced by
+  the experiment's shared RPM/TPM rate limiter;
+- results are cached on disk by a hash of (question, answer, rubric,
+  model), so re-running a batch only pays for new or changed answers;
+- results are yielded as ``TextEvaluationResult`` objects in completion
+  order, so a caller can write or display them as they arrive.
+
+Usage:
+    python research/text_evaluation_engine.py answers.jsonl --output evaluations.jsonl
+    # answers.jsonl: {"id": ..., "question": "...", "answer": "..."} per line
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.ai.schemas.text_evaluation_schemas import (
+    TextEvaluationResult,
+    DimensionScore,
+    EvaluationDimension
+)
+
+from instrumentation import usage_metrics
+from llm_cache import ResponseCache
+from prompt_engineering_experiment import async_client, configure_rate_limits, rate_limiter
+from rate_limiter import request_wait
+
+EVAL_MODEL = "gpt-4o-mini"
+EVAL_TEMPERATURE = 0.0
+EVAL_MAX_TOKENS = 1200
+PASS_THRESHOLD = 70.0
+DEFAULT_EVAL_CACHE_PATH = "research/results/text_eval_cache.sqlite3"
+DEFAULT_OUTPUT = "research/results/text_evaluations.jsonl"
+
+DEFAULT_RUBRIC = {
+    EvaluationDimension.EMPATHY.value:
+        "Acknowledges the other person's situation and feelings and responds with care.",
+    EvaluationDimension.CLARITY.value:
+        "Well structured, easy to follow, states the key information and next steps plainly.",
+    EvaluationDimension.PROFESSIONALISM.value:
+        "Appropriate tone, courteous language, professional greeting and closing.",
+    EvaluationDimension.PROBLEM_SOLVING.value:
+        "Offers concrete, workable solutions or alternatives that resolve the issue.",
+}
+
+EVAL_SYSTEM_PROMPT = ("You are an expert assessor of candidate responses. "
+                      "You score strictly against the rubric and answer only with JSON.")
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def evaluation_key(question: str, answer: str, rubric: Dict[str, str],
+                   model: str = EVAL_MODEL) -> str:
+    payload = json.dumps({"question": question, "answer": answer, "rubric": rubric,
+                          "model": model}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def evaluation_prompt(question: str, answer: str, rubric: Dict[str, str]) -> str:
+    """One prompt asking for every rubric dimension at once"""
+    criteria = "\n".join(f"- {name}: {description}" for name, description in rubric.items())
+    return f"""Evaluate the candidate's response to the question below.
+
+Question:
+{question}
+
+Candidate response:
+{answer}
+
+Score each dimension from 0 to 100:
+{criteria}
+
+Respond with a JSON object in exactly this shape:
+{{
+  "dimension_scores": [
+    {{"dimension": "<one of: {', '.join(rubric)}>",
+      "score": <0-100>,
+      "justification": "<one or two sentences>",
+      "strengths": ["..."],
+      "improvements": ["..."]}}
+  ],
+  "overall_feedback": "<short paragraph>"
+}}
+Include every dimension exactly once."""
+
+
+def parse_evaluation(content: str, rubric: Dict[str, str]) -> Tuple[List[DimensionScore], str]:
+    """Dimension scores and feedback from the model's JSON, validated against the rubric"""
+    data = json.loads(_FENCE.sub("", content.strip()))
+    scores = {}
+    for item in data.get("dimension_scores", []):
+        name = str(item.get("dimension", "")).strip().lower().replace(" ", "_").replace("-", "_")
+        if name not in rubric or name in scores:
+            continue
+        scores[name] = DimensionScore(
+            dimension=EvaluationDimension(name),
+            score=max(0.0, min(100.0, float(item["score"]))),
+            justification=str(item.get("justification", "")),
+            strengths=[str(s) for s in item.get("strengths") or []],
+            improvements=[str(s) for s in item.get("improvements") or []]
+        )
+    missing = [name for name in rubric if name not in scores]
+    if missing:
+        raise ValueError(f"evaluation is missing dimensions: {', '.join(missing)}")
+    return [scores[name] for name in rubric], str(data.get("overall_feedback", ""))
+
+
+def build_result(dimension_scores: List[DimensionScore], overall_feedback: str,
+                 metadata: Dict) -> TextEvaluationResult:
+    """Assemble a ``TextEvaluationResult``.
+
+    Only fields the schema declares are passed, so the engine keeps working
+    if the schema adds or drops optional metadata fields.
+    """
+    overall = round(sum(d.score for d in dimension_scores) / len(dimension_scores), 1)
+    values = {
+        "overall_score": overall,
+        "recommendation": "PASS" if overall >= PASS_THRESHOLD else "FAIL",
+        "dimension_scores": dimension_scores,
+        "overall_feedback": overall_feedback,
+        "evaluated_at": datetime.now(),
+        **metadata
+    }
+    fields = (getattr(TextEvaluationResult, "model_fields", None)
+              or getattr(TextEvaluationResult, "__fields__", None))
+    if fields:
+        values = {name: value for name, value in values.items() if name in fields}
+    return TextEvaluationResult(**values)
+
+
+def result_to_dict(result: TextEvaluationResult) -> Dict:
+    if hasattr(result, "model_dump"):
+        return result.model_dump(mode="json")
+    return json.loads(result.json())
+
+
+class TextEvaluationEngine:
+    """Concurrent, cached, rate-limited rubric scoring"""
+
+    def __init__(self, rubric: Dict[str, str] = None, model: str = EVAL_MODEL,
+                 max_concurrency: int = 16, cache_path: Optional[str] = DEFAULT_EVAL_CACHE_PATH):
+        self.rubric = rubric or DEFAULT_RUBRIC
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0  # duplicates that joined a call already in flight
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def evaluate(self, question: str, answer: str,
+                       semaphore: asyncio.Semaphore = None) -> TextEvaluationResult:
+        """Score one answer on every rubric dimension.
+
+        Identical (question, answer) pairs already being scored share that
+        call instead of starting another.
+        """
+        key = evaluation_key(question, answer, self.rubric, self.model)
+        # The cache is SQLite: read and write it off the event loop
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache is not None else None
+        owner = False
+        if cached is not None:
+            self.cache_hits += 1
+            content, metadata = cached["content"], {**cached["metadata"], "cached": True}
+        else:
+            call = self._inflight.get(key)
+            if call is None:
+                owner = True
+                call = asyncio.ensure_future(self._call(question, answer, semaphore))
+                self._inflight[key] = call
+                call.add_done_callback(lambda _: self._inflight.pop(key, None))
+            else:
+                self.coalesced += 1
+            content, metadata = await asyncio.shield(call)
+
+        dimension_scores, feedback = parse_evaluation(content, self.rubric)
+        if owner and self.cache is not None:
+            # Only well-formed evaluations are cached
+            await asyncio.to_thread(self.cache.put, key, {"content": content, "metadata": metadata})
+        return build_result(dimension_scores, feedback, metadata)
+
+    async def _call(self, question: str, answer: str,
+                    semaphore: asyncio.Semaphore = None) -> Tuple[str, Dict]:
+        prompt = evaluation_prompt(question, answer, self.rubric)
+        async with semaphore or asyncio.Semaphore(1):
+            self.calls += 1
+            request_wait.set(0.0)
+            start_time = time.time()
+            response = await async_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": EVAL_SYSTEM_PROMPT},
+                          {"role": "user", "content": prompt}],
+                temperature=EVAL_TEMPERATURE,
+                max_tokens=EVAL_MAX_TOKENS,
+                response_format={"type": "json_object"}
+            )
+            evaluation_time = time.time() - start_time - request_wait.get()
+        content = response.choices[0].message.content
+        metrics = usage_metrics(response.usage, self.model, evaluation_time,
+                                prompt_text=EVAL_SYSTEM_PROMPT + prompt, completion_text=content)
+        return content, {"model_used": self.model,
+                         "tokens_used": metrics["prompt_tokens"] + metrics["completion_tokens"],
+                         "evaluation_time": round(evaluation_time, 2),
+                         "cost_usd": metrics["cost_usd"]}
+
+    async def evaluate_many(self, items: Iterable[Tuple[str, str, str]]
+                            ) -> AsyncIterator[Tuple[str, object]]:
+        """Yield ``(item_id, TextEvaluationResult or Exception)`` as each completes.
+
+        ``items`` are ``(item_id, question, answer)`` and are consumed lazily,
+        keeping at most twice ``max_concurrency`` evaluations scheduled.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        items = iter(items)
+        pending = {}
+
+        async def run(question, answer):
+            return await self.evaluate(question, answer, semaphore)
+
+        while True:
+            for item_id, question, answer in items:
+                pending[asyncio.ensure_future(run(question, answer))] = item_id
+                if len(pending) >= 2 * self.max_concurrency:
+                    break
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item_id = pending.pop(task)
+                error = task.exception()
+                yield item_id, error if error is not None else task.result()
+
+
+def iter_answers(path: str) -> Iterable[Tuple[str, str, str]]:
+    """``(id, question, answer)`` from a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                yield (str(record.get("id", line_number)), record["question"],
+                       record.get("answer") or record.get("response", ""))
+
+
+async def main(path: str, output: str = DEFAULT_OUTPUT, concurrency: int = 16,
+               model: str = EVAL_MODEL, rubric: Dict[str, str] = None,
+               cache_path: Optional[str] = DEFAULT_EVAL_CACHE_PATH):
+    engine = TextEvaluationEngine(rubric, model, concurrency, cache_path)
+    directory = os.path.dirname(output)
+    if output != "-" and directory:
+        os.makedirs(directory, exist_ok=True)
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+
+    evaluated = failed = 0
+    start = time.time()
+    try:
+        async for item_id, result in engine.evaluate_many(iter_answers(path)):
+            if isinstance(result, Exception):
+                failed += 1
+                record = {"id": item_id, "error": str(result)}
+            else:
+                evaluated += 1
+                record = {"id": item_id, **result_to_dict(result)}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - start
+    print(f"\n✓ {evaluated} answers evaluated in {elapsed:.1f}s "
+          f"({engine.calls} API calls, {engine.cache_hits} cache hits, "
+          f"{engine.coalesced} coalesced duplicates)", file=sys.stderr)
+    if failed:
+        print(f"✗ {failed} evaluations failed; see the error records in {output}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score candidate answers on the text "
+                                                 "evaluation rubric, concurrently")
+    parser.add_argument("answers", help="JSONL file with id, question and answer per line")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help=f"JSONL file of TextEvaluationResult records, '-' for stdout "
+                             f"(default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="max concurrent evaluations (default: 16)")
+    parser.add_argument("--model", default=EVAL_MODEL, help=f"(default: {EVAL_MODEL})")
+    parser.add_argument("--rubric", default=None,
+                        help="JSON file mapping dimension name (an EvaluationDimension "
+                             "value) to its description")
+    parser.add_argument("--cache-path", default=DEFAULT_EVAL_CACHE_PATH,
+                        help=f"evaluation cache file (default: {DEFAULT_EVAL_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the cache")
+    parser.add_argument("--rpm", type=float, default=rate_limiter.rpm,
+                        help="requests-per-minute budget")
+    parser.add_argument("--tpm", type=float, default=rate_limiter.tpm,
+                        help="tokens-per-minute budget")
+    args = parser.parse_args()
+
+    rubric = None
+    if args.rubric:
+        with open(args.rubric, encoding="utf-8") as f:
+            rubric = json.load(f)
+    configure_rate_limits(args.rpm, args.tpm)
+    asyncio.run(main(args.answers, args.output, args.concurrency, args.model, rubric,
+                     None if args.no_cache else args.cache_path))